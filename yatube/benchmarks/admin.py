@@ -0,0 +1,66 @@
+"""Списки записей, комментариев, подписок и групп в админке.
+
+Каждый список открывается без параметров, с поиском и с фильтром.
+Печатаются время ответа и число запросов к базе.
+"""
+from benchmarks import common
+
+
+def main():
+    parser = common.parser(__doc__, rows=1000000)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--groups", type=int, default=20)
+    parser.add_argument("--comments", type=int, default=1000000)
+    args = parser.parse_args()
+    common.setup()
+
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.test import Client
+    from django.urls import reverse
+
+    from posts.profiling import RequestStats
+
+    author, _ = common.seed_dataset(
+        args.users, args.groups, args.rows, args.comments
+    )
+    admin = get_user_model().objects.create_superuser(
+        "admin", "admin@example.com", "admin"
+    )
+    client = Client()
+    client.force_login(admin)
+
+    def changelist(model):
+        return reverse(f"admin:posts_{model}_changelist")
+
+    cases = (
+        (changelist("post"), {}),
+        (changelist("post"), {"q": "Запись"}),
+        (changelist("post"), {"pub_date__gte": "2000-01-01T00:00:00Z"}),
+        (changelist("post"), {"author__id__exact": author.pk}),
+        (changelist("comment"), {}),
+        (changelist("comment"), {"q": author.username}),
+        (changelist("follow"), {}),
+        (changelist("group"), {}),
+    )
+    print(f"{args.rows} posts, {args.comments} comments, {args.users} users")
+    for path, data in cases:
+
+        def request():
+            response = client.get(path, data)
+            if response.status_code != 200:
+                raise RuntimeError(f"{path}: {response.status_code}")
+
+        request()
+        stats = RequestStats()
+        with connection.execute_wrapper(stats):
+            request()
+        query = "&".join(f"{key}={value}" for key, value in data.items())
+        common.report(
+            f"{path}?{query} ({stats.queries} q)",
+            common.measure(request, args.repeat),
+        )
+
+
+if __name__ == "__main__":
+    main()
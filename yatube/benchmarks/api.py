@@ -0,0 +1,64 @@
+"""Пропускная способность JSON API лент против HTML-страниц."""
+from benchmarks import common
+
+
+def main():
+    parser = common.parser(__doc__, rows=100000)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    common.setup()
+
+    from django.core.cache import cache
+    from django.test import Client
+    from django.urls import reverse
+
+    from posts.models import AuthorStats
+
+    common.seed_posts(args.rows)
+    # bulk_create не вызывает сигналы, а профиль берёт число записей из
+    # счётчика автора.
+    AuthorStats.objects.recount()
+    client = Client()
+
+    def html(path, cold):
+        def run():
+            if cold:
+                cache.clear()
+            client.get(path)
+        return run
+
+    def api(path, etag=None):
+        headers = {"HTTP_IF_NONE_MATCH": etag} if etag else {}
+        return lambda: client.get(path, **headers)
+
+    feeds = (
+        ("index", reverse("posts:index"), reverse("posts:api_index")),
+        (
+            "group",
+            reverse("posts:group", kwargs={"slug": "bench"}),
+            reverse("posts:api_group", kwargs={"slug": "bench"}),
+        ),
+        (
+            "profile",
+            reverse("posts:profile", kwargs={"username": "bench"}),
+            reverse("posts:api_profile", kwargs={"username": "bench"}),
+        ),
+    )
+    print(f"{args.rows} posts, {args.requests} requests per case")
+    for name, html_path, api_path in feeds:
+        # Очистка кэша меняет поколение лент, поэтому холодный HTML идёт
+        # последним, после замеров с ETag.
+        etag = client.get(api_path)["ETag"]
+        for case, run in (
+            ("api", api(api_path)),
+            ("api, 304", api(api_path, etag)),
+            ("html, cached", html(html_path, cold=False)),
+            ("html, cold cache", html(html_path, cold=True)),
+        ):
+            samples = common.measure(run, args.requests)
+            common.report(f"{name} {case}", samples)
+            print(f"{'':<40} {1000 * len(samples) / sum(samples):9.0f} req/s")
+
+
+if __name__ == "__main__":
+    main()
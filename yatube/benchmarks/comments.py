@@ -0,0 +1,75 @@
+"""Страница записи с большим обсуждением.
+
+Сравнивается прежний рендер всех комментариев (автор каждого
+комментария - отдельный запрос) с первой и последней порцией по
+курсору и JSON-порцией для кнопки «Показать ещё».
+"""
+from benchmarks import common
+
+
+def main():
+    parser = common.parser(__doc__, rows=50000)
+    parser.add_argument("--users", type=int, default=100)
+    args = parser.parse_args()
+    common.setup()
+
+    from django.contrib.auth import get_user_model
+    from django.core.cache import cache
+    from django.template.loader import get_template
+    from django.test import Client
+    from django.urls import reverse
+
+    from posts.models import Comment, Post
+    from posts.paginators import FORWARD, encode_cursor
+
+    User = get_user_model()
+    author = User.objects.create_user(username="bench")
+    post = Post.objects.create(text="bench", author=author)
+    User.objects.bulk_create(
+        User(username=f"reader{i}") for i in range(args.users)
+    )
+    users = list(User.objects.filter(username__startswith="reader"))
+    Comment.objects.bulk_create(
+        Comment(post=post, author=users[i % len(users)], text=f"c {i}")
+        for i in range(args.rows)
+    )
+    Post.objects.recount_comments()
+    client = Client()
+    adress = reverse("posts:post", args=[author.username, post.pk])
+    api_adress = reverse("posts:api_comments", args=[post.pk])
+    anchor = Comment.objects.order_by("-created", "-pk")[20]
+    deep_cursor = encode_cursor(FORWARD, anchor, "created")
+    template = get_template("posts/comments.html")
+
+    def render_all():
+        template.render({"post": post, "comments": post.comments.all()})
+
+    def get(*args):
+        # Ответ не должен прийти из кэша фрагментов записи.
+        cache.clear()
+        client.get(*args)
+
+    common.report(
+        f"all {args.rows} comments, per-row author",
+        common.measure(render_all, max(1, args.repeat // 10)),
+    )
+    common.report(
+        "post page, first portion",
+        common.measure(lambda: get(adress), args.repeat),
+    )
+    common.report(
+        "post page, last portion",
+        common.measure(
+            lambda: get(adress, {"cursor": deep_cursor}), args.repeat
+        ),
+    )
+    common.report(
+        "load more JSON, last portion",
+        common.measure(
+            lambda: get(api_adress, {"cursor": deep_cursor}), args.repeat
+        ),
+    )
+
+
+if __name__ == "__main__":
+    main()
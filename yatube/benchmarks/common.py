@@ -0,0 +1,113 @@
+"""Общие помощники для бенчмарков.
+
+Бенчмарки запускаются из каталога ``yatube/`` как модули, например::
+
+    python -m benchmarks.pagination --rows 1000000
+
+Каждый запуск создаёт отдельную тестовую базу (по умолчанию SQLite в
+памяти), поэтому рабочая db.sqlite3 не затрагивается.
+"""
+import argparse
+import os
+import statistics
+import time
+
+
+def setup(**database):
+    """Настроить Django и создать тестовую базу.
+
+    Ключи database заменяют настройки базы "default", например ENGINE
+    или TEST для тестовой базы в файле.
+    """
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yatube.settings")
+    import django
+
+    django.setup()
+
+    from django.conf import settings
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    settings.DATABASES["default"].update(database)
+
+    # Как и тестовый раннер Django: без debug toolbar и накопления SQL.
+    settings.DEBUG = False
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+
+
+def parser(description, rows=100000):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--rows", type=int, default=rows)
+    parser.add_argument("--repeat", type=int, default=20)
+    return parser
+
+
+def measure(func, repeat):
+    """Вызвать func repeat раз и вернуть времена в миллисекундах."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def percentile(samples, percent):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * percent / 100))]
+
+
+def report(name, samples):
+    p95 = percentile(samples, 95)
+    print(
+        f"{name:<40} median {statistics.median(samples):9.3f} ms"
+        f"   p95 {p95:9.3f} ms"
+    )
+
+
+def seed_posts(rows, batch_size=10000):
+    """Быстро наполнить таблицу Post одним автором и одной группой."""
+    from django.contrib.auth import get_user_model
+
+    from posts.models import Group, Post
+
+    author = get_user_model().objects.create_user(username="bench")
+    group = Group.objects.create(
+        title="bench", slug="bench", description="bench"
+    )
+    for start in range(0, rows, batch_size):
+        Post.objects.bulk_create(
+            Post(text=f"post {i}", author=author, group=group)
+            for i in range(start, min(rows, start + batch_size))
+        )
+    return author, group
+
+
+def seed_dataset(users, groups, posts, comments, seed=0):
+    """Наполнить базу командой seed_yatube.
+
+    Возвращает автора с наибольшим числом подписчиков и читателя с
+    наибольшим числом подписок.
+    """
+    from io import StringIO
+
+    from django.core.management import call_command
+
+    from posts.models import AuthorStats
+
+    call_command(
+        "seed_yatube",
+        users=users,
+        groups=groups,
+        posts=posts,
+        comments_per_post=comments / posts if posts else 0,
+        image_ratio=0,
+        seed=seed,
+        stdout=StringIO(),
+    )
+    stats = AuthorStats.objects.select_related("user")
+    return (
+        stats.order_by("-followers_count").first().user,
+        stats.order_by("-following_count").first().user,
+    )
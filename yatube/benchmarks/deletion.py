@@ -0,0 +1,106 @@
+"""Удаление пользователя с --rows записями: user.delete() против
+скрытия и фонового удаления пачками.
+
+Печатается, через сколько пользователь пропадает из лент, общее время
+удаления и самая долгая транзакция: столько база SQLite закрыта для
+других записей. Для скрытия дополнительно замеряется главная страница
+во время фонового удаления.
+"""
+import os
+import tempfile
+import time
+
+from benchmarks import common
+
+
+def seed(rows):
+    from django.contrib.auth import get_user_model
+
+    from posts.models import AuthorStats, Post
+
+    author, _ = common.seed_posts(rows)
+    reader = get_user_model().objects.create_user(username="reader")
+    Post.objects.create(text="Запись читателя", author=reader)
+    AuthorStats.objects.recount()
+    return author
+
+
+def main():
+    parser = common.parser(__doc__, rows=1000000)
+    args = parser.parse_args()
+    # Задача удаления идёт в фоновом потоке; общая база в памяти не ждёт
+    # блокировку, а сразу падает с "table is locked".
+    directory = tempfile.mkdtemp()
+    common.setup(TEST={"NAME": os.path.join(directory, "bench.sqlite3")})
+
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+
+    from posts import moderation
+    from posts.models import Group
+
+    User = get_user_model()
+    delete_post_rows = moderation.delete_post_rows
+    transactions = []
+
+    def timed_delete_post_rows(ids):
+        started = time.perf_counter()
+        try:
+            return delete_post_rows(ids)
+        finally:
+            transactions.append(time.perf_counter() - started)
+
+    moderation.delete_post_rows = timed_delete_post_rows
+    client = Client()
+
+    def naive(users):
+        # Collector удаляет пользователя и всё связанное в одной
+        # транзакции; до её конца записи видны в лентах.
+        started = time.perf_counter()
+        users.get().delete()
+        transactions.append(time.perf_counter() - started)
+        return transactions[-1]
+
+    def deferred(users):
+        started = time.perf_counter()
+        job_id = moderation.hide_users(users)
+        hidden = time.perf_counter() - started
+        # Пока задача идёт в фоне, главная страница открывается как
+        # обычно и уже без записей пользователя.
+        latencies = []
+        while moderation.progress(job_id)["state"] not in ("done", "failed"):
+            request_started = time.perf_counter()
+            response = client.get("/")
+            latencies.append((time.perf_counter() - request_started) * 1000)
+            if b"post 0" in response.content:
+                raise RuntimeError("hidden posts are still in the feed")
+            time.sleep(0.05)
+        if moderation.progress(job_id)["state"] != "done":
+            raise RuntimeError("deletion job failed")
+        if latencies:
+            common.report(
+                f"GET / while deleting ({len(latencies)})", latencies
+            )
+        return hidden
+
+    print(f"{args.rows} posts")
+    for name, delete in (
+        ("user.delete()", naive),
+        ("moderation.hide_users", deferred),
+    ):
+        author = seed(args.rows)
+        transactions.clear()
+        started = time.perf_counter()
+        hidden = delete(User.objects.filter(pk=author.pk))
+        total = time.perf_counter() - started
+        print(
+            f"{name:<22} hidden after {hidden * 1000:9.1f} ms"
+            f"   total {total * 1000:9.0f} ms"
+            f"   longest transaction {max(transactions) * 1000:9.1f} ms"
+        )
+        User.objects.all().delete()
+        Group.objects.all().delete()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""Нагрузочный прогон всех маршрутов posts/urls.py.
+
+Наполняет базу синтетическими данными, прогоняет каждый маршрут через
+тестовый клиент и печатает p50/p95/p99, число SQL-запросов и пик памяти
+на запрос. Результаты можно сохранить как базовые и сравнивать с ними
+последующие прогоны::
+
+    python -m benchmarks.loadtest --save baseline.json
+    python -m benchmarks.loadtest --compare baseline.json
+
+В режиме сравнения команда завершается с кодом 1, если какой-то маршрут
+стал медленнее порога или делает больше запросов к базе.
+"""
+import json
+import sys
+import tracemalloc
+
+from benchmarks import common
+
+
+def cases(author, reader, group, post):
+    """Имя маршрута, метод, адрес, данные и кто отправляет запрос."""
+    from django.urls import reverse
+
+    def url(name, **kwargs):
+        return reverse(f"posts:{name}", kwargs=kwargs)
+
+    username = author.username
+    post_kwargs = {"username": username, "post_id": post.pk}
+    return {
+        "index": ("get", url("index"), None, None),
+        "new_post": ("get", url("new_post"), None, reader),
+        "follow_index": ("get", url("follow_index"), None, reader),
+        "search": ("get", url("search"), {"q": "Запись"}, None),
+        "api_index": ("get", url("api_index"), None, None),
+        "api_group": ("get", url("api_group", slug=group.slug), None, None),
+        "api_profile": (
+            "get",
+            url("api_profile", username=username),
+            None,
+            None,
+        ),
+        "api_comments": (
+            "get",
+            url("api_comments", post_id=post.pk),
+            None,
+            None,
+        ),
+        "group": ("get", url("group", slug=group.slug), None, None),
+        "profile": ("get", url("profile", username=username), None, None),
+        "post": ("get", url("post", **post_kwargs), None, None),
+        "profile_follow": (
+            "get",
+            url("profile_follow", username=username),
+            None,
+            reader,
+        ),
+        "post_edit": ("get", url("post_edit", **post_kwargs), None, author),
+        "profile_unfollow": (
+            "get",
+            url("profile_unfollow", username=username),
+            None,
+            reader,
+        ),
+        "add_comment": (
+            "post",
+            url("add_comment", **post_kwargs),
+            {"text": "load test"},
+            reader,
+        ),
+    }
+
+
+def run_case(client, method, path, data, args):
+    from django.core.cache import cache
+    from django.db import connection
+
+    from posts.profiling import RequestStats
+
+    def request():
+        if args.cold:
+            cache.clear()
+        response = getattr(client, method)(path, data)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{path}: {response.status_code}")
+
+    request()
+    # CaptureQueriesContext не годится: после наполнения базы
+    # connection.queries_log упирается в свой предел и перестаёт расти.
+    stats = RequestStats()
+    with connection.execute_wrapper(stats):
+        request()
+    tracemalloc.start()
+    request()
+    memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    samples = common.measure(request, args.requests)
+    return {
+        "p50": common.percentile(samples, 50),
+        "p95": common.percentile(samples, 95),
+        "p99": common.percentile(samples, 99),
+        "queries": stats.queries,
+        "memory_kb": memory / 1024,
+    }
+
+
+def compare(results, baseline, threshold, min_delta):
+    """Строки отчёта и признак регрессии относительно базовых замеров."""
+    regressed = False
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<20} нет в базовых замерах")
+            continue
+        change = result["p50"] / base["p50"] - 1
+        # Короткие маршруты шумят на доли миллисекунды, поэтому нужен и
+        # относительный, и абсолютный прирост.
+        slower = (
+            change > threshold / 100
+            and result["p50"] - base["p50"] > min_delta
+        )
+        more_queries = result["queries"] > base["queries"]
+        mark = "REGRESSION" if slower or more_queries else "ok"
+        regressed |= slower or more_queries
+        print(
+            f"{name:<20} p50 {base['p50']:8.2f} -> {result['p50']:8.2f} ms"
+            f" {100 * change:+6.1f}%   queries {base['queries']:3d} ->"
+            f" {result['queries']:3d}   {mark}"
+        )
+    return regressed
+
+
+def main():
+    parser = common.parser(__doc__, rows=20000)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--groups", type=int, default=20)
+    parser.add_argument("--comments", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument(
+        "--cold", action="store_true", help="Очищать кэш перед запросом."
+    )
+    parser.add_argument("--save", help="Сохранить замеры в JSON-файл.")
+    parser.add_argument("--compare", help="Сравнить с замерами из файла.")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=20,
+        help="Допустимое замедление p50 в процентах.",
+    )
+    parser.add_argument(
+        "--min-delta",
+        type=float,
+        default=1,
+        help="Меньшее замедление p50 в миллисекундах не считается.",
+    )
+    args = parser.parse_args()
+    common.setup()
+
+    from django.test import Client
+
+    from posts import urls
+    from posts.models import Group
+
+    author, reader = common.seed_dataset(
+        args.users, args.groups, args.rows, args.comments, args.seed
+    )
+    group = Group.objects.first()
+    post = author.posts.order_by("-comments_count").first()
+    routes = cases(author, reader, group, post)
+    missing = {pattern.name for pattern in urls.urlpatterns} - set(routes)
+    if missing:
+        sys.exit(f"Нет сценария для маршрутов: {', '.join(sorted(missing))}")
+
+    print(
+        f"{args.users} users, {args.rows} posts, {args.comments} comments,"
+        f" {args.requests} requests per route"
+    )
+    print(
+        f"{'route':<20} {'p50':>8} {'p95':>8} {'p99':>8} ms"
+        f" {'queries':>8} {'memory':>10}"
+    )
+    results = {}
+    clients = {}
+    for name, (method, path, data, user) in routes.items():
+        client = clients.get(user)
+        if client is None:
+            client = clients[user] = Client()
+            if user is not None:
+                client.force_login(user)
+        result = results[name] = run_case(client, method, path, data, args)
+        print(
+            f"{name:<20} {result['p50']:8.2f} {result['p95']:8.2f}"
+            f" {result['p99']:8.2f}    {result['queries']:8d}"
+            f" {result['memory_kb']:7.0f} KB"
+        )
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(results, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        print()
+        if compare(results, baseline, args.threshold, args.min_delta):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Удаление волны спама: QuerySet.delete() против пачек moderation.
+
+Автор-спамер публикует --rows записей, у каждой по комментарию, и у
+него --followers подписчиков с разложенными лентами. Печатается общее
+время удаления и самая долгая транзакция: столько база SQLite закрыта
+для других записей.
+"""
+import time
+
+from benchmarks import common
+
+
+def seed(rows, followers):
+    from django.contrib.auth import get_user_model
+
+    from posts import timeline
+    from posts.models import AuthorStats, Comment, Follow, Post
+
+    User = get_user_model()
+    spammer, _ = common.seed_posts(rows)
+    User.objects.bulk_create(
+        User(username=f"reader{i}") for i in range(followers)
+    )
+    readers = list(User.objects.filter(username__startswith="reader"))
+    Follow.objects.bulk_create(
+        Follow(user=reader, author=spammer) for reader in readers
+    )
+    Comment.objects.bulk_create(
+        Comment(post_id=pk, author=readers[0], text="Нет")
+        for pk in Post.objects.values_list("pk", flat=True)
+    )
+    Post.objects.recount_comments()
+    AuthorStats.objects.recount()
+    timeline.rebuild_all()
+    return spammer
+
+
+def main():
+    parser = common.parser(__doc__, rows=20000)
+    parser.add_argument("--followers", type=int, default=20)
+    args = parser.parse_args()
+    common.setup()
+
+    from django.contrib.auth import get_user_model
+
+    from posts import moderation
+    from posts.models import Group, Post
+
+    delete_post_rows = moderation.delete_post_rows
+    transactions = []
+
+    def timed_delete_post_rows(ids):
+        # Каждая пачка удаляется в одной транзакции.
+        started = time.perf_counter()
+        try:
+            return delete_post_rows(ids)
+        finally:
+            transactions.append(time.perf_counter() - started)
+
+    moderation.delete_post_rows = timed_delete_post_rows
+
+    def naive(posts):
+        # Collector удаляет всё в одной транзакции.
+        started = time.perf_counter()
+        posts.delete()
+        transactions.append(time.perf_counter() - started)
+
+    def chunked(posts):
+        moderation.delete_posts("bench", posts)
+
+    print(f"{args.rows} posts, {args.followers} followers")
+    for name, delete in (
+        ("QuerySet.delete()", naive),
+        ("moderation.delete_posts", chunked),
+    ):
+        spammer = seed(args.rows, args.followers)
+        transactions.clear()
+        started = time.perf_counter()
+        delete(Post.objects.filter(author=spammer))
+        total = time.perf_counter() - started
+        print(
+            f"{name:<26} total {total * 1000:9.0f} ms"
+            f"   longest transaction {max(transactions) * 1000:9.1f} ms"
+            f"   transactions {len(transactions)}"
+        )
+        get_user_model().objects.all().delete()
+        Group.objects.all().delete()
+
+
+if __name__ == "__main__":
+    main()
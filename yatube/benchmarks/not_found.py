@@ -0,0 +1,92 @@
+"""Поток 404 от ботов на маршрут профиля /<username>/.
+
+Прежний путь - запрос к User на каждый адрес и рендер misc/404.html -
+сравнивается с фильтром имён, отрицательным кэшем и заранее
+отрендеренной страницей 404. В базе --rows пользователей; для
+сравнения замеряется и профиль существующего пользователя.
+"""
+import itertools
+
+from benchmarks import common
+
+PROBES = (
+    "wp-admin",
+    ".env",
+    "phpmyadmin",
+    "wp-login.php",
+    "xmlrpc.php",
+    ".git",
+    "cgi-bin",
+    "vendor",
+)
+
+
+def main():
+    parser = common.parser(__doc__, rows=100000)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    common.setup()
+
+    from django.contrib.auth import get_user_model
+    from django.shortcuts import get_object_or_404, render
+    from django.test import Client
+
+    import yatube.urls
+    from posts import usernames
+    from posts.models import AuthorStats, Post
+
+    User = get_user_model()
+    User.objects.bulk_create(
+        User(username=f"user{i}") for i in range(args.rows)
+    )
+    author = User.objects.create_user(username="bench")
+    Post.objects.create(text="Тестовый текст", author=author)
+    AuthorStats.objects.recount(User.objects.filter(pk=author.pk))
+    client = Client()
+    counter = itertools.count()
+
+    def distinct_probe():
+        probe = PROBES[next(counter) % len(PROBES)]
+        client.get(f"/{probe}-{next(counter)}/")
+
+    cases = (
+        ("distinct probes", distinct_probe),
+        ("repeated probe", lambda: client.get("/wp-admin/")),
+        ("existing profile", lambda: client.get("/bench/")),
+    )
+
+    def page_not_found(request, exception):
+        return render(
+            request, "misc/404.html", {"path": request.path}, status=404
+        )
+
+    patched = {
+        usernames: {
+            "might_exist": lambda username: True,
+            "get_or_404": lambda queryset, username: get_object_or_404(
+                queryset, username=username
+            ),
+        },
+        yatube.urls: {"handler404": page_not_found},
+    }
+    originals = {
+        module: {name: getattr(module, name) for name in names}
+        for module, names in patched.items()
+    }
+
+    print(f"{args.rows} users, {args.requests} requests per case")
+    for mode, attributes in (("before", patched), ("after", originals)):
+        for module, names in attributes.items():
+            for name, value in names.items():
+                setattr(module, name, value)
+        for case, run in cases:
+            run()
+            samples = common.measure(run, args.requests)
+            common.report(f"{mode}: {case}", samples)
+            print(
+                f"{'':<40} {1000 * len(samples) / sum(samples):9.0f} req/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
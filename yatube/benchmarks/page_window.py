@@ -0,0 +1,91 @@
+"""Навигация по страницам и COUNT(*) большой ленты.
+
+Сравнивается прежний paginator.html (ссылка на каждую страницу) с
+окном страниц, а точный COUNT(*) - с подсчётом до POSTS_COUNT_LIMIT и
+счётом из кэша. В конце - ответ главной страницы целиком.
+"""
+from benchmarks import common
+
+# Цикл из прежнего paginator.html.
+FULL_RANGE = """
+{% for i in page.paginator.page_range %}
+  {% if page.number == i %}
+    <li class="page-item active">
+      <span class="page-link">{{ i }}
+        <span class="sr-only">(текущая)</span>
+      </span>
+    </li>
+  {% else %}
+    <li class="page-item">
+      <a class="page-link" href="?page={{ i }}">{{ i }}</a>
+    </li>
+  {% endif %}
+{% endfor %}
+"""
+
+
+def main():
+    parser = common.parser(__doc__, rows=500000)
+    args = parser.parse_args()
+    common.setup()
+
+    from django.core.cache import cache
+    from django.template import Context, Template
+    from django.template.loader import get_template
+    from django.test import Client
+
+    from posts.models import Post
+    from posts.paginators import PostPaginator, cached_count
+
+    _, group = common.seed_posts(args.rows)
+    # COUNT(*) всей таблицы SQLite берёт из b-дерева почти даром,
+    # поэтому считаются записи группы.
+    posts = Post.objects.filter(group=group)
+    page = PostPaginator(posts, 10, count=args.rows).page(
+        args.rows // 20 or 1
+    )
+    full = Template(FULL_RANGE)
+    window = get_template("paginator.html")
+    renders = (
+        ("all page links", lambda: full.render(Context({"page": page}))),
+        ("page window", lambda: window.render({"page": page})),
+    )
+
+    print(
+        f"{args.rows} posts, "
+        f"page {page.number} of {page.paginator.num_pages}"
+    )
+    for name, render in renders:
+        size = len(render().encode())
+        common.report(
+            f"{name}, {size} bytes", common.measure(render, args.repeat)
+        )
+
+    def count_cold():
+        cache.clear()
+        cached_count(posts)
+
+    common.report(
+        "exact group COUNT(*)",
+        common.measure(lambda: posts.values("pk").count(), args.repeat),
+    )
+    common.report(
+        "COUNT(*) up to POSTS_COUNT_LIMIT",
+        common.measure(count_cold, args.repeat),
+    )
+    common.report(
+        "cached count",
+        common.measure(lambda: cached_count(posts), args.repeat),
+    )
+
+    client = Client()
+    adress = f"/?page={page.number}"
+    size = len(client.get(adress).content)
+    common.report(
+        f"GET {adress}, {size} bytes",
+        common.measure(lambda: client.get(adress), args.repeat),
+    )
+
+
+if __name__ == "__main__":
+    main()
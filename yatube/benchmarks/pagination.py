@@ -0,0 +1,46 @@
+"""Страница 1 против глубокой страницы: offset- и cursor-пагинация."""
+from benchmarks import common
+
+
+def main():
+    parser = common.parser(__doc__, rows=1000000)
+    parser.add_argument("--page", type=int, default=5000)
+    args = parser.parse_args()
+    common.setup()
+
+    from django.core.paginator import Paginator
+
+    from posts.models import Post
+    from posts.paginators import FORWARD, CursorPaginator, encode_cursor
+
+    common.seed_posts(args.rows)
+    posts = Post.objects.all()
+    deep = min(args.page, args.rows // 10)
+    # Курсор на глубокую страницу строится один раз, вне замеров.
+    anchor = posts.order_by("-pub_date", "-pk")[(deep - 1) * 10 - 1]
+    deep_cursor = encode_cursor(FORWARD, anchor)
+
+    def offset(number):
+        def run():
+            list(Paginator(posts, 10).get_page(number).object_list)
+        return run
+
+    def cursor(value):
+        def run():
+            list(CursorPaginator(posts, 10).get_page(value).object_list)
+        return run
+
+    print(f"{args.rows} posts, deep page {deep}")
+    common.report("offset page 1", common.measure(offset(1), args.repeat))
+    common.report(
+        f"offset page {deep}", common.measure(offset(deep), args.repeat)
+    )
+    common.report("cursor page 1", common.measure(cursor(None), args.repeat))
+    common.report(
+        f"cursor page {deep}",
+        common.measure(cursor(deep_cursor), args.repeat),
+    )
+
+
+if __name__ == "__main__":
+    main()
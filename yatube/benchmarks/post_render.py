@@ -0,0 +1,65 @@
+"""Рендер страницы из 10 записей с картинками: без кэша карточек и с ним."""
+import tempfile
+from io import BytesIO
+
+from benchmarks import common
+
+
+def main():
+    parser = common.parser(__doc__)
+    args = parser.parse_args()
+    common.setup()
+
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.template.loader import get_template
+    from django.test import override_settings
+    from PIL import Image
+
+    from posts import thumbnails
+    from posts.models import Group, Post
+
+    settings.MEDIA_ROOT = tempfile.mkdtemp()
+    # Без пула потоков: его потоки упираются в общую базу в памяти
+    # ("table is locked") и достраивают миниатюры во время замеров.
+    settings.POSTS_THUMBNAIL_WORKERS = 0
+    author = get_user_model().objects.create_user(username="bench")
+    group = Group.objects.create(
+        title="bench", slug="bench", description="bench"
+    )
+    for i in range(10):
+        image = BytesIO()
+        Image.new("RGB", (1600, 1200), (i * 20, 100, 150)).save(image, "JPEG")
+        Post.objects.create(
+            text="Строка текста\n" * 20,
+            author=author,
+            group=group,
+            image=SimpleUploadedFile(f"bench{i}.jpg", image.getvalue()),
+        )
+    posts = list(Post.objects.with_related())
+    template = get_template("posts/post_item.html")
+
+    def render_page():
+        for post in posts:
+            template.render({"post": post, "user": author})
+
+    # Миниатюры создаются до замеров, как после warm_thumbnails.
+    names = [post.image.name for post in posts]
+    for name in names:
+        thumbnails.generate(name)
+    if thumbnails.missing(names):
+        raise RuntimeError("thumbnails were not generated")
+    render_page()
+    with override_settings(POSTS_POST_CACHE_TIMEOUT=0):
+        common.report(
+            "10 posts, no card cache", common.measure(render_page, args.repeat)
+        )
+    render_page()
+    common.report(
+        "10 posts, warm card cache", common.measure(render_page, args.repeat)
+    )
+
+
+if __name__ == "__main__":
+    main()
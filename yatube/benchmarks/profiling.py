@@ -0,0 +1,57 @@
+"""Накладные расходы ProfilingMiddleware на страницах лент."""
+from benchmarks import common
+
+
+def main():
+    parser = common.parser(__doc__, rows=10000)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+    common.setup()
+
+    import statistics
+
+    from django.core.cache import cache
+    from django.test import Client, override_settings
+    from django.urls import reverse
+
+    from posts.models import AuthorStats
+
+    common.seed_posts(args.rows)
+    AuthorStats.objects.recount()
+
+    # Клиент собирает цепочку middleware при первом запросе, поэтому
+    # выключенное профилирование задаётся до создания клиента.
+    with override_settings(POSTS_PROFILING=False):
+        plain = Client()
+        plain.get("/")
+    profiled = Client()
+
+    pages = (
+        ("index", reverse("posts:index"), False),
+        ("index, cold cache", reverse("posts:index"), True),
+        ("post", reverse("posts:post", args=["bench", 1]), False),
+    )
+    print(f"{args.rows} posts, {args.requests} requests per case")
+    for name, path, cold in pages:
+        def run(client):
+            if cold:
+                cache.clear()
+            client.get(path)
+
+        # Замеры чередуются, чтобы прогрев и шум влияли на оба клиента.
+        samples = {plain: [], profiled: []}
+        for _ in range(args.requests // 50):
+            for client in samples:
+                samples[client] += common.measure(lambda: run(client), 50)
+        common.report(f"{name}, without profiling", samples[plain])
+        common.report(f"{name}, with profiling", samples[profiled])
+        overhead = (
+            statistics.median(samples[profiled])
+            / statistics.median(samples[plain])
+            - 1
+        )
+        print(f"{'':<40} overhead {100 * overhead:+.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Поиск по тексту записей: индекс FTS5 против LIKE '%...%'."""
+import itertools
+import random
+import time
+from io import StringIO
+
+from benchmarks import common
+
+# Словарь с распределением Ципфа: первые слова встречаются в большинстве
+# записей, последние - в единицах.
+WORDS = [f"слово{i}" for i in range(20000)]
+CUM_WEIGHTS = list(
+    itertools.accumulate(1 / (rank + 1) for rank in range(len(WORDS)))
+)
+
+
+def seed(rows, batch_size=10000):
+    from django.contrib.auth import get_user_model
+
+    from posts.models import Post
+
+    author = get_user_model().objects.create_user(username="bench")
+    rng = random.Random(0)
+
+    def text():
+        return " ".join(rng.choices(WORDS, cum_weights=CUM_WEIGHTS, k=20))
+
+    for start in range(0, rows, batch_size):
+        Post.objects.bulk_create(
+            Post(text=text(), author=author)
+            for _ in range(start, min(rows, start + batch_size))
+        )
+
+
+def main():
+    parser = common.parser(__doc__, rows=1000000)
+    parser.add_argument("--pages", type=int, default=50)
+    args = parser.parse_args()
+    common.setup()
+
+    from django.core.management import call_command
+
+    from posts import search
+    from posts.models import Post
+
+    seed(args.rows)
+    started = time.perf_counter()
+    call_command(
+        "rebuild_search_index", "--batch-size=50000", stdout=StringIO()
+    )
+    print(
+        f"{args.rows} posts, index rebuilt in "
+        f"{time.perf_counter() - started:.1f} s"
+    )
+
+    common_word, rare_word = WORDS[10], WORDS[-1]
+    # Курсор на глубокую страницу строится один раз, вне замеров.
+    cursor = None
+    for _ in range(args.pages):
+        _, cursor = search.search_page(common_word, cursor)
+
+    def fts(query, cursor=None):
+        return lambda: search.search_page(query, cursor)
+
+    def like(query):
+        posts = Post.objects.with_related().filter(text__icontains=query)
+        return lambda: list(posts.order_by("-pk")[:10])
+
+    backend = search.get_backend()
+    for name, run in (
+        (f"fts '{common_word}' page 1", fts(common_word)),
+        (f"fts '{common_word}' page {args.pages}", fts(common_word, cursor)),
+        (f"fts '{rare_word}'", fts(rare_word)),
+        ("fts two words", fts(f"{common_word} {WORDS[100]}")),
+        (
+            f"admin count '{rare_word}'",
+            lambda: backend.filter(Post.objects.all(), rare_word).count(),
+        ),
+        (f"like '{common_word}' page 1", like(common_word)),
+        (f"like '{rare_word}'", like(rare_word)),
+    ):
+        common.report(name, common.measure(run, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
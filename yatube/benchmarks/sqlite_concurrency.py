@@ -0,0 +1,132 @@
+"""Чтение страниц под одновременной записью комментариев.
+
+Читатели открывают страницу записи и JSON-ленту, пока писатели добавляют
+комментарии к соседней записи через add_comment. Сравниваются настройки
+SQLite по умолчанию (журнал отката, новое соединение на запрос) и
+настройки из settings.py (WAL, PRAGMA, CONN_MAX_AGE, BEGIN IMMEDIATE).
+Каждый режим запускается в отдельном процессе на своей базе в файле.
+"""
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import common
+
+MODES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "CONN_MAX_AGE": 0,
+        "OPTIONS": {},
+    },
+    # Настройки из settings.py как есть.
+    "tuned": {},
+}
+
+
+# Заполняется до fork: дочерние процессы получают готовые клиенты.
+WORKERS = []
+
+
+def worker(index, deadline):
+    from django.db import connection
+
+    client, paths, method = WORKERS[index]
+    samples, errors = [], []
+    while time.perf_counter() < deadline:
+        for path, data in paths:
+            started = time.perf_counter()
+            try:
+                response = getattr(client, method)(path, data)
+                if response.status_code >= 400:
+                    raise RuntimeError(response.status_code)
+            except Exception as error:
+                errors.append(repr(error))
+            else:
+                samples.append((time.perf_counter() - started) * 1000)
+    connection.close()
+    return method, samples, errors
+
+
+def run(args):
+    directory = tempfile.mkdtemp()
+    common.setup(
+        TEST={"NAME": os.path.join(directory, "bench.sqlite3")},
+        **MODES[args.mode],
+    )
+
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test import Client
+    from django.urls import reverse
+
+    from posts.models import AuthorStats, User
+
+    author, _ = common.seed_posts(args.rows)
+    AuthorStats.objects.recount()
+    # Читается другая запись: список комментариев к записи писателей
+    # растёт, и её рендер заслонил бы ожидание базы.
+    post, other = author.posts.all()[:2]
+    reads = [
+        (reverse("posts:post", args=[author.username, other.pk]), None),
+        (reverse("posts:api_index"), None),
+    ]
+    write = [
+        (
+            reverse("posts:add_comment", args=[author.username, post.pk]),
+            {"text": "Комментарий"},
+        )
+    ]
+    for _ in range(args.readers):
+        WORKERS.append((Client(), reads, "get"))
+    for i in range(args.writers):
+        client = Client()
+        client.force_login(User.objects.create_user(username=f"writer{i}"))
+        WORKERS.append((client, write, "post"))
+    cache.clear()
+    # Процессы, как воркеры gunicorn, не делят ни GIL, ни соединения.
+    connection.close()
+    deadline = time.perf_counter() + args.seconds
+    with multiprocessing.get_context("fork").Pool(len(WORKERS)) as pool:
+        results = pool.starmap(
+            worker, [(index, deadline) for index in range(len(WORKERS))]
+        )
+
+    samples = {"get": [], "post": []}
+    errors = []
+    for method, worker_samples, worker_errors in results:
+        samples[method] += worker_samples
+        errors += worker_errors
+    print(f"{args.mode}: {args.readers} readers, {args.writers} writers")
+    for name, method in (("read", "get"), ("write", "post")):
+        if not samples[method]:
+            print(f"{name:<8} no successful requests")
+            continue
+        print(
+            f"{name:<8} {len(samples[method]) / args.seconds:7.0f} req/s"
+            f"   p50 {common.percentile(samples[method], 50):8.2f} ms"
+            f"   p95 {common.percentile(samples[method], 95):8.2f} ms"
+            f"   p99 {common.percentile(samples[method], 99):8.2f} ms"
+        )
+    print(f"errors   {len(errors)}", *sorted(set(errors))[:3], sep="\n  ")
+
+
+def main():
+    parser = common.parser(__doc__, rows=10000)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--mode", choices=MODES)
+    args = parser.parse_args()
+    if args.mode:
+        run(args)
+        return
+    for mode in MODES:
+        command = [sys.executable, "-m", __spec__.name, *sys.argv[1:]]
+        subprocess.run([*command, "--mode", mode], check=True)
+
+
+if __name__ == "__main__":
+    main()
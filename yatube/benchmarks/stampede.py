@@ -0,0 +1,129 @@
+"""Пересчёт ленты после записи: с защитой от stampede и без неё.
+
+Несколько процессов открывают главную страницу, пока отдельный процесс
+раз в --interval секунд меняет поколение лент, как это делает новая
+запись. Кэш - общий файл SQLite. Без защиты (naive) каждый процесс,
+заставший устаревший фрагмент, рендерит его сам; с защитой рендерит
+один, остальные отдают прежний фрагмент. Считаются рендеры на одну
+смену поколения и время ответа.
+"""
+import multiprocessing
+import os
+import tempfile
+import time
+
+from benchmarks import common
+
+RENDERS_KEY = "benchmarks:stampede:renders"
+
+
+def naive(key, compute, timeout, version=None):
+    """Кэш без блокировки: устаревшее значение пересчитывают все."""
+    from django.core.cache import cache
+
+    entry = cache.get(key)
+    if entry is not None and entry[1] == version:
+        return entry
+    value, cacheable = compute()
+    if cacheable:
+        cache.set(key, (value, version), timeout)
+    return value, version
+
+
+def counted(get_or_compute):
+    from django.core.cache import cache
+
+    def wrapper(key, compute, timeout, version=None):
+        def counting():
+            cache.incr(RENDERS_KEY)
+            return compute()
+
+        return get_or_compute(key, counting, timeout, version)
+
+    return wrapper
+
+
+def reader(deadline):
+    from django.db import connection
+    from django.test import Client
+
+    client = Client()
+    samples = []
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        response = client.get("/")
+        if response.status_code != 200:
+            raise RuntimeError(response.status_code)
+        samples.append((time.perf_counter() - started) * 1000)
+    connection.close()
+    return samples
+
+
+def bumper(deadline, interval):
+    from posts import feed_cache
+
+    bumps = 0
+    while time.perf_counter() + interval < deadline:
+        time.sleep(interval)
+        feed_cache.bump_generation()
+        bumps += 1
+    return bumps
+
+
+def run_mode(name, get_or_compute, args):
+    from django.core.cache import cache
+    from django.db import connection
+
+    from posts import feed_cache
+
+    feed_cache.stampede.get_or_compute = counted(get_or_compute)
+    cache.clear()
+    cache.set(RENDERS_KEY, 0, None)
+    connection.close()
+    deadline = time.perf_counter() + args.seconds
+    with multiprocessing.get_context("fork").Pool(args.readers + 1) as pool:
+        bumps = pool.apply_async(bumper, (deadline, args.interval))
+        readers = [
+            pool.apply_async(reader, (deadline,))
+            for _ in range(args.readers)
+        ]
+        samples = [sample for result in readers for sample in result.get()]
+        bumps = bumps.get()
+    renders = cache.get(RENDERS_KEY)
+    print(
+        f"{name:<10} {renders:5} renders"
+        f"   {renders / max(bumps, 1):5.1f} per bump"
+        f"   {len(samples) / args.seconds:6.0f} req/s"
+        f"   p50 {common.percentile(samples, 50):7.2f} ms"
+        f"   p95 {common.percentile(samples, 95):7.2f} ms"
+        f"   p99 {common.percentile(samples, 99):7.2f} ms"
+    )
+
+
+def main():
+    parser = common.parser(__doc__, rows=10000)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--interval", type=float, default=0.5)
+    args = parser.parse_args()
+    directory = tempfile.mkdtemp()
+    common.setup(TEST={"NAME": os.path.join(directory, "bench.sqlite3")})
+
+    from django.conf import settings
+
+    settings.CACHES["default"] = {
+        "BACKEND": "yatube.backends.sqlite_cache.SqliteCache",
+        "LOCATION": os.path.join(directory, "cache.sqlite3"),
+    }
+
+    from posts import stampede
+
+    protected = stampede.get_or_compute
+    common.seed_posts(args.rows)
+    print(f"{args.readers} readers, new post every {args.interval} s")
+    run_mode("naive", naive, args)
+    run_mode("protected", protected, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Лента подписок: JOIN по Follow против разложенной ленты."""
+from io import StringIO
+
+from benchmarks import common
+
+
+def main():
+    parser = common.parser(__doc__, rows=200000)
+    parser.add_argument("--authors", type=int, default=2000)
+    args = parser.parse_args()
+    common.setup()
+
+    from django.core.management import call_command
+    from django.test import RequestFactory
+
+    from posts import timeline
+    from posts.models import Follow, Post, User
+    from posts.paginators import paginate
+
+    User.objects.bulk_create(
+        User(username=f"author{i}") for i in range(args.authors)
+    )
+    # SQLite не возвращает id из bulk_create.
+    authors = list(User.objects.filter(username__startswith="author"))
+    reader = User.objects.create_user(username="reader")
+    Follow.objects.bulk_create(
+        Follow(user=reader, author=author) for author in authors
+    )
+    for start in range(0, args.rows, 10000):
+        Post.objects.bulk_create(
+            Post(text=f"post {i}", author=authors[i % len(authors)])
+            for i in range(start, min(args.rows, start + 10000))
+        )
+    call_command("recount_counters", stdout=StringIO())
+    call_command("backfill_timelines", reader.username, stdout=StringIO())
+
+    request = RequestFactory().get("/follow/")
+
+    def join():
+        posts = Post.objects.filter(author__following__user=reader)
+        list(paginate(request, posts.with_related()).object_list)
+
+    def fan_out():
+        timeline.get_page(request, reader)
+
+    print(f"{args.rows} posts, reader follows {args.authors} authors")
+    common.report("join over Follow", common.measure(join, args.repeat))
+    common.report("timeline", common.measure(fan_out, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Нормализация загрузок: сколько места и времени декодирования экономит."""
+import time
+from io import BytesIO
+
+from benchmarks import common
+
+
+def camera_jpeg(index, size):
+    """Синтетический снимок с камеры: шум, градиент, EXIF с ориентацией."""
+    from PIL import Image
+
+    noise = Image.effect_noise(size, 24 + index % 16)
+    gradient = Image.linear_gradient("L").resize(size)
+    image = Image.merge(
+        "RGB", (noise, gradient, gradient.rotate(90 * (index % 4)))
+    )
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    exif[0x010F] = "Camera"
+    content = BytesIO()
+    image.save(content, "JPEG", quality=95, exif=exif)
+    return content.getvalue()
+
+
+def decode(content):
+    from PIL import Image
+
+    started = time.perf_counter()
+    Image.open(BytesIO(content)).load()
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = common.parser(__doc__, rows=20)
+    parser.add_argument("--width", type=int, default=4032)
+    parser.add_argument("--height", type=int, default=3024)
+    args = parser.parse_args()
+    common.setup()
+
+    from django.core.files.uploadedfile import SimpleUploadedFile
+
+    from posts import uploads
+
+    samples = [
+        camera_jpeg(i, (args.width, args.height)) for i in range(args.rows)
+    ]
+    normalized = []
+    normalize_ms = []
+    for content in samples:
+        upload = SimpleUploadedFile("photo.jpg", content)
+        started = time.perf_counter()
+        result = uploads.normalize(upload)
+        normalize_ms.append((time.perf_counter() - started) * 1000)
+        normalized.append(result.read())
+
+    original_bytes = sum(map(len, samples))
+    normalized_bytes = sum(map(len, normalized))
+    print(
+        f"{args.rows} images {args.width}x{args.height}: "
+        f"{original_bytes / 2 ** 20:.1f} MiB -> "
+        f"{normalized_bytes / 2 ** 20:.1f} MiB "
+        f"({100 * (1 - normalized_bytes / original_bytes):.0f}% saved)"
+    )
+    common.report("normalize on upload", normalize_ms)
+    common.report("decode original", [decode(c) for c in samples])
+    common.report("decode normalized", [decode(c) for c in normalized])
+
+
+if __name__ == "__main__":
+    main()
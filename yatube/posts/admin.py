@@ -1,13 +1,153 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.auth import admin as auth_admin
+from django.contrib.auth import get_user_model
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.urls import reverse
+from django.utils.functional import cached_property
+from django.utils.html import format_html
 
-from .models import Group, Post
+from . import moderation, search
+from .models import Comment, Follow, Group, Post
+from .paginators import capped_count
 
 
-class PostAdmin(admin.ModelAdmin):
-    list_display = ("pk", "text", "pub_date", "author",)
+class CappedPaginator(Paginator):
+    """Пагинатор списков админки без полного COUNT(*).
+
+    Больше POSTS_COUNT_LIMIT строк не считается: в списке видны первые
+    страницы, остальное находится поиском и фильтрами. Предел должен
+    быть больше list_per_page, иначе админка выведет список целиком.
+    """
+
+    @cached_property
+    def count(self):
+        return capped_count(self.object_list)[0]
+
+
+def report_job(modeladmin, request, job_id):
+    """Показать ссылку на прогресс задачи модерации."""
+    state = moderation.progress(job_id)
+    modeladmin.message_user(
+        request,
+        format_html(
+            "{}: {} строк, <a href=\"{}\">прогресс</a>.",
+            state["action"],
+            state["total"],
+            reverse("moderation_progress", args=[job_id]),
+        ),
+        messages.SUCCESS,
+    )
+
+
+def start_job(modeladmin, request, action, task, queryset, *args):
+    """Запустить задачу модерации и показать ссылку на её прогресс."""
+    job_id = moderation.start(action, task, queryset, *args)
+    report_job(modeladmin, request, job_id)
+
+
+class DeferredDeleteMixin:
+    """Удаление из админки: скрыть сразу, строки удалить в фоне.
+
+    Подклассы задают hide_task(queryset) из moderation, который
+    возвращает id задачи. Страница подтверждения не собирает все
+    связанные строки: у пользователя их может быть миллион.
+    """
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, self.model.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        report_job(self, request, self.hide_task(queryset))
+
+    def get_deleted_objects(self, objs, request):
+        objs = list(objs)
+        perms_needed = set()
+        if not self.has_delete_permission(request):
+            perms_needed.add(self.model._meta.verbose_name)
+        model_count = {self.model._meta.verbose_name_plural: len(objs)}
+        return [str(obj) for obj in objs], model_count, perms_needed, []
+
+
+class PostActionForm(ActionForm):
+    group = forms.ModelChoiceField(
+        Group.objects.all(), required=False, label="Группа"
+    )
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = CappedPaginator
+    # Без второго COUNT(*) по всей таблице ради «N из M».
+    show_full_result_count = False
+    empty_value_display = "-пусто-"
+    # Поля-пользователи, по username которых ищет строка поиска.
+    user_search_fields = ()
+
+    def get_search_results(self, request, queryset, search_term):
+        # Точное имя пользователя сначала превращается в id: поиск
+        # админки через LIKE по username не использует индекс.
+        if not search_term or not self.user_search_fields:
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        users = list(
+            get_user_model().objects.filter(
+                username=search_term.strip()
+            ).values_list("pk", flat=True)
+        )
+        condition = Q()
+        for field in self.user_search_fields:
+            condition |= Q(**{f"{field}_id__in": users})
+        return queryset.filter(condition), False
+
+
+class PostAdmin(DeferredDeleteMixin, LargeTableAdmin):
+    list_display = ("pk", "text", "pub_date", "author", "group")
+    list_select_related = ("author", "group")
+    # Выпадающий список из всех пользователей не рендерится.
+    raw_id_fields = ("author",)
     search_fields = ("text",)
     list_filter = ("pub_date",)
-    empty_value_display = "-пусто-"
+    action_form = PostActionForm
+    actions = ("delete_by_author", "move_to_group")
+    hide_task = staticmethod(moderation.hide_posts)
+
+    def delete_by_author(self, request, queryset):
+        authors = set(queryset.values_list("author_id", flat=True))
+        start_job(
+            self,
+            request,
+            "Удаление записей авторов",
+            moderation.delete_posts,
+            Post.objects.filter(author_id__in=authors),
+        )
+
+    delete_by_author.short_description = "Удалить все записи этих авторов"
+    delete_by_author.allowed_permissions = ("delete",)
+
+    def move_to_group(self, request, queryset):
+        group = request.POST.get("group") or None
+        start_job(
+            self,
+            request,
+            "Перенос записей",
+            moderation.move_posts,
+            queryset,
+            group and Group.objects.get(pk=group),
+        )
+
+    move_to_group.short_description = (
+        "Перенести в выбранную группу (пусто - убрать из группы)"
+    )
+    move_to_group.allowed_permissions = ("change",)
+
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по тексту идёт через индекс, а не через LIKE '%...%'.
+        if not search_term:
+            return queryset, False
+        return search.get_backend().filter(queryset, search_term), False
 
 
 class GroupAdmin(admin.ModelAdmin):
@@ -17,5 +157,47 @@ class GroupAdmin(admin.ModelAdmin):
     empty_value_display = "-пусто-"
 
 
+class CommentAdmin(LargeTableAdmin):
+    list_display = ("pk", "text", "created", "author", "post")
+    list_select_related = ("author", "post")
+    raw_id_fields = ("author", "post")
+    # search_fields включает строку поиска, ищет user_search_fields.
+    search_fields = ("=author__username",)
+    user_search_fields = ("author",)
+    # Сортировка по created без индекса перебирала бы всю таблицу.
+    ordering = ("-pk",)
+    actions = ("purge_authors",)
+
+    def purge_authors(self, request, queryset):
+        authors = set(queryset.values_list("author_id", flat=True))
+        start_job(
+            self,
+            request,
+            "Удаление комментариев авторов",
+            moderation.delete_comments,
+            Comment.objects.filter(author_id__in=authors),
+        )
+
+    purge_authors.short_description = "Удалить все комментарии этих авторов"
+    purge_authors.allowed_permissions = ("delete",)
+
+
+class FollowAdmin(LargeTableAdmin):
+    list_display = ("pk", "user", "author")
+    list_select_related = ("user", "author")
+    raw_id_fields = ("user", "author")
+    search_fields = ("=user__username", "=author__username")
+    user_search_fields = ("user", "author")
+    ordering = ("-pk",)
+
+
+class UserAdmin(DeferredDeleteMixin, auth_admin.UserAdmin):
+    hide_task = staticmethod(moderation.hide_users)
+
+
+admin.site.unregister(get_user_model())
+admin.site.register(get_user_model(), UserAdmin)
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
+admin.site.register(Comment, CommentAdmin)
+admin.site.register(Follow, FollowAdmin)
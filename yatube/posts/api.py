@@ -0,0 +1,96 @@
+"""Лёгкий JSON API лент для мобильных клиентов.
+
+Страницы собираются из строк values() без создания моделей и листаются
+курсором по (pub_date, id). ETag и Last-Modified строятся только по
+поколению лент в кэше, поэтому ответ 304 на неизменившуюся страницу
+обходится без запросов к базе.
+
+Комментарии к записи так же листаются курсором, по (created, id).
+"""
+import hashlib
+
+from django.core.files.storage import default_storage
+from django.db.models import F
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import condition, require_GET
+
+from . import feed_cache, usernames
+from .models import Group, Post, User
+from .paginators import POSTS_PER_PAGE, CursorPaginator, comments_page
+
+
+def feed_etag(request, *args, **kwargs):
+    parts = f"{request.path}:{request.GET.get('cursor', '')}"
+    digest = hashlib.md5(parts.encode()).hexdigest()
+    return f"{feed_cache.generation()}-{digest}"
+
+
+def feed_last_modified(request, *args, **kwargs):
+    return feed_cache.last_modified()
+
+
+conditional_feed = condition(
+    etag_func=feed_etag, last_modified_func=feed_last_modified
+)
+
+
+def feed_response(request, posts):
+    rows = posts.values(
+        "id",
+        "text",
+        "pub_date",
+        "image",
+        "comments_count",
+        author_username=F("author__username"),
+        group_slug=F("group__slug"),
+    )
+    page = CursorPaginator(rows, POSTS_PER_PAGE).get_page(
+        request.GET.get("cursor")
+    )
+    for row in page.object_list:
+        row["image"] = row["image"] and default_storage.url(row["image"])
+    return JsonResponse(
+        {
+            "results": page.object_list,
+            "next": page.next_cursor,
+            "previous": page.previous_cursor,
+        },
+        json_dumps_params={"ensure_ascii": False},
+    )
+
+
+@require_GET
+@conditional_feed
+def index(request):
+    return feed_response(request, Post.objects.visible())
+
+
+@require_GET
+@conditional_feed
+def group_posts(request, slug):
+    group = get_object_or_404(Group.objects.only("pk"), slug=slug)
+    return feed_response(request, group.posts.visible())
+
+
+@require_GET
+@conditional_feed
+def profile(request, username):
+    author = usernames.get_or_404(
+        User.objects.only("pk").filter(is_active=True), username
+    )
+    return feed_response(request, author.posts.visible())
+
+
+@require_GET
+def comments(request, post_id):
+    """Следующая порция комментариев для кнопки «Показать ещё»."""
+    post = get_object_or_404(Post.objects.visible().only("pk"), pk=post_id)
+    rows = post.comments.values(
+        "id", "text", "created", author_username=F("author__username")
+    )
+    rows, next_cursor = comments_page(rows, request.GET.get("cursor"))
+    return JsonResponse(
+        {"results": rows, "next": next_cursor},
+        json_dumps_params={"ensure_ascii": False},
+    )
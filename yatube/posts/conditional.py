@@ -0,0 +1,182 @@
+"""ETag и Last-Modified для HTML-страниц лент и записи.
+
+Версия ленты - поколение лент из feed_cache и данные, которые страница
+показывает помимо записей. Поколение меняет любая запись Post, Comment
+или Group, а также скрытие записей и пользователей, поэтому записи
+ленты до основной выборки не перебираются: MAX(updated_at) по записям
+группы или автора читал бы их все. Last-Modified лент - время последней
+смены поколения. ETag учитывает и зрителя, так как кнопки
+редактирования и подписки у всех разные.
+
+Страница, отрендеренная из устаревших данных или с заглушкой вместо
+миниатюры (feed_cache.mark_stale), уходит без ETag и Last-Modified:
+иначе браузер получал бы на неё 304 до следующей записи.
+"""
+import hashlib
+from functools import wraps
+
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from . import feed_cache, usernames
+from .models import AuthorStats, Follow, Group, Post, User
+
+
+def feed_state(request):
+    """Поколение лент и время его смены, один раз на запрос."""
+    state = getattr(request, "feed_state", None)
+    if state is None:
+        state = request.feed_state = {
+            "generation": feed_cache.generation(),
+            "modified": feed_cache.last_modified(),
+        }
+    return state
+
+
+def make_etag(request, *parts):
+    raw = ":".join(
+        str(part)
+        for part in (request.get_full_path(), request.user.pk, *parts)
+    )
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def index_etag(request):
+    return make_etag(request, feed_state(request)["generation"])
+
+
+def index_last_modified(request):
+    return feed_state(request)["modified"]
+
+
+def group_or_404(request, slug):
+    """Группа страницы, общая для проверки версии и самого view."""
+    group = getattr(request, "feed_group", None)
+    if group is None:
+        group = request.feed_group = get_object_or_404(Group, slug=slug)
+    return group
+
+
+def group_etag(request, slug):
+    group = group_or_404(request, slug)
+    return make_etag(
+        request,
+        group.title,
+        group.description,
+        feed_state(request)["generation"],
+    )
+
+
+def group_last_modified(request, slug):
+    group_or_404(request, slug)
+    return feed_state(request)["modified"]
+
+
+def author_or_404(request, username):
+    """Автор страницы со счётчиками, общий для версии и самого view."""
+    author = getattr(request, "feed_author", None)
+    if author is None:
+        author = request.feed_author = usernames.get_or_404(
+            User.objects.select_related("stats").filter(is_active=True),
+            username,
+        )
+    return author
+
+
+def is_following(request, author):
+    following = getattr(request, "feed_following", None)
+    if following is None:
+        following = request.feed_following = (
+            request.user.is_authenticated
+            and Follow.objects.filter(
+                author=author, user=request.user
+            ).exists()
+        )
+    return following
+
+
+def profile_etag(request, username):
+    author = author_or_404(request, username)
+    stats = AuthorStats.objects.for_user(author)
+    return make_etag(
+        request,
+        author.get_full_name(),
+        stats.posts_count,
+        stats.followers_count,
+        stats.following_count,
+        is_following(request, author),
+        feed_state(request)["generation"],
+    )
+
+
+def profile_last_modified(request, username):
+    author_or_404(request, username)
+    return feed_state(request)["modified"]
+
+
+def post_version(request, username, post_id):
+    """Запись и счётчики автора.
+
+    Новый, изменённый или удалённый комментарий обновляет updated_at
+    записи, поэтому сами комментарии не перебираются.
+    """
+    version = getattr(request, "post_version", None)
+    if version is None and usernames.might_exist(username):
+        version = request.post_version = (
+            Post.objects.visible()
+            .filter(pk=post_id, author__username=username)
+            .values_list(
+                "updated_at",
+                "author__first_name",
+                "author__last_name",
+                "author__stats__posts_count",
+                "author__stats__followers_count",
+                "author__stats__following_count",
+            )
+            .first()
+        )
+    return version
+
+
+def post_etag(request, username, post_id):
+    version = post_version(request, username, post_id)
+    if version is None:
+        return None
+    # В форме комментария CSRF-токен: вход меняет секрет, и форма из
+    # кэша браузера после этого отдавала бы 403.
+    return make_etag(request, request.META.get("CSRF_COOKIE"), *version)
+
+
+def post_last_modified(request, username, post_id):
+    version = post_version(request, username, post_id)
+    # По одному If-Modified-Since смену CSRF-секрета не заметить.
+    if version is None or request.user.is_authenticated:
+        return None
+    return version[0]
+
+
+def conditional(etag_func, last_modified_func):
+    """condition(), который не ставит версию устаревшей странице."""
+
+    def decorator(view):
+        conditional_view = condition(etag_func, last_modified_func)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if getattr(request, "feed_stale", False):
+                del response["ETag"]
+                del response["Last-Modified"]
+                patch_cache_control(response, no_cache=True)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+conditional_index = conditional(index_etag, index_last_modified)
+conditional_group = conditional(group_etag, group_last_modified)
+conditional_profile = conditional(profile_etag, profile_last_modified)
+conditional_post = conditional(post_etag, post_last_modified)
@@ -0,0 +1,172 @@
+"""Кэш отрендеренных страниц лент и отдельных записей.
+
+Ключ фрагмента ленты включает тип ленты, её параметры и страницу, а
+значение хранится вместе с номером поколения. Любая запись Post, Comment
+или Group увеличивает поколение, поэтому фрагменты живут долго, но
+устаревают сразу после изменений.
+
+Фрагмент записи общий для всех лент и хранится вместе с отпечатком
+данных, из которых он собран: правка текста, картинки, группы или имени
+автора меняет отпечаток, и фрагмент рендерится заново.
+
+Попадания и промахи кэша лент считаются в памяти процесса, без записи в
+общий кэш на каждый рендер; сотрудники видят их на /internal/profiling/.
+"""
+import hashlib
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import routers, stampede
+
+RENDER_STATE = "posts_render_state"
+GENERATION_KEY = "posts:feed:generation"
+MODIFIED_KEY = "posts:feed:modified"
+
+counters_lock = Lock()
+counters = Counter()
+
+
+def mark_stale(context):
+    """На странице устаревшие или временные данные: ответ уходит без ETag.
+
+    ETag страницы считается до рендера из текущего поколения; с ним
+    браузер держал бы устаревшую страницу до следующей записи.
+    """
+    request = getattr(context, "request", None)
+    if request is not None:
+        request.feed_stale = True
+
+
+def mark_incomplete(context):
+    """Не кэшировать текущий фрагмент: в нём временные данные."""
+    state = context.get(RENDER_STATE)
+    if state is not None:
+        state["incomplete"] = True
+    # Пока миниатюра создаётся, страница с заглушкой не получает ETag:
+    # готовая миниатюра не меняет ни поколение, ни updated_at.
+    mark_stale(context)
+
+
+def render_tracked(context, nodelist):
+    outer = context.get(RENDER_STATE)
+    with context.push(**{RENDER_STATE: {}}):
+        content = nodelist.render(context)
+        complete = not context[RENDER_STATE]
+    if not complete and outer is not None:
+        outer["incomplete"] = True
+    return content, complete
+
+
+def generation():
+    value = cache.get(GENERATION_KEY)
+    if value is None:
+        # Поколение начинается с текущего времени, чтобы после вытеснения
+        # ключа из кэша не совпасть со старыми фрагментами.
+        cache.add(GENERATION_KEY, int(time.time() * 1000), None)
+        value = cache.get(GENERATION_KEY)
+    return value
+
+
+def bump_generation():
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        generation()
+    cache.set(MODIFIED_KEY, time.time(), None)
+
+
+def last_modified():
+    """Время последнего изменения лент для заголовка Last-Modified."""
+    value = cache.get(MODIFIED_KEY)
+    if value is None:
+        cache.add(MODIFIED_KEY, time.time(), None)
+        value = cache.get(MODIFIED_KEY)
+    return datetime.fromtimestamp(value, timezone.utc)
+
+
+def increment(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def page_key(page):
+    return (
+        page.number,
+        getattr(page, "previous_cursor", None),
+        getattr(page, "next_cursor", None),
+    )
+
+
+def make_key(feed, page, *vary_on):
+    parts = ":".join(str(part) for part in (*page_key(page), *vary_on))
+    digest = hashlib.md5(parts.encode()).hexdigest()
+    return f"posts:feed:{feed}:{digest}"
+
+
+def get_or_render(context, key, render):
+    """Фрагмент ленты текущего поколения.
+
+    Поколение - версия значения, а не часть ключа: после записи один
+    процесс рендерит фрагмент заново, остальные на это время отдают
+    фрагмент прошлого поколения и помечают страницу устаревшей.
+    """
+    rendered = False
+
+    def compute():
+        nonlocal rendered
+        rendered = True
+        return render()
+
+    timeout = settings.POSTS_FEED_CACHE_TIMEOUT
+    if routers.reads_from_replica():
+        # Реплика могла ещё не получить запись, которая уже сменила
+        # поколение. Такой фрагмент живёт не дольше допустимого
+        # отставания реплики.
+        timeout = min(timeout, settings.POSTS_REPLICA_PIN_SECONDS)
+    current = generation()
+    content, version = stampede.get_or_compute(
+        key, compute, timeout, current
+    )
+    if version != current:
+        mark_stale(context)
+    with counters_lock:
+        counters["misses" if rendered else "hits"] += 1
+    return content
+
+
+def post_fingerprint(post):
+    group = post.group
+    return (
+        post.text,
+        post.image.name,
+        post.author.username,
+        group and (group.pk, group.slug, group.title),
+    )
+
+
+def get_or_render_post(post, render):
+    key = f"posts:post:{post.pk}"
+    fingerprint = post_fingerprint(post)
+    cached = cache.get(key)
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+    content, complete = render()
+    if complete:
+        cache.set(
+            key, (fingerprint, content), settings.POSTS_POST_CACHE_TIMEOUT
+        )
+    return content
+
+
+def stats():
+    """Попадания и промахи кэша лент в этом процессе."""
+    with counters_lock:
+        hits, misses = counters["hits"], counters["misses"]
+    return {"hits": hits, "misses": misses, "generation": generation()}
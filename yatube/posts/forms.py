@@ -1,5 +1,10 @@
 from django import forms
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
+from django.template.defaultfilters import filesizeformat
 
+from . import uploads
 from .models import Comment, Post
 
 
@@ -13,6 +18,25 @@ class PostForm(forms.ModelForm):
             "image": "Добавьте картинку",
         }
 
+    def clean_image(self):
+        image = self.cleaned_data["image"]
+        # При редактировании без новой загрузки здесь старый файл записи.
+        if not isinstance(image, UploadedFile):
+            return image
+        limit = settings.POSTS_IMAGE_MAX_UPLOAD_SIZE
+        if image.size > limit:
+            raise ValidationError(
+                "Файл больше %s." % filesizeformat(limit),
+                code="file_too_large",
+            )
+        try:
+            return uploads.normalize(image)
+        except uploads.DECODE_ERRORS as exc:
+            raise ValidationError(
+                self.fields["image"].error_messages["invalid_image"],
+                code="invalid_image",
+            ) from exc
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = "Заново раскладывает записи по лентам подписок."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "usernames", nargs="*", help="Только ленты этих пользователей."
+        )
+
+    def handle(self, *args, **options):
+        if not options["usernames"]:
+            done = timeline.rebuild_all()
+            self.stdout.write(
+                self.style.SUCCESS(f"Ленты пересобраны, записей: {done}")
+            )
+            return
+        users = User.objects.filter(
+            follower__isnull=False, username__in=options["usernames"]
+        ).distinct()
+        done = 0
+        for user_id in users.order_by("pk").values_list("pk", flat=True):
+            timeline.rebuild_user(user_id)
+            done += 1
+            if done % 1000 == 0:
+                self.stdout.write(f"users: {done}")
+        self.stdout.write(self.style.SUCCESS(f"Ленты пересобраны: {done}"))
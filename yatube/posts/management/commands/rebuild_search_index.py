@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import search
+from posts.models import Post
+
+from .recount_counters import batches
+
+
+class Command(BaseCommand):
+    help = "Пересобирает поисковый индекс по тексту записей."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        backend = search.get_backend()
+        done = 0
+        with transaction.atomic():
+            backend.clear()
+            posts = Post.objects.only("pk", "text")
+            for batch, size in batches(posts, options["batch_size"]):
+                backend.index(batch, replace=False)
+                done += size
+                self.stdout.write(f"posts: {done}")
+        self.stdout.write(self.style.SUCCESS("Поисковый индекс пересобран"))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import AuthorStats, Post, User
+
+
+def batches(queryset, batch_size):
+    """Нарезать таблицу на диапазоны первичного ключа."""
+    last_pk = 0
+    while True:
+        pks = list(
+            queryset.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not pks:
+            return
+        yield queryset.filter(pk__gt=last_pk, pk__lte=pks[-1]), len(pks)
+        last_pk = pks[-1]
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает счётчики комментариев, записей и подписок."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        done = 0
+        for posts, size in batches(Post.objects.all(), batch_size):
+            posts.recount_comments()
+            done += size
+            self.stdout.write(f"posts: {done}")
+        done = 0
+        for users, size in batches(User.objects.all(), batch_size):
+            AuthorStats.objects.recount(users)
+            done += size
+            self.stdout.write(f"users: {done}")
+        self.stdout.write(self.style.SUCCESS("Счётчики пересчитаны"))
@@ -0,0 +1,52 @@
+import sqlite3
+import time
+from contextlib import closing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def copy_database(source, target):
+    """Скопировать файл SQLite целиком через backup API.
+
+    В отличие от копирования файла, backup берёт согласованный снимок
+    и не мешает открытым соединениям источника.
+    """
+    with closing(sqlite3.connect(source)) as src:
+        with closing(sqlite3.connect(target)) as dst:
+            src.backup(dst)
+
+
+class Command(BaseCommand):
+    help = (
+        "Копирует основную базу SQLite в файлы реплик. Замена "
+        "настоящей репликации для локальной проверки чтения с реплик."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help=(
+                "Повторять копирование через столько секунд (задержка "
+                "реплики); 0 - скопировать один раз."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        replicas = settings.POSTS_READ_REPLICAS
+        if not replicas:
+            raise CommandError("Реплики не настроены: POSTS_READ_REPLICAS.")
+        source = settings.DATABASES["default"]["NAME"]
+        while True:
+            started = time.perf_counter()
+            for alias in replicas:
+                copy_database(source, settings.DATABASES[alias]["NAME"])
+            self.stdout.write(
+                f"{', '.join(replicas)}: "
+                f"{(time.perf_counter() - started) * 1000:.0f} мс"
+            )
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
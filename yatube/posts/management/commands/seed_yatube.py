@@ -0,0 +1,273 @@
+import random
+import time
+from contextlib import contextmanager
+from io import BytesIO, StringIO
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Max
+from PIL import Image
+
+from posts import feed_cache, usernames
+from posts.models import Comment, Follow, Group, Post, User
+
+from .recount_counters import batches
+
+# Только на время наполнения: без fsync после каждой транзакции и с
+# большим кэшем страниц. Прежние значения возвращаются в конце.
+SQLITE_PRAGMAS = {
+    "synchronous": "OFF",
+    "temp_store": "MEMORY",
+    "cache_size": -256 * 1024,
+}
+IMAGES = 8
+
+
+@contextmanager
+def fast_sqlite():
+    # Внутри транзакции SQLite не даёт менять synchronous.
+    if connection.vendor != "sqlite" or connection.in_atomic_block:
+        yield
+        return
+    with connection.cursor() as cursor:
+        saved = {}
+        for name, value in SQLITE_PRAGMAS.items():
+            saved[name] = cursor.execute(f"PRAGMA {name}").fetchone()[0]
+            cursor.execute(f"PRAGMA {name} = {value}")
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for name, value in saved.items():
+                cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def seed_images():
+    """Несколько одноцветных картинок, общих для всех записей."""
+    names = []
+    for i in range(IMAGES):
+        name = f"posts/seed/{i}.jpg"
+        if not default_storage.exists(name):
+            content = BytesIO()
+            color = (i * 32 % 256, 96, 255 - i * 32 % 256)
+            Image.new("RGB", (960, 540), color).save(content, "JPEG")
+            default_storage.save(name, ContentFile(content.getvalue()))
+        names.append(name)
+    return names
+
+
+class Command(BaseCommand):
+    help = (
+        "Наполняет базу синтетическими пользователями, группами, "
+        "записями, комментариями и подписками."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--groups", type=int, default=20)
+        parser.add_argument("--posts", type=int, default=10000)
+        parser.add_argument(
+            "--comments-per-post",
+            type=float,
+            default=2,
+            help="Среднее число комментариев к записи.",
+        )
+        parser.add_argument(
+            "--follows-per-user",
+            type=float,
+            default=10,
+            help="Среднее число подписок пользователя.",
+        )
+        parser.add_argument(
+            "--followers-alpha",
+            type=float,
+            default=1,
+            help=(
+                "Показатель степенного закона популярности авторов: "
+                "чем больше, тем сильнее подписчики и записи "
+                "сосредоточены у первых авторов."
+            ),
+        )
+        parser.add_argument(
+            "--image-ratio",
+            type=float,
+            default=0.1,
+            help="Доля записей с картинкой.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--skip-timelines",
+            action="store_true",
+            help="Не раскладывать ленты подписок.",
+        )
+
+    def handle(self, *args, **options):
+        if options["users"] < 1:
+            raise CommandError("Нужен хотя бы один пользователь.")
+        self.rnd = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        self.total = 0
+        started = time.perf_counter()
+        # bulk_create не отправляет post_save, поэтому построчные сигналы
+        # (счётчики, ленты, поиск, кэш лент) не срабатывают. Производные
+        # данные пересобираются целиком в конце.
+        with fast_sqlite():
+            users = self.create_users(options["users"])
+            groups = self.create_groups(options["groups"])
+            weights = list(
+                accumulate(
+                    1 / rank ** options["followers_alpha"]
+                    for rank in range(1, len(users) + 1)
+                )
+            )
+            posts = self.create_posts(
+                options["posts"], users, groups, options["image_ratio"]
+            )
+            self.create_comments(posts, users, options["comments_per_post"])
+            self.create_follows(users, weights, options["follows_per_user"])
+            self.rebuild(options["skip_timelines"])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Готово: {self.total} строк за {elapsed:.1f} с, "
+                f"{self.total / elapsed:.0f} строк/с"
+            )
+        )
+
+    def insert(self, model, objects):
+        started = time.perf_counter()
+        objects = iter(objects)
+        done = 0
+        while True:
+            batch = list(islice(objects, self.batch_size))
+            if not batch:
+                break
+            model.objects.bulk_create(batch)
+            done += len(batch)
+        elapsed = time.perf_counter() - started
+        self.total += done
+        self.stdout.write(
+            f"{model._meta.model_name}: {done} строк, "
+            f"{done / elapsed if elapsed else 0:.0f} строк/с"
+        )
+
+    def new_pks(self, model, after):
+        # SQLite не возвращает id из bulk_create.
+        return list(
+            model.objects.filter(pk__gt=after)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+
+    def create_users(self, count):
+        start = User.objects.aggregate(last=Max("pk"))["last"] or 0
+        # Хэш пароля считается один раз: PBKDF2 на каждого пользователя
+        # занял бы почти всё время наполнения.
+        password = make_password("yatube")
+        self.insert(
+            User,
+            (
+                User(username=f"user{start + i}", password=password)
+                for i in range(1, count + 1)
+            ),
+        )
+        return self.new_pks(User, start)
+
+    def create_groups(self, count):
+        start = Group.objects.aggregate(last=Max("pk"))["last"] or 0
+        self.insert(
+            Group,
+            (
+                Group(
+                    title=f"Группа {start + i}",
+                    slug=f"group-{start + i}",
+                    description=f"Описание группы {start + i}",
+                )
+                for i in range(1, count + 1)
+            ),
+        )
+        return self.new_pks(Group, start)
+
+    def create_posts(self, count, users, groups, image_ratio):
+        start = Post.objects.aggregate(last=Max("pk"))["last"] or 0
+        images = seed_images() if image_ratio else []
+        rnd = self.rnd
+
+        def generate():
+            for i in range(count):
+                # Авторы пишут поровну: если бы популярные ещё и писали
+                # больше, их записи в лентах подписчиков росли бы как
+                # произведение двух степенных законов.
+                author = rnd.choice(users)
+                yield Post(
+                    text=f"Запись {start + i + 1} автора {author}",
+                    author_id=author,
+                    group_id=(
+                        rnd.choice(groups)
+                        if groups and rnd.random() < 0.7
+                        else None
+                    ),
+                    image=(
+                        rnd.choice(images)
+                        if rnd.random() < image_ratio
+                        else ""
+                    ),
+                )
+
+        self.insert(Post, generate())
+        return start
+
+    def create_comments(self, posts_after, users, per_post):
+        rnd = self.rnd
+
+        def generate():
+            if not per_post:
+                return
+            posts = Post.objects.filter(pk__gt=posts_after)
+            for batch, _ in batches(posts, self.batch_size):
+                for post_id in batch.values_list("pk", flat=True):
+                    for i in range(int(rnd.expovariate(1 / per_post))):
+                        yield Comment(
+                            post_id=post_id,
+                            author_id=rnd.choice(users),
+                            text=f"Комментарий {i + 1}",
+                        )
+
+        self.insert(Comment, generate())
+
+    def create_follows(self, users, weights, per_user):
+        rnd = self.rnd
+
+        def generate():
+            if not per_user:
+                return
+            for user_id in users:
+                count = int(rnd.expovariate(1 / per_user))
+                authors = set(rnd.choices(users, cum_weights=weights, k=count))
+                authors.discard(user_id)
+                for author_id in sorted(authors):
+                    yield Follow(user_id=user_id, author_id=author_id)
+
+        self.insert(Follow, generate())
+
+    def rebuild(self, skip_timelines):
+        commands = ["recount_counters", "rebuild_search_index"]
+        if not skip_timelines:
+            # Ленты раскладываются после счётчиков: по числу подписчиков
+            # определяются авторы, которых не раскладывают.
+            commands.insert(1, "backfill_timelines")
+        for name in commands:
+            started = time.perf_counter()
+            call_command(name, stdout=StringIO())
+            self.stdout.write(
+                f"{name}: {time.perf_counter() - started:.1f} с"
+            )
+        feed_cache.bump_generation()
+        # Пользователи вставлены bulk_create, без сигналов.
+        usernames.users_added()
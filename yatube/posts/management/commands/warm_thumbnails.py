@@ -0,0 +1,76 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import thumbnails
+from posts.models import Post
+
+from .recount_counters import batches
+
+
+class Command(BaseCommand):
+    help = (
+        "Создаёт недостающие миниатюры картинок записей пулом процессов. "
+        "Готовые миниатюры пропускаются, поэтому прерванный запуск можно "
+        "просто повторить или продолжить с --from-pk."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count(),
+            help="Число процессов; 0 - создавать в текущем процессе.",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--from-pk", type=int, default=0)
+        parser.add_argument(
+            "--force", action="store_true",
+            help="Пересоздать и уже готовые миниатюры.",
+        )
+
+    def handle(self, *args, **options):
+        force = options["force"]
+        images = Post.objects.filter(pk__gt=options["from_pk"]).exclude(
+            image=""
+        )
+        total = images.count()
+        done = generated = failed = 0
+        started = time.perf_counter()
+        if options["workers"]:
+            # Соединения не должны переходить в дочерние процессы.
+            connections.close_all()
+            pool = ProcessPoolExecutor(
+                max_workers=options["workers"], initializer=django.setup
+            )
+        else:
+            pool = nullcontext()
+        with pool:
+            run = pool.map if options["workers"] else map
+            for batch, size in batches(images, options["batch_size"]):
+                rows = list(batch.order_by("pk").values_list("pk", "image"))
+                names = [name for _, name in rows]
+                if not force:
+                    names = thumbnails.missing(names)
+                results = run(
+                    thumbnails.generate, names, [force] * len(names)
+                )
+                ok = sum(results)
+                generated += ok
+                failed += len(names) - ok
+                done += size
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"{done}/{total} images, last pk {rows[-1][0]}: "
+                    f"generated {generated}, failed {failed}, "
+                    f"{done / elapsed:.1f} images/s"
+                )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Готово: {done} картинок за {elapsed:.1f} с "
+            f"({done / max(elapsed, 1e-9):.1f} images/s), "
+            f"создано {generated}, ошибок {failed}"
+        ))
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+TABLE = "posts_post_search"
+
+
+def create_index(apps, schema_editor):
+    # Индекс FTS5 есть только у SQLite; другие базы используют
+    # запасной бэкенд поиска из posts.search.
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    Post = apps.get_model("posts", "Post")
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE {TABLE} USING fts5("
+        "text, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        f"INSERT INTO {TABLE} (rowid, text) "
+        f"SELECT id, text FROM {Post._meta.db_table}"
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0003_timeline'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 2.2.6 on 2026-10-17 04:44
+
+from django.db import migrations, models
+
+
+def fill_updated_at(apps, schema_editor):
+    # Существующие записи и комментарии не менялись с публикации.
+    Post = apps.get_model("posts", "Post")
+    Comment = apps.get_model("posts", "Comment")
+    Post.objects.update(updated_at=models.F("pub_date"))
+    Comment.objects.update(updated_at=models.F("created"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0004_post_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.RunPython(fill_updated_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 2.2.6 on 2026-10-17 05:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_comment_post_created'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='hidden',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['hidden', '-pub_date'], name='posts_post_hidden_62e63a_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 2.2.6 on 2026-10-17 06:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_unfanned(apps, schema_editor):
+    # Записи авторов выше порога до сих пор подмешивались при чтении.
+    AuthorStats = apps.get_model("posts", "AuthorStats")
+    AuthorStats.objects.filter(
+        followers_count__gt=settings.POSTS_TIMELINE_FANOUT_LIMIT
+    ).update(fanned_out=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_post_hidden'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='authorstats',
+            name='fanned_out',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.RunPython(mark_unfanned, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
 
 User = get_user_model()
 
@@ -16,6 +17,32 @@ class Group(models.Model):
         return self.title
 
 
+def count_rows(model, field, **filters):
+    """Коррелированный подзапрос: число строк model, ссылающихся на pk."""
+    rows = (
+        model.objects.filter(**{field: models.OuterRef("pk")}, **filters)
+        .order_by()
+        .values(field)
+        .annotate(count=models.Count("pk"))
+        .values("count")
+    )
+    return Coalesce(
+        models.Subquery(rows, output_field=models.IntegerField()), 0
+    )
+
+
+class PostQuerySet(models.QuerySet):
+    def with_related(self):
+        return self.select_related("author", "group")
+
+    def visible(self):
+        """Записи без скрытых и без записей удаляемых авторов."""
+        return self.filter(hidden=False, author__is_active=True)
+
+    def recount_comments(self):
+        return self.update(comments_count=count_rows(Comment, "post"))
+
+
 class Post(models.Model):
     text = models.TextField()
     pub_date = models.DateTimeField(
@@ -32,9 +59,19 @@ class Post(models.Model):
         null=True,
     )
     image = models.ImageField(upload_to="posts/", blank=True, null=True)
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+    # Меняется и при новом или удалённом комментарии: от него зависят
+    # ETag и Last-Modified страниц записи.
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # Запись ждёт фонового удаления и уже не видна в лентах.
+    hidden = models.BooleanField(default=False, editable=False)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ["-pub_date"]
+        # Главная лента: равенство по hidden и порядок по дате.
+        indexes = [models.Index(fields=["hidden", "-pub_date"])]
 
     def __str__(self):
         return self.text[:15]
@@ -49,9 +86,11 @@ class Comment(models.Model):
     )
     text = models.TextField()
     created = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["created"]
+        indexes = [models.Index(fields=["post", "created"])]
 
     def __str__(self):
         return self.text
@@ -70,3 +109,98 @@ class Follow(models.Model):
 
     def __str__(self):
         return f"user: {self.user.username} author: {self.author.username}"
+
+
+def real_counts():
+    """Выражения счётчиков AuthorStats по фактическим строкам в базе.
+
+    Подзапросы ссылаются на pk: у User это id, у AuthorStats - user_id.
+    """
+    return {
+        # Скрытые записи ждут удаления и в профиле не видны.
+        "posts_count": count_rows(Post, "author", hidden=False),
+        "followers_count": count_rows(Follow, "author"),
+        "following_count": count_rows(Follow, "user"),
+    }
+
+
+class AuthorStatsManager(models.Manager):
+    def recount(self, users=None):
+        """Пересчитать счётчики по фактическим строкам в базе.
+
+        Строки не удаляются: недостающие добавляются с пропуском уже
+        существующих, затем все обновляются одним UPDATE. Параллельный
+        пересчёт не падает на уникальности, а читатели всё время видят
+        строку. fanned_out - не счётчик, а состояние лент, и не меняется.
+        """
+        if users is None:
+            users = User.objects.all()
+        with transaction.atomic():
+            self.bulk_create(
+                (
+                    AuthorStats(user_id=pk)
+                    for pk in users.values_list("pk", flat=True).iterator()
+                ),
+                batch_size=500,
+                ignore_conflicts=True,
+            )
+            self.filter(user__in=users).update(**real_counts())
+
+    def for_user(self, user):
+        """Счётчики пользователя.
+
+        Если строки AuthorStats нет, они считаются без записи в базу:
+        страницы читаются GET-запросами, а строку создают сигнал
+        регистрации и recount_counters.
+        """
+        try:
+            return user.stats
+        except AuthorStats.DoesNotExist:
+            counts = real_counts()
+            values = (
+                User.objects.filter(pk=user.pk)
+                .annotate(**counts)
+                .values(*counts)
+                .get()
+            )
+            return AuthorStats(user=user, **values)
+
+
+class AuthorStats(models.Model):
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name="stats"
+    )
+    posts_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+    # False, пока часть записей автора не разложена по лентам подписчиков
+    # и подмешивается в них при чтении.
+    fanned_out = models.BooleanField(default=True)
+
+    objects = AuthorStatsManager()
+
+    def __str__(self):
+        return f"stats: {self.user_id}"
+
+
+class TimelineEntry(models.Model):
+    """Запись ленты подписок, разложенная подписчику при публикации."""
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="timeline"
+    )
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="timeline_entries"
+    )
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="+"
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ["-pub_date"]
+        unique_together = ("user", "post")
+        indexes = [models.Index(fields=["user", "-pub_date"])]
+
+    def __str__(self):
+        return f"timeline: {self.user_id} post: {self.post_id}"
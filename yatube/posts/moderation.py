@@ -0,0 +1,283 @@
+"""Массовая модерация: удаление и перенос записей и комментариев пачками.
+
+Удаление через QuerySet.delete() собирает в памяти все связанные строки
+и держит блокировку записи SQLite, пока не удалит их в одной
+транзакции. Обработчики сигналов при этом срабатывают на каждую строку.
+Здесь строки обрабатываются пачками по CHUNK_SIZE, каждая пачка - в
+своей короткой транзакции, а счётчики, поисковый индекс и поколение лент
+обновляются один раз на пачку. Между пачками база открыта для других
+запросов.
+
+Задача выполняется в фоновом потоке, её прогресс хранится в кэше и
+доступен по moderation_progress. Файлы картинок и их миниатюры
+удаляются последним шагом, уже после удаления строк.
+
+Удаление из админки сначала скрывает записи (Post.hidden) или
+пользователя (is_active = False) одним коротким UPDATE: ленты
+показывают только Post.objects.visible(), поэтому содержимое пропадает
+сразу, а строки удаляются пачками уже в фоне.
+"""
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import Count, F, Q
+from django.http import Http404, JsonResponse
+from django.utils import timezone
+
+from . import feed_cache, search, thumbnails
+from .models import AuthorStats, Comment, Follow, Post, TimelineEntry, User
+
+logger = logging.getLogger(__name__)
+
+# Строк в одной транзакции; заодно в пределах числа параметров SQLite.
+CHUNK_SIZE = 500
+PROGRESS_TIMEOUT = 24 * 60 * 60
+
+executor = None
+executor_lock = Lock()
+
+
+def progress_key(job_id):
+    return f"posts:moderation:{job_id}"
+
+
+def progress(job_id):
+    return cache.get(progress_key(job_id))
+
+
+def update_progress(job_id, **fields):
+    state = progress(job_id) or {}
+    state.update(fields)
+    cache.set(progress_key(job_id), state, PROGRESS_TIMEOUT)
+
+
+def start(action, task, queryset, *args, total=None):
+    """Запустить task(job_id, queryset, *args) в фоне и вернуть id задачи.
+
+    Без фоновых потоков (POSTS_MODERATION_WORKERS = 0) задача выполняется
+    сразу. По умолчанию total - число строк queryset.
+    """
+    job_id = uuid.uuid4().hex
+    if total is None:
+        total = queryset.count()
+    update_progress(
+        job_id, action=action, state="queued", done=0, total=total
+    )
+    if not settings.POSTS_MODERATION_WORKERS:
+        run(job_id, task, queryset, *args)
+        return job_id
+    # Поток стартует после коммита: в транзакции админки задача ещё не
+    # увидит изменений, сделанных до неё.
+    transaction.on_commit(lambda: submit(job_id, task, queryset, *args))
+    return job_id
+
+
+def submit(*args):
+    global executor
+    with executor_lock:
+        if executor is None:
+            executor = ThreadPoolExecutor(
+                max_workers=settings.POSTS_MODERATION_WORKERS,
+                thread_name_prefix="moderation",
+            )
+    executor.submit(run, *args)
+
+
+def run(job_id, task, queryset, *args):
+    update_progress(job_id, state="running")
+    try:
+        task(job_id, queryset, *args)
+    except Exception:
+        logger.exception("Moderation job %s failed", job_id)
+        update_progress(job_id, state="failed")
+        raise
+    else:
+        update_progress(job_id, state="done")
+    finally:
+        if settings.POSTS_MODERATION_WORKERS:
+            connections.close_all()
+
+
+def chunks(queryset):
+    """id строк queryset пачками по возрастанию.
+
+    Каждая пачка выбирается заново после pk предыдущей, поэтому
+    удаление строк между пачками ничего не сдвигает.
+    """
+    queryset = queryset.order_by("pk").values_list("pk", flat=True)
+    last = 0
+    while True:
+        ids = list(queryset.filter(pk__gt=last)[:CHUNK_SIZE])
+        if not ids:
+            return
+        yield ids
+        last = ids[-1]
+
+
+def advance(job_id, count):
+    state = progress(job_id) or {}
+    update_progress(job_id, done=state.get("done", 0) + count)
+
+
+def delete_post_rows(ids):
+    """Удалить записи и всё, что на них ссылается, без сигналов.
+
+    Возвращает имена картинок удалённых записей.
+    """
+    posts = Post.objects.filter(pk__in=ids)
+    with transaction.atomic():
+        rows = list(posts.values_list("image", "author_id"))
+        TimelineEntry.objects.filter(post_id__in=ids).delete()
+        # _raw_delete - тот же DELETE ... WHERE, которым Django удаляет
+        # строки без сигналов, без выборки их в память.
+        comments = Comment.objects.filter(post_id__in=ids)
+        comments._raw_delete(comments.db)
+        posts._raw_delete(posts.db)
+        search.get_backend().remove(ids)
+        AuthorStats.objects.recount(
+            User.objects.filter(pk__in={author for _, author in rows})
+        )
+    return [image for image, _ in rows if image]
+
+
+def delete_posts(job_id, queryset):
+    images = []
+    for ids in chunks(queryset):
+        images += delete_post_rows(ids)
+        feed_cache.bump_generation()
+        advance(job_id, len(ids))
+    update_progress(job_id, state="deleting files")
+    delete_images(images)
+
+
+def hide_posts(queryset):
+    """Скрыть записи из лент и запустить их удаление. Вернуть id задачи.
+
+    Счётчик записей автора уменьшается сразу: профиль не должен ждать
+    фонового удаления.
+    """
+    ids = list(queryset.values_list("pk", flat=True))
+    posts = Post.objects.filter(pk__in=ids)
+    visible = posts.filter(hidden=False)
+    with transaction.atomic():
+        counts = list(
+            visible.order_by()
+            .values_list("author_id")
+            .annotate(count=Count("pk"))
+        )
+        visible.update(hidden=True)
+        for author_id, count in counts:
+            AuthorStats.objects.filter(user_id=author_id).update(
+                posts_count=F("posts_count") - count
+            )
+    feed_cache.bump_generation()
+    return start("Удаление записей", delete_posts, posts, total=len(ids))
+
+
+def hide_users(queryset):
+    """Скрыть пользователей вместе с записями и запустить их удаление.
+
+    Вернуть id задачи. В прогрессе считаются записи и комментарии.
+    """
+    ids = list(queryset.values_list("pk", flat=True))
+    users = User.objects.filter(pk__in=ids)
+    users.update(is_active=False)
+    feed_cache.bump_generation()
+    total = (
+        Post.objects.filter(author_id__in=ids).count()
+        + Comment.objects.filter(author_id__in=ids).count()
+    )
+    return start("Удаление пользователей", delete_users, users, total=total)
+
+
+def delete_users(job_id, queryset):
+    """Удалить пользователей; всё, что на них ссылается, - пачками.
+
+    Последним идёт user.delete(): к этому моменту у пользователя
+    остаются только единичные строки вроде AuthorStats.
+    """
+    for user in queryset:
+        posts = Post.objects.filter(author=user)
+        # Записи неактивного автора и так не видны, но главная лента
+        # перебирала бы их в индексе (hidden, pub_date), пока они не
+        # удалены. Пометка пачками намного быстрее удаления.
+        for ids in chunks(posts.filter(hidden=False)):
+            Post.objects.filter(pk__in=ids).update(hidden=True)
+        delete_posts(job_id, posts)
+        delete_comments(job_id, Comment.objects.filter(author=user))
+        follows = Follow.objects.filter(Q(user=user) | Q(author=user))
+        for ids in chunks(follows):
+            follows = Follow.objects.filter(pk__in=ids)
+            with transaction.atomic():
+                # Меняются счётчики обеих сторон подписки.
+                users = set()
+                for pair in follows.values_list("user_id", "author_id"):
+                    users.update(pair)
+                follows._raw_delete(follows.db)
+                AuthorStats.objects.recount(User.objects.filter(pk__in=users))
+        for ids in chunks(TimelineEntry.objects.filter(user=user)):
+            entries = TimelineEntry.objects.filter(pk__in=ids)
+            entries._raw_delete(entries.db)
+        user.delete()
+
+
+def delete_images(names):
+    """Удалить файлы картинок и миниатюр, на которые больше нет записей.
+
+    Одна картинка может быть у нескольких записей, например у
+    сгенерированных seed_yatube.
+    """
+    names = set(names)
+    for start in range(0, len(names), CHUNK_SIZE):
+        batch = list(names)[start:start + CHUNK_SIZE]
+        used = set(
+            Post.objects.filter(image__in=batch).values_list(
+                "image", flat=True
+            )
+        )
+        for name in batch:
+            if name in used:
+                continue
+            try:
+                thumbnails.backend.delete(name)
+            except Exception:
+                logger.exception("Deleting image %s failed", name)
+
+
+def delete_comments(job_id, queryset):
+    for ids in chunks(queryset):
+        comments = Comment.objects.filter(pk__in=ids)
+        with transaction.atomic():
+            post_ids = set(comments.values_list("post_id", flat=True))
+            comments._raw_delete(comments.db)
+            Post.objects.filter(pk__in=post_ids).recount_comments()
+            # Число комментариев видно на странице записи.
+            Post.objects.filter(pk__in=post_ids).update(
+                updated_at=timezone.now()
+            )
+        feed_cache.bump_generation()
+        advance(job_id, len(ids))
+
+
+def move_posts(job_id, queryset, group):
+    for ids in chunks(queryset):
+        Post.objects.filter(pk__in=ids).update(
+            group=group, updated_at=timezone.now()
+        )
+        feed_cache.bump_generation()
+        advance(job_id, len(ids))
+
+
+@staff_member_required
+def moderation_progress(request, job_id):
+    """Прогресс задачи модерации для сотрудников."""
+    state = progress(job_id)
+    if state is None:
+        raise Http404
+    return JsonResponse(state, json_dumps_params={"ensure_ascii": False})
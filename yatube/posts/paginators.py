@@ -0,0 +1,283 @@
+import base64
+import binascii
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import (
+    EmptyPage,
+    Page,
+    PageNotAnInteger,
+    Paginator,
+)
+from django.http import Http404
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from . import feed_cache
+
+POSTS_PER_PAGE = 10
+COMMENTS_PER_PAGE = 20
+
+FORWARD = "n"
+BACKWARD = "p"
+
+
+def encode_cursor(direction, post, field="pub_date"):
+    # Лента может состоять из моделей или строк values().
+    if isinstance(post, dict):
+        date, pk = post[field], post["id"]
+    else:
+        date, pk = getattr(post, field), post.pk
+    raw = f"{direction}|{date.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Разобрать курсор; для битого курсора вернуть None."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        direction, pub_date, pk = raw.split("|")
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if direction not in (FORWARD, BACKWARD) or pub_date is None:
+        return None
+    return direction, pub_date, pk
+
+
+def capped_count(queryset):
+    """Число строк, но не больше POSTS_COUNT_LIMIT, и признак предела.
+
+    COUNT(*) по подзапросу с LIMIT останавливается на пределе, и
+    таблица в миллионы строк считается так же быстро, как в 10 000.
+    """
+    queryset = queryset.values("pk").order_by()
+    limit = settings.POSTS_COUNT_LIMIT
+    if not limit:
+        return queryset.count(), False
+    count = queryset[:limit + 1].count()
+    return min(count, limit), count > limit
+
+
+def cached_count(queryset):
+    """Число строк ленты и признак, что оно приблизительное.
+
+    Счёт из capped_count хранится в кэше по тексту запроса до
+    следующей записи Post, Comment или Group (поколение лент). Выше
+    предела лента показывает «10,000+».
+    """
+    queryset = queryset.values("pk").order_by()
+    digest = hashlib.md5(str(queryset.query).encode()).hexdigest()
+    key = f"posts:count:{digest}"
+    version = feed_cache.generation()
+    cached = cache.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    result = capped_count(queryset)
+    cache.set(key, (version, result), settings.POSTS_FEED_CACHE_TIMEOUT)
+    return result
+
+
+def page_window(page, neighbours=2):
+    """Номера страниц для навигации, None на месте пропуска.
+
+    Первая и последняя страницы и по neighbours соседей текущей:
+    1 … 48 49 [50] 51 52 … 2000. Для приблизительного числа записей
+    последняя страница неизвестна, и список заканчивается пропуском.
+    """
+    approximate = page.paginator.approximate
+    last = page.paginator.num_pages
+    numbers = {1, *range(
+        max(1, page.number - neighbours),
+        min(last, page.number + neighbours) + 1,
+    )}
+    if not approximate:
+        numbers.add(last)
+    window, previous = [], 0
+    for number in sorted(numbers):
+        if number - previous == 2:
+            # Пропуск из одной страницы короче показать номером.
+            window.append(previous + 1)
+        elif number - previous > 2:
+            window.append(None)
+        window.append(number)
+        previous = number
+    if approximate and page.has_next():
+        window.append(None)
+    return window
+
+
+class PostPaginator(Paginator):
+    """Paginator с кэшем COUNT(*) и приблизительным числом записей.
+
+    Выше POSTS_COUNT_LIMIT записей страницы за пределом всё равно
+    открываются: о следующей странице узнаём, выбрав на одну запись
+    больше.
+    """
+
+    def __init__(
+        self, object_list, per_page, count=None, cache_count=True, **kwargs
+    ):
+        super().__init__(object_list, per_page, **kwargs)
+        self.cache_count = cache_count
+        self.approximate = False
+        if count is not None:
+            # Известное заранее число записей (денормализованный счётчик)
+            # избавляет от COUNT(*).
+            self.count = count
+
+    @cached_property
+    def count(self):
+        if self.cache_count:
+            count, self.approximate = cached_count(self.object_list)
+            return count
+        # Аннотации ленты для подсчёта не нужны, иначе COUNT(*)
+        # оборачивает весь запрос с подзапросами по комментариям.
+        return self.object_list.values("pk").count()
+
+    @property
+    def count_label(self):
+        return f"{self.count:,}+" if self.approximate else f"{self.count:,}"
+
+    def validate_number(self, number):
+        if not (self.count and self.approximate):
+            return super().validate_number(number)
+        # Номер страницы не сравнивается с num_pages: оно занижено.
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger("That page number is not an integer")
+        if number < 1:
+            raise EmptyPage("That page number is less than 1")
+        return number
+
+    def get_page(self, number):
+        try:
+            return super().get_page(number)
+        except EmptyPage:
+            # Номер за концом ленты с приблизительным счётом: последнюю
+            # страницу не узнать, не прочитав ленту целиком.
+            raise Http404("That page contains no results")
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.approximate:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows:
+            raise EmptyPage("That page contains no results")
+        # Страниц не меньше, чем уже увидено: от num_pages зависит
+        # has_next() страницы.
+        more = len(rows) > self.per_page
+        self.num_pages = max(self.num_pages, number + more)
+        return self._get_page(rows[:self.per_page], number, self)
+
+    def _get_page(self, *args, **kwargs):
+        page = super()._get_page(*args, **kwargs)
+        page.window = page_window(page)
+        return page
+
+
+class CursorPage(Page):
+    def __init__(self, object_list, paginator, next_cursor, previous_cursor):
+        super().__init__(object_list, 1, paginator)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return "<Cursor page>"
+
+    def window(self):
+        return []
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class CursorPaginator(PostPaginator):
+    """Пагинация по ключу (pub_date, id) без COUNT(*) и OFFSET.
+
+    Индекс по pub_date в SQLite неявно содержит rowid, поэтому
+    сравнение по паре (pub_date, id) идёт по существующему индексу.
+    """
+
+    @property
+    def page_range(self):
+        return range(0)
+
+    @property
+    def count_label(self):
+        return ""
+
+    def get_page(self, cursor):
+        position = decode_cursor(cursor) if cursor else None
+        posts = self.object_list
+        if position is None:
+            direction = FORWARD
+            posts = posts.order_by("-pub_date", "-pk")
+        else:
+            direction, pub_date, pk = position
+            if direction == FORWARD:
+                posts = posts.filter(pub_date__lte=pub_date).exclude(
+                    pub_date=pub_date, pk__gte=pk
+                ).order_by("-pub_date", "-pk")
+            else:
+                posts = posts.filter(pub_date__gte=pub_date).exclude(
+                    pub_date=pub_date, pk__lte=pk
+                ).order_by("pub_date", "pk")
+        rows = list(posts[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        if direction == BACKWARD and not has_more:
+            return self.get_page(None)
+        rows = rows[:self.per_page]
+        if direction == BACKWARD:
+            rows.reverse()
+        if not rows:
+            return CursorPage(rows, self, None, None)
+        has_next = has_more or direction == BACKWARD
+        has_previous = position is not None
+        return CursorPage(
+            rows,
+            self,
+            encode_cursor(FORWARD, rows[-1]) if has_next else None,
+            encode_cursor(BACKWARD, rows[0]) if has_previous else None,
+        )
+
+
+def paginate(
+    request, posts, per_page=POSTS_PER_PAGE, count=None, cache_count=True
+):
+    if settings.POSTS_PAGINATION == "cursor":
+        return CursorPaginator(posts, per_page).get_page(
+            request.GET.get("cursor")
+        )
+    return PostPaginator(
+        posts, per_page, count=count, cache_count=cache_count
+    ).get_page(request.GET.get("page"))
+
+
+def comments_page(comments, cursor, per_page=COMMENTS_PER_PAGE):
+    """Очередная порция комментариев от старых к новым и курсор дальше.
+
+    Порядок (created, id) идёт по индексу (post, created): SQLite
+    хранит в нём и rowid, поэтому страница стоит одинаково и в начале,
+    и в конце обсуждения на десятки тысяч комментариев.
+    """
+    position = decode_cursor(cursor) if cursor else None
+    if position is not None:
+        _, created, pk = position
+        comments = comments.filter(created__gte=created).exclude(
+            created=created, pk__lte=pk
+        )
+    rows = list(comments.order_by("created", "pk")[:per_page + 1])
+    if len(rows) <= per_page:
+        return rows, None
+    rows = rows[:per_page]
+    return rows, encode_cursor(FORWARD, rows[-1], "created")
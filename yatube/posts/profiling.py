@@ -0,0 +1,236 @@
+"""Профилирование запросов: SQL, шаблоны и бюджет запросов к базе.
+
+Middleware считает для каждого запроса число SQL-запросов, их суммарное
+время, время рендера шаблонов и время view. Замеры складываются в
+гистограммы по имени маршрута (``posts:index``, ``posts:profile``) и
+отдаются сотрудникам на внутренней странице. SQL считается обёрткой
+``connection.execute_wrapper``, поэтому работает и без DEBUG. Заголовок
+Server-Timing с теми же замерами получают только сотрудники: остальным
+он подсказывал бы число запросов и время ответа.
+
+Гистограммы живут в памяти процесса: у каждого воркера свои. Рядом
+отдаются счётчики кэша лент этого же процесса.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import JsonResponse
+from django.template.backends.django import DjangoTemplates
+from django.template.backends.django import Template as DjangoTemplate
+
+from . import feed_cache
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограмм; последняя корзина - всё, что больше.
+TIME_BOUNDS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+COUNT_BOUNDS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+PERCENTILES = (50, 95, 99)
+
+current = ContextVar("posts_profiling", default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class RequestStats:
+    __slots__ = ("queries", "sql", "template", "depth")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql = 0.0
+        self.template = 0.0
+        self.depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql += time.perf_counter() - started
+            self.queries += 1
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "total", "sum", "max")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0
+        self.sum = 0
+        self.max = 0
+
+    def add(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, percent):
+        """Верхняя граница корзины, в которую попал перцентиль."""
+        rank = self.total * percent / 100
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self):
+        data = {
+            "count": self.total,
+            "mean": self.sum / self.total if self.total else 0,
+            "max": self.max,
+            "buckets": dict(
+                zip([*map(str, self.bounds), "inf"], self.counts)
+            ),
+        }
+        for percent in PERCENTILES:
+            data[f"p{percent}"] = self.percentile(percent)
+        return data
+
+
+class ViewMetrics:
+    def __init__(self):
+        self.queries = Histogram(COUNT_BOUNDS)
+        self.sql_ms = Histogram(TIME_BOUNDS)
+        self.template_ms = Histogram(TIME_BOUNDS)
+        self.view_ms = Histogram(TIME_BOUNDS)
+        self.over_budget = 0
+
+    def as_dict(self):
+        return {
+            "queries": self.queries.as_dict(),
+            "sql_ms": self.sql_ms.as_dict(),
+            "template_ms": self.template_ms.as_dict(),
+            "view_ms": self.view_ms.as_dict(),
+            "over_budget": self.over_budget,
+        }
+
+
+lock = threading.Lock()
+metrics = defaultdict(ViewMetrics)
+
+
+def record(view_name, stats, elapsed, over_budget):
+    with lock:
+        view = metrics[view_name]
+        view.queries.add(stats.queries)
+        view.sql_ms.add(stats.sql * 1000)
+        view.template_ms.add(stats.template * 1000)
+        view.view_ms.add(elapsed * 1000)
+        view.over_budget += over_budget
+
+
+def snapshot():
+    with lock:
+        return {name: view.as_dict() for name, view in metrics.items()}
+
+
+def reset():
+    with lock:
+        metrics.clear()
+
+
+def query_budget(view_name):
+    return settings.POSTS_QUERY_BUDGETS.get(
+        view_name, settings.POSTS_QUERY_BUDGET
+    )
+
+
+class ProfilingMiddleware:
+    """Замеры запроса и проверка бюджета SQL-запросов.
+
+    Стоит последним в MIDDLEWARE, чтобы время view не включало работу
+    остальных middleware.
+    """
+
+    def __init__(self, get_response):
+        if not settings.POSTS_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = current.set(stats)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats))
+                response = self.get_response(request)
+        finally:
+            elapsed = time.perf_counter() - started
+            current.reset(token)
+
+        match = request.resolver_match
+        view_name = match.view_name if match else "<unresolved>"
+        budget = query_budget(view_name)
+        over_budget = budget is not None and stats.queries > budget
+        record(view_name, stats, elapsed, over_budget)
+        user = getattr(request, "user", None)
+        if user is not None and user.is_staff:
+            response["Server-Timing"] = (
+                f"sql;dur={stats.sql * 1000:.1f};"
+                f'desc="{stats.queries} queries",'
+                f" tpl;dur={stats.template * 1000:.1f},"
+                f" view;dur={elapsed * 1000:.1f}"
+            )
+        if over_budget:
+            message = "%s: %d SQL-запросов при бюджете %d" % (
+                view_name,
+                stats.queries,
+                budget,
+            )
+            if settings.POSTS_QUERY_BUDGET_ACTION == "raise":
+                raise QueryBudgetExceeded(message)
+            logger.warning(message, extra={"request": request})
+        return response
+
+
+class ProfiledTemplate(DjangoTemplate):
+    def render(self, context=None, request=None):
+        stats = current.get()
+        if stats is None:
+            return super().render(context, request)
+        # Шаблон, отрендеренный внутри другого, уже учтён внешним.
+        stats.depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats.depth -= 1
+            if not stats.depth:
+                stats.template += time.perf_counter() - started
+
+
+class ProfiledTemplates(DjangoTemplates):
+    """Бэкенд шаблонов Django, замеряющий время рендера."""
+
+    def from_string(self, template_code):
+        template = super().from_string(template_code)
+        return ProfiledTemplate(template.template, self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return ProfiledTemplate(template.template, self)
+
+
+@staff_member_required
+def profiling_stats(request):
+    """Гистограммы замеров по маршрутам и кэш лент для сотрудников."""
+    return JsonResponse(
+        {**snapshot(), "feed_cache": feed_cache.stats()},
+        json_dumps_params={"indent": 2},
+    )
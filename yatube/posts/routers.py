@@ -0,0 +1,107 @@
+"""Чтение с реплик, запись в основную базу.
+
+GET-запросы читают из реплики из POSTS_READ_REPLICAS, выбранной
+случайно один раз на запрос: у реплик разное отставание, и счётчик
+пагинатора и строки страницы иначе могли бы прийти из разных снимков. В
+default идут запись, небезопасные методы, чтение внутри транзакции и
+чтение после записи в том же запросе. Кроме того, после записи
+пользователь получает cookie и POSTS_REPLICA_PIN_SECONDS секунд читает
+только из default: реплика может ещё не знать о его новой записи или
+комментарии.
+
+Вне запросов (команды, shell) всё идёт в default.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = "use_primary"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+# Сессии читаются из default всегда: иначе отставшая реплика
+# разлогинит только что вошедшего пользователя.
+PRIMARY_APPS = {"sessions"}
+
+current = ContextVar("posts_replica_state", default=None)
+
+
+class RequestState:
+    __slots__ = ("pinned", "wrote", "replica")
+
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.wrote = False
+        self.replica = None
+
+
+def reads_from_replica():
+    """Текущий запрос читает из реплики."""
+    state = current.get()
+    return (
+        bool(settings.POSTS_READ_REPLICAS)
+        and state is not None
+        and not state.pinned
+        and not state.wrote
+    )
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if (
+            not reads_from_replica()
+            or model._meta.app_label in PRIMARY_APPS
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        state = current.get()
+        if state.replica is None:
+            state.replica = random.choice(settings.POSTS_READ_REPLICAS)
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = current.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики - копии default, связи между ними допустимы.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.POSTS_READ_REPLICAS
+
+
+class ReplicaMiddleware:
+    """Состояние маршрутизации на время запроса и cookie после записи.
+
+    Стоит до SessionMiddleware, чтобы запись сессии при входе тоже
+    закрепляла пользователя за default.
+    """
+
+    def __init__(self, get_response):
+        if not settings.POSTS_READ_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = RequestState(
+            pinned=request.method not in SAFE_METHODS
+            or PIN_COOKIE in request.COOKIES
+        )
+        token = current.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            current.reset(token)
+        if state.wrote:
+            response.set_cookie(
+                PIN_COOKIE,
+                "1",
+                max_age=settings.POSTS_REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
@@ -0,0 +1,197 @@
+"""Полнотекстовый поиск по тексту записей.
+
+Бэкенд выбирается настройкой POSTS_SEARCH_BACKEND. Основной - SQLite
+FTS5: обратный индекс в виртуальной таблице posts_post_search, rowid
+которой совпадает с id записи. Индекс обновляется сигналами при
+сохранении и удалении записи, полностью пересобирается командой
+rebuild_search_index. Результаты упорядочены по релевантности (bm25), а
+страницы листаются курсором по (rank, id).
+
+bm25 считается для каждого совпадения, и для частых слов это сотни
+миллисекунд на миллионе записей. Поэтому ранжируются только
+POSTS_SEARCH_RANK_WINDOW самых новых совпадений: нижняя граница id окна
+находится по индексу почти бесплатно и сохраняется в курсоре, чтобы
+новые записи не сдвигали окно между страницами.
+"""
+import base64
+
+from django.conf import settings
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Post
+
+TABLE = "posts_post_search"
+
+
+def encode_cursor(rank, pk, floor):
+    value = f"{rank!r}|{pk}|{floor}".encode()
+    return base64.urlsafe_b64encode(value).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """(rank, id, floor) из курсора или None для битого курсора."""
+    if not cursor:
+        return None
+    try:
+        value = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        rank, pk, floor = value.decode().split("|")
+        return float(rank), int(pk), int(floor)
+    except ValueError:
+        return None
+
+
+def match_expression(query):
+    """Запрос пользователя как набор фраз FTS5, соединённых через AND.
+
+    Кавычки внутри слов удваиваются, поэтому операторы FTS5 из ввода не
+    интерпретируются.
+    """
+    terms = query.split()
+    return " ".join('"%s"' % term.replace('"', '""') for term in terms)
+
+
+class SearchBackend:
+    """Интерфейс бэкенда поиска."""
+
+    def index(self, posts, replace=True):
+        """Добавить записи в индекс.
+
+        replace=False - записей точно нет в индексе, старые версии удалять
+        не нужно (полная пересборка).
+        """
+        raise NotImplementedError
+
+    def remove(self, pks):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def search(self, query, limit, after=None):
+        """Список троек (rank, id, floor) по убыванию релевантности.
+
+        floor - нижняя граница id ранжируемых записей, одна на все
+        страницы. after - тройка последнего результата прошлой страницы.
+        """
+        raise NotImplementedError
+
+    def filter(self, queryset, query):
+        """Сузить queryset записей до найденных, без учёта релевантности."""
+        raise NotImplementedError
+
+
+class Fts5Backend(SearchBackend):
+    """Таблицу индекса создаёт миграция 0004_post_search."""
+
+    def index(self, posts, replace=True):
+        rows = [(post.pk, post.text) for post in posts]
+        with connection.cursor() as cursor:
+            if replace:
+                # FTS5 не поддерживает UPSERT, старая версия удаляется.
+                self.remove([pk for pk, _ in rows])
+            cursor.executemany(
+                f"INSERT INTO {TABLE} (rowid, text) VALUES (%s, %s)", rows
+            )
+
+    def remove(self, pks):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"DELETE FROM {TABLE} WHERE rowid = %s", [(pk,) for pk in pks]
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLE}")
+
+    def search(self, query, limit, after=None):
+        expression = match_expression(query)
+        if not expression:
+            return []
+        with connection.cursor() as cursor:
+            if after is None:
+                floor = self.window_floor(cursor, expression)
+            else:
+                floor = after[2]
+            sql = (
+                f"SELECT rank, rowid, %s FROM {TABLE} "
+                f"WHERE {TABLE} MATCH %s AND rowid >= %s"
+            )
+            params = [floor, expression, floor]
+            if after is not None:
+                sql += " AND (rank > %s OR (rank = %s AND rowid > %s))"
+                params += [after[0], after[0], after[1]]
+            sql += " ORDER BY rank, rowid LIMIT %s"
+            params.append(limit)
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def window_floor(self, cursor, expression):
+        """Id самого старого из POSTS_SEARCH_RANK_WINDOW новых совпадений."""
+        cursor.execute(
+            f"SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s "
+            "ORDER BY rowid DESC LIMIT 1 OFFSET %s",
+            [expression, settings.POSTS_SEARCH_RANK_WINDOW - 1],
+        )
+        row = cursor.fetchone()
+        return row[0] if row else 0
+
+    def filter(self, queryset, query):
+        expression = match_expression(query)
+        if not expression:
+            return queryset
+        return queryset.filter(
+            pk__in=RawSQL(
+                f"SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s",
+                [expression],
+            )
+        )
+
+
+class LikeBackend(SearchBackend):
+    """Запасной бэкенд без индекса для баз без FTS5."""
+
+    def index(self, posts, replace=True):
+        pass
+
+    def remove(self, pks):
+        pass
+
+    def clear(self):
+        pass
+
+    def search(self, query, limit, after=None):
+        posts = self.filter(Post.objects.all(), query)
+        if after is not None:
+            posts = posts.filter(pk__gt=after[1])
+        return [
+            (0.0, pk, 0)
+            for pk in posts.order_by("pk").values_list("pk", flat=True)[
+                :limit
+            ]
+        ]
+
+    def filter(self, queryset, query):
+        for term in query.split():
+            queryset = queryset.filter(text__icontains=term)
+        return queryset
+
+
+def get_backend():
+    return import_string(settings.POSTS_SEARCH_BACKEND)()
+
+
+def search_page(query, cursor=None, per_page=10):
+    """Записи страницы результатов и курсор следующей страницы."""
+    backend = get_backend()
+    rows = backend.search(query, per_page + 1, after=decode_cursor(cursor))
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(*rows[-1])
+    posts = Post.objects.visible().with_related().in_bulk(
+        [pk for _, pk, _ in rows]
+    )
+    # Запись могла быть удалена или скрыта между поиском и выборкой.
+    return [posts[pk] for _, pk, _ in rows if pk in posts], next_cursor
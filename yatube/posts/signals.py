@@ -0,0 +1,140 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import feed_cache, search, timeline, usernames
+from .models import AuthorStats, Comment, Follow, Group, Post, User
+
+
+def change_counter(queryset, field, delta, **fields):
+    # Счётчик не уходит ниже нуля, даже если он успел разойтись с
+    # данными; точные значения восстанавливает recount_counters.
+    if delta < 0:
+        queryset = queryset.filter(**{f"{field}__gt": 0})
+    queryset.update(**{field: F(field) + delta}, **fields)
+
+
+def change_comments_count(post_id, delta):
+    # Число комментариев видно на странице записи, поэтому запись
+    # считается изменённой.
+    change_counter(
+        Post.objects.filter(pk=post_id),
+        "comments_count",
+        delta,
+        updated_at=timezone.now(),
+    )
+
+
+def change_stats(user_id, field, delta):
+    change_counter(AuthorStats.objects.filter(user_id=user_id), field, delta)
+
+
+@receiver(post_save, sender=User)
+def create_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        AuthorStats.objects.create(user=instance)
+
+
+@receiver(pre_save, sender=User)
+def check_rename(sender, instance, update_fields=None, **kwargs):
+    # Вход сохраняет только last_login, имя при этом не меняется.
+    instance._renamed = False
+    if instance.pk is None or update_fields is not None and (
+        "username" not in update_fields
+    ):
+        return
+    old = (
+        User.objects.filter(pk=instance.pk)
+        .values_list("username", flat=True)
+        .first()
+    )
+    instance._renamed = old is not None and old != instance.username
+
+
+@receiver(post_save, sender=User)
+def index_username(sender, instance, created, **kwargs):
+    usernames.user_saved(
+        instance, created, getattr(instance, "_renamed", False)
+    )
+
+
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        change_stats(instance.author_id, "posts_count", 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    # Скрытую запись hide_posts уже вычел из счётчика.
+    if not instance.hidden:
+        change_stats(instance.author_id, "posts_count", -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        change_comments_count(instance.post_id, 1)
+    else:
+        # Правка комментария тоже меняет страницу записи.
+        Post.objects.filter(pk=instance.post_id).update(
+            updated_at=timezone.now()
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    change_comments_count(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        change_stats(instance.author_id, "followers_count", 1)
+        change_stats(instance.user_id, "following_count", 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    change_stats(instance.author_id, "followers_count", -1)
+    change_stats(instance.user_id, "following_count", -1)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.push_post(instance)
+
+
+@receiver(post_save, sender=Follow)
+def fill_timeline(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.add_author(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance, **kwargs):
+    timeline.remove_author(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    search.get_backend().index([instance])
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.get_backend().remove([instance.pk])
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_feeds(sender, **kwargs):
+    feed_cache.bump_generation()
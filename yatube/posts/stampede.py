@@ -0,0 +1,87 @@
+"""Получение из кэша с защитой от одновременного пересчёта.
+
+Когда значение устаревает, его начинает пересчитывать каждый воркер,
+которому оно понадобилось: после любой записи все процессы разом
+рендерят одну и ту же страницу ленты. get_or_compute пересчитывает
+значение в одном процессе под блокировкой в кэше (cache.add), а
+остальные тем временем отдают прежнее значение. Если прежнего нет,
+они ждут результата, но не дольше WAIT секунд.
+
+Незадолго до срока значение пересчитывается заранее с вероятностью,
+растущей к сроку и ко времени пересчёта (XFetch), поэтому горячие ключи
+обычно обновляются до того, как истекут.
+"""
+import math
+import random
+import time
+
+from django.core.cache import cache
+
+# Блокировка снимается сама, если пересчитывавший процесс упал.
+LOCK_TIMEOUT = 10
+# Сколько ждать чужого пересчёта, когда отдать нечего.
+WAIT = 2
+POLL = 0.01
+# Насколько охотно пересчитывать заранее; 0 - только после срока.
+BETA = 1
+
+
+def lock_key(key):
+    return f"{key}:lock"
+
+
+def is_fresh(entry, version):
+    _, entry_version, fresh_until, delta = entry
+    if entry_version != version:
+        return False
+    early = -delta * BETA * math.log(1 - random.random())
+    return time.time() + early < fresh_until
+
+
+def wait_for(key, version):
+    """Дождаться значения нужной версии от другого процесса."""
+    deadline = time.monotonic() + WAIT
+    while time.monotonic() < deadline:
+        time.sleep(POLL)
+        entry = cache.get(key)
+        if entry is not None and entry[1] == version:
+            return entry
+        # Блокировку сняли, а значения нет: результат не попал в кэш.
+        if entry is None and cache.get(lock_key(key)) is None:
+            return None
+    return None
+
+
+def get_or_compute(key, compute, timeout, version=None):
+    """(значение, его версия) из кэша или из compute() -> (value, cacheable).
+
+    version отличает значения одного ключа, например поколение лент:
+    значение другой версии устарело, но отдаётся, пока новое
+    пересчитывает другой процесс. По возвращённой версии вызывающий
+    видит, что получил устаревшее значение.
+    """
+    entry = cache.get(key)
+    if entry is not None and is_fresh(entry, version):
+        return entry[0], entry[1]
+    locked = cache.add(lock_key(key), 1, LOCK_TIMEOUT)
+    if not locked:
+        if entry is None:
+            entry = wait_for(key, version)
+        if entry is not None:
+            return entry[0], entry[1]
+    try:
+        started = time.monotonic()
+        value, cacheable = compute()
+        if cacheable:
+            delta = time.monotonic() - started
+            # Значение хранится вдвое дольше срока свежести, чтобы было
+            # что отдать, пока его пересчитывают.
+            cache.set(
+                key,
+                (value, version, time.time() + timeout, delta),
+                timeout * 2,
+            )
+    finally:
+        if locked:
+            cache.delete(lock_key(key))
+    return value, version
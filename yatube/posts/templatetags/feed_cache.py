@@ -0,0 +1,68 @@
+from django import template
+
+from posts import feed_cache
+
+register = template.Library()
+
+
+class FeedCacheNode(template.Node):
+    def __init__(self, nodelist, feed, page, vary_on):
+        self.nodelist = nodelist
+        self.feed = feed
+        self.page = page
+        self.vary_on = vary_on
+
+    def render(self, context):
+        key = feed_cache.make_key(
+            self.feed.resolve(context),
+            self.page.resolve(context),
+            *[value.resolve(context) for value in self.vary_on],
+        )
+        return feed_cache.get_or_render(
+            context,
+            key,
+            lambda: feed_cache.render_tracked(context, self.nodelist),
+        )
+
+
+@register.tag
+def feedcache(parser, token):
+    """{% feedcache "index" page [vary_on ...] %} ... {% endfeedcache %}"""
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(
+            f"'{bits[0]}' tag requires at least 2 arguments."
+        )
+    nodelist = parser.parse(("endfeedcache",))
+    parser.delete_first_token()
+    return FeedCacheNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        parser.compile_filter(bits[2]),
+        [parser.compile_filter(bit) for bit in bits[3:]],
+    )
+
+
+class PostCacheNode(template.Node):
+    def __init__(self, nodelist, post):
+        self.nodelist = nodelist
+        self.post = post
+
+    def render(self, context):
+        return feed_cache.get_or_render_post(
+            self.post.resolve(context),
+            lambda: feed_cache.render_tracked(context, self.nodelist),
+        )
+
+
+@register.tag
+def postcache(parser, token):
+    """{% postcache post %} ... {% endpostcache %}"""
+    bits = token.split_contents()
+    if len(bits) != 2:
+        raise template.TemplateSyntaxError(
+            f"'{bits[0]}' tag requires exactly one argument."
+        )
+    nodelist = parser.parse(("endpostcache",))
+    parser.delete_first_token()
+    return PostCacheNode(nodelist, parser.compile_filter(bits[1]))
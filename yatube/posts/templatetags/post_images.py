@@ -0,0 +1,14 @@
+from django import template
+
+from posts import feed_cache, thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def post_thumbnail(context, image):
+    """Варианты картинки для srcset или None, пока они создаются в фоне."""
+    thumbnail = thumbnails.get_or_schedule(image)
+    if image and thumbnail is None:
+        feed_cache.mark_incomplete(context)
+    return thumbnail
@@ -0,0 +1,80 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class AdminChangelistTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username="admin", email="admin@yatube.ru", password="admin"
+        )
+        cls.user = User.objects.create_user(username="Dmitriy")
+        cls.group = Group.objects.create(
+            title="Dmitriy_Notes", slug="DK", description="Записи Дмитрия"
+        )
+
+    def setUp(self):
+        self.admin_client = Client()
+        self.admin_client.force_login(self.admin)
+
+    def create_rows(self, count, start=0):
+        for i in range(start, start + count):
+            author = User.objects.create_user(username="author%s" % i)
+            post = Post.objects.create(
+                text="text %s" % i, author=author, group=self.group
+            )
+            Comment.objects.create(post=post, author=self.user, text=i)
+            Follow.objects.create(user=self.user, author=author)
+
+    def changelists(self):
+        return [
+            reverse(f"admin:posts_{model}_changelist")
+            for model in ("post", "group", "comment", "follow")
+        ]
+
+    def test_changelist_queries_do_not_grow(self):
+        """Число запросов списков не зависит от числа строк"""
+        self.create_rows(1)
+        queries = {}
+        for adress in self.changelists():
+            with CaptureQueriesContext(connection) as captured:
+                response = self.admin_client.get(adress)
+            self.assertEqual(response.status_code, 200)
+            queries[adress] = len(captured)
+        self.create_rows(10, start=1)
+        for adress in self.changelists():
+            with self.subTest(adress=adress):
+                with self.assertNumQueries(queries[adress]):
+                    self.admin_client.get(adress)
+
+    @override_settings(POSTS_COUNT_LIMIT=5)
+    def test_count_stops_at_limit(self):
+        """Список не считает строки дальше предела"""
+        self.create_rows(8)
+        response = self.admin_client.get(
+            reverse("admin:posts_comment_changelist")
+        )
+        self.assertEqual(response.context["cl"].result_count, 5)
+
+    def test_search_by_username(self):
+        """Комментарии и подписки ищутся по точному имени пользователя"""
+        self.create_rows(3)
+        response = self.admin_client.get(
+            reverse("admin:posts_follow_changelist"), {"q": "author1"}
+        )
+        follows = response.context["cl"].result_list
+        self.assertEqual(
+            [follow.author.username for follow in follows], ["author1"]
+        )
+        response = self.admin_client.get(
+            reverse("admin:posts_comment_changelist"), {"q": "Dmitriy"}
+        )
+        self.assertEqual(len(response.context["cl"].result_list), 3)
@@ -0,0 +1,90 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class FeedApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="Dmitriy")
+        cls.group = Group.objects.create(
+            title="Dmitriy_Notes", slug="DK", description="Записи Дмитрия"
+        )
+        Post.objects.bulk_create(
+            Post(text="text %s" % i, author=cls.user, group=cls.group)
+            for i in range(13)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_feeds_return_json_pages(self):
+        """Ленты отдаются JSON-страницами, курсор ведёт дальше"""
+        pages_names = (
+            reverse("posts:api_index"),
+            reverse("posts:api_group", kwargs={"slug": "DK"}),
+            reverse("posts:api_profile", kwargs={"username": "Dmitriy"}),
+        )
+        for adress in pages_names:
+            with self.subTest(adress=adress):
+                data = self.guest_client.get(adress).json()
+                self.assertEqual(len(data["results"]), 10)
+                self.assertEqual(
+                    data["results"][0]["author_username"], "Dmitriy"
+                )
+                self.assertEqual(data["results"][0]["group_slug"], "DK")
+                self.assertIsNone(data["previous"])
+                data = self.guest_client.get(
+                    adress, {"cursor": data["next"]}
+                ).json()
+                self.assertEqual(len(data["results"]), 3)
+                self.assertIsNone(data["next"])
+
+    def test_unknown_group_returns_404(self):
+        """Несуществующая группа отдаёт 404"""
+        response = self.guest_client.get(
+            reverse("posts:api_group", kwargs={"slug": "missing"})
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_unchanged_page_returns_304_without_queries(self):
+        """Неизменившаяся страница отдаёт 304 без запросов к базе"""
+        adress = reverse("posts:api_index")
+        etag = self.guest_client.get(adress)["ETag"]
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(
+                adress, HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, 304)
+
+        Comment.objects.create(
+            post=Post.objects.first(), author=self.user, text="Комментарий"
+        )
+        response = self.guest_client.get(adress, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+
+class CommentsApiTests(TestCase):
+    def test_comments_return_json_pages(self):
+        """Комментарии отдаются порциями по курсору"""
+        user = User.objects.create_user(username="Dmitriy")
+        post = Post.objects.create(text="Тестовый текст", author=user)
+        for i in range(25):
+            Comment.objects.create(post=post, author=user, text=i)
+        adress = reverse("posts:api_comments", args=[post.pk])
+        first = Client().get(adress).json()
+        rest = Client().get(adress, {"cursor": first["next"]}).json()
+        self.assertIsNone(rest["next"])
+        self.assertEqual(
+            [row["text"] for row in first["results"] + rest["results"]],
+            [str(i) for i in range(25)],
+        )
+        self.assertEqual(first["results"][0]["author_username"], "Dmitriy")
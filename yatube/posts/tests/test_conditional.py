@@ -0,0 +1,183 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts import stampede
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalResponseTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="Dmitriy")
+        cls.reader = User.objects.create_user(username="Reader")
+        cls.group = Group.objects.create(
+            title="Dmitriy_Notes", slug="DK", description="Записи Дмитрия"
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.post = Post.objects.create(
+            text="Тестовый текст", author=self.user, group=self.group
+        )
+        self.post_url = reverse(
+            "posts:post",
+            kwargs={"username": "Dmitriy", "post_id": self.post.pk},
+        )
+
+    def revalidate(self, client, adress, etag):
+        return client.get(adress, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_post_page_returns_304_early(self):
+        """Неизменившаяся страница записи отдаёт 304 одним запросом"""
+        etag = self.guest_client.get(self.post_url)["ETag"]
+        with self.assertNumQueries(1):
+            response = self.revalidate(self.guest_client, self.post_url, etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_new_csrf_secret_changes_post_page(self):
+        """После смены CSRF-секрета форма комментария рендерится заново"""
+        # Первый ответ выставляет cookie csrftoken.
+        self.reader_client.get(self.post_url)
+        response = self.reader_client.get(self.post_url)
+        self.assertEqual(
+            self.revalidate(
+                self.reader_client, self.post_url, response["ETag"]
+            ).status_code,
+            304,
+        )
+        # Так секрет меняется при повторном входе.
+        self.reader_client.cookies["csrftoken"] = "x" * 64
+        response = self.revalidate(
+            self.reader_client, self.post_url, response["ETag"]
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header("Last-Modified"))
+
+    def test_new_comment_changes_post_page(self):
+        """Новый комментарий меняет версию страницы записи"""
+        response = self.guest_client.get(self.post_url)
+        Comment.objects.create(post=self.post, author=self.reader, text="c")
+        self.assertEqual(
+            self.revalidate(
+                self.guest_client, self.post_url, response["ETag"]
+            ).status_code,
+            200,
+        )
+        self.post.refresh_from_db()
+        self.assertGreater(
+            self.post.updated_at,
+            Post.objects.values_list("pub_date", flat=True).get(),
+        )
+
+    def test_feeds_return_304_until_changed(self):
+        """Ленты отдают 304, пока в них ничего не изменилось"""
+        pages_names = (
+            reverse("posts:index"),
+            reverse("posts:group", kwargs={"slug": "DK"}),
+            reverse("posts:profile", kwargs={"username": "Dmitriy"}),
+        )
+        other = Post.objects.create(
+            text="Другой текст", author=self.user, group=self.group
+        )
+        etags = {
+            adress: self.guest_client.get(adress)["ETag"]
+            for adress in pages_names
+        }
+        for adress, etag in etags.items():
+            with self.subTest(adress=adress):
+                self.assertEqual(
+                    self.revalidate(self.guest_client, adress, etag)
+                    .status_code,
+                    304,
+                )
+        other.delete()
+        for adress, etag in etags.items():
+            with self.subTest(adress=adress):
+                self.assertEqual(
+                    self.revalidate(self.guest_client, adress, etag)
+                    .status_code,
+                    200,
+                )
+
+    def test_etag_depends_on_viewer(self):
+        """Страница зрителя-подписчика имеет свою версию"""
+        adress = reverse("posts:profile", kwargs={"username": "Dmitriy"})
+        guest_etag = self.guest_client.get(adress)["ETag"]
+        reader_etag = self.reader_client.get(adress)["ETag"]
+        self.assertNotEqual(guest_etag, reader_etag)
+        Follow.objects.create(user=self.reader, author=self.user)
+        self.assertEqual(
+            self.revalidate(self.reader_client, adress, reader_etag)
+            .status_code,
+            200,
+        )
+
+    def test_if_modified_since(self):
+        """Last-Modified записи принимается в If-Modified-Since"""
+        last_modified = self.guest_client.get(self.post_url)["Last-Modified"]
+        response = self.guest_client.get(
+            self.post_url, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_stale_feed_is_sent_without_etag(self):
+        """Фрагмент прошлого поколения отдаётся без ETag и Last-Modified"""
+        adress = reverse("posts:index")
+        self.guest_client.get(adress)
+        Post.objects.create(text="Свежая запись", author=self.user)
+        # Новое поколение рендерит другой процесс.
+        with mock.patch.object(stampede.cache, "add", return_value=False):
+            response = self.guest_client.get(adress)
+        self.assertNotContains(response, "Свежая запись")
+        self.assertFalse(response.has_header("ETag"))
+        self.assertFalse(response.has_header("Last-Modified"))
+        self.assertIn("no-cache", response["Cache-Control"])
+        response = self.guest_client.get(adress)
+        self.assertContains(response, "Свежая запись")
+        self.assertTrue(response.has_header("ETag"))
+
+    def test_thumbnail_placeholder_is_sent_without_etag(self):
+        """Страница с заглушкой вместо миниатюры не получает ETag"""
+        media_root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        image = BytesIO()
+        Image.new("RGB", (10, 10)).save(image, "PNG")
+        with override_settings(MEDIA_ROOT=media_root):
+            post = Post.objects.create(
+                text="Запись с картинкой",
+                author=self.user,
+                image=SimpleUploadedFile("small.png", image.getvalue()),
+            )
+            post_url = reverse(
+                "posts:post",
+                kwargs={"username": "Dmitriy", "post_id": post.pk},
+            )
+            # Пул миниатюр стартует после коммита, которого в тесте нет.
+            with override_settings(POSTS_THUMBNAIL_WORKERS=1):
+                for adress in (reverse("posts:index"), post_url):
+                    with self.subTest(adress=adress):
+                        response = self.guest_client.get(adress)
+                        self.assertContains(
+                            response, "Картинка обрабатывается"
+                        )
+                        self.assertFalse(response.has_header("ETag"))
+            with override_settings(POSTS_THUMBNAIL_WORKERS=0):
+                response = self.guest_client.get(reverse("posts:index"))
+            self.assertNotContains(response, "Картинка обрабатывается")
+            self.assertTrue(response.has_header("ETag"))
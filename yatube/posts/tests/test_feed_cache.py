@@ -0,0 +1,89 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import SimpleTestCase, TestCase
+
+from posts import stampede
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class PostCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="Dmitriy")
+        cls.group = Group.objects.create(
+            title="Dmitriy_Notes", slug="DK", description="Записи Дмитрия"
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text="Тестовый текст", author=self.user, group=self.group
+        )
+
+    def render(self, body):
+        template = Template(
+            "{% load feed_cache %}{% postcache post %}"
+            + body
+            + "{% endpostcache %}"
+        )
+        return template.render(Context({"post": self.post}))
+
+    def test_card_is_rendered_once(self):
+        """Карточка записи берётся из кэша"""
+        self.assertEqual(self.render("first"), "first")
+        self.assertEqual(self.render("second"), "first")
+
+    def test_card_is_rendered_again_after_changes(self):
+        """Правка записи или её группы рендерит карточку заново"""
+        self.render("first")
+        self.post.text = "Новый текст"
+        self.assertEqual(self.render("second"), "second")
+        self.group.title = "Новое название"
+        self.assertEqual(self.render("third"), "third")
+
+
+class StampedeTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def compute(self, value, cacheable=True):
+        def run():
+            self.calls += 1
+            return value, cacheable
+        return run
+
+    def test_value_is_computed_once(self):
+        """Свежее значение берётся из кэша без пересчёта"""
+        for _ in range(3):
+            self.assertEqual(
+                stampede.get_or_compute("key", self.compute("a"), 60, 1),
+                ("a", 1),
+            )
+        self.assertEqual(self.calls, 1)
+
+    def test_stale_value_is_served_while_locked(self):
+        """Пока другой процесс пересчитывает, отдаётся прежнее значение"""
+        stampede.get_or_compute("key", self.compute("old"), 60, 1)
+        cache.add(stampede.lock_key("key"), 1)
+        self.assertEqual(
+            stampede.get_or_compute("key", self.compute("new"), 60, 2),
+            ("old", 1),
+        )
+        self.assertEqual(self.calls, 1)
+        cache.delete(stampede.lock_key("key"))
+        self.assertEqual(
+            stampede.get_or_compute("key", self.compute("new"), 60, 2),
+            ("new", 2),
+        )
+        self.assertFalse(cache.get(stampede.lock_key("key")))
+
+    def test_uncacheable_value_is_not_stored(self):
+        """Незавершённый результат не попадает в кэш"""
+        stampede.get_or_compute("key", self.compute("a", False), 60)
+        stampede.get_or_compute("key", self.compute("a", False), 60)
+        self.assertEqual(self.calls, 2)
@@ -1,12 +1,16 @@
 import shutil
 import tempfile
+from io import BytesIO
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
+from posts import uploads
 from posts.forms import PostForm
 from posts.models import Group, Post
 
@@ -140,3 +144,69 @@ class PostCreateFormTests(TestCase):
         self.assertEqual(post.author, self.user)
         self.assertEqual(post.group, None)
         self.assertRedirects(response, "/Dmitriy/1/")
+
+
+@override_settings(POSTS_IMAGE_MAX_DIMENSION=100)
+class ImageUploadTests(TestCase):
+    def camera_jpeg(self, size=(300, 200), orientation=6):
+        exif = Image.Exif()
+        exif[0x0112] = orientation
+        exif[0x010F] = "Camera"
+        content = BytesIO()
+        Image.new("RGB", size, "red").save(content, "JPEG", exif=exif)
+        return SimpleUploadedFile(
+            name="photo.jpg",
+            content=content.getvalue(),
+            content_type="image/jpeg",
+        )
+
+    def clean_image(self, upload):
+        form = PostForm(data={"text": "Текст"}, files={"image": upload})
+        self.assertTrue(form.is_valid(), form.errors)
+        return Image.open(form.cleaned_data["image"])
+
+    def test_large_image_is_rotated_downsized_and_stripped(self):
+        """Большая картинка поворачивается, уменьшается и теряет EXIF"""
+        image = self.clean_image(self.camera_jpeg())
+        self.assertEqual(image.format, "JPEG")
+        self.assertEqual(image.size, (67, 100))
+        self.assertEqual(dict(image.getexif()), {})
+
+    def test_small_image_is_kept_as_is(self):
+        """Маленькая картинка без EXIF сохраняется без перекодирования"""
+        content = BytesIO()
+        Image.new("RGB", (50, 40), "red").save(content, "PNG")
+        upload = SimpleUploadedFile(
+            name="small.png", content=content.getvalue()
+        )
+        form = PostForm(data={"text": "Текст"}, files={"image": upload})
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertIs(form.cleaned_data["image"], upload)
+
+    @override_settings(POSTS_IMAGE_MAX_UPLOAD_SIZE=100)
+    def test_too_large_file_is_rejected(self):
+        """Слишком тяжёлый файл отклоняется"""
+        form = PostForm(
+            data={"text": "Текст"}, files={"image": self.camera_jpeg()}
+        )
+        self.assertFalse(form.is_valid())
+        self.assertTrue(form.errors["image"][0].startswith("Файл больше"))
+
+    def test_not_an_image_is_rejected(self):
+        """Файл, который не является картинкой, отклоняется"""
+        upload = SimpleUploadedFile(name="fake.jpg", content=b"not image")
+        form = PostForm(data={"text": "Текст"}, files={"image": upload})
+        self.assertFalse(form.is_valid())
+        self.assertIn("image", form.errors)
+
+    def test_processing_bug_is_not_hidden(self):
+        """Ошибка, не связанная с декодированием, не превращается в
+        «неверную картинку»"""
+        form = PostForm(
+            data={"text": "Текст"}, files={"image": self.camera_jpeg()}
+        )
+        with mock.patch.object(
+            uploads, "normalize", side_effect=KeyError("bug")
+        ):
+            with self.assertRaises(KeyError):
+                form.is_valid()
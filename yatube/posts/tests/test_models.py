@@ -1,7 +1,10 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
 
-from posts.models import Group, Post
+from posts.models import AuthorStats, Comment, Follow, Group, Post
 
 User = get_user_model()
 
@@ -34,3 +37,66 @@ class GroupModelTests(TestCase):
         test_group = GroupModelTests.group
         expected_group_name = test_group.title
         self.assertEqual(expected_group_name, str(test_group))
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="Dmitriy")
+        cls.reader = User.objects.create_user(username="Reader")
+
+    def test_counters_follow_creates_and_deletes(self):
+        """Счётчики меняются при создании и удалении строк"""
+        post = Post.objects.create(text="text", author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text="c")
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        stats = AuthorStats.objects.get(user=self.author)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 1)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.reader).following_count, 1
+        )
+        follow.delete()
+        post.delete()
+        stats.refresh_from_db()
+        self.assertEqual(stats.posts_count, 0)
+        self.assertEqual(stats.followers_count, 0)
+
+    def test_recount_counters_repairs_drift(self):
+        """Команда recount_counters восстанавливает счётчики"""
+        post = Post.objects.create(text="text", author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text="c")
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.update(comments_count=7)
+        AuthorStats.objects.all().delete()
+        call_command("recount_counters", stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        stats = AuthorStats.objects.get(user=self.author)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 1)
+
+    def test_recount_keeps_existing_rows(self):
+        """Пересчёт обновляет строки на месте и сохраняет fanned_out"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        AuthorStats.objects.filter(user=self.author).update(
+            followers_count=5, fanned_out=False
+        )
+        AuthorStats.objects.recount()
+        AuthorStats.objects.recount(User.objects.filter(pk=self.author.pk))
+        stats = AuthorStats.objects.get(user=self.author)
+        self.assertEqual(stats.followers_count, 1)
+        self.assertFalse(stats.fanned_out)
+
+    def test_missing_stats_are_counted_without_writes(self):
+        """Без строки AuthorStats счётчики считаются без записи в базу"""
+        Post.objects.create(text="text", author=self.author)
+        AuthorStats.objects.filter(user=self.author).delete()
+        author = User.objects.select_related("stats").get(pk=self.author.pk)
+        with self.assertNumQueries(1):
+            stats = AuthorStats.objects.for_user(author)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertFalse(AuthorStats.objects.filter(user=self.author).exists())
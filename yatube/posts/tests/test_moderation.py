@@ -0,0 +1,274 @@
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import (
+    Client,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from posts import moderation, search, thumbnails
+from posts.models import (
+    AuthorStats,
+    Comment,
+    Follow,
+    Group,
+    Post,
+    TimelineEntry,
+)
+from posts.tests.test_thumbnails import SMALL_GIF
+
+User = get_user_model()
+
+
+@override_settings(
+    MEDIA_ROOT=tempfile.mkdtemp(dir=settings.BASE_DIR),
+    POSTS_MODERATION_WORKERS=0,
+)
+@mock.patch.object(moderation, "CHUNK_SIZE", 2)
+class ModerationActionsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username="admin", email="admin@yatube.ru", password="admin"
+        )
+        cls.spammer = User.objects.create_user(username="spammer")
+        cls.user = User.objects.create_user(username="Dmitriy")
+        cls.group = Group.objects.create(
+            title="Dmitriy_Notes", slug="DK", description="Записи Дмитрия"
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.admin_client = Client()
+        self.admin_client.force_login(self.admin)
+        Follow.objects.create(user=self.user, author=self.spammer)
+        self.post = Post.objects.create(text="Запись", author=self.user)
+        self.spam = [
+            Post.objects.create(text="Купи слона", author=self.spammer)
+            for _ in range(5)
+        ]
+        for post in self.spam:
+            Comment.objects.create(post=post, author=self.user, text="Нет")
+            Comment.objects.create(
+                post=self.post, author=self.spammer, text="Купи слона"
+            )
+
+    def action(self, model, action, queryset, **data):
+        response = self.admin_client.post(
+            reverse(f"admin:posts_{model}_changelist"),
+            {
+                "action": action,
+                "_selected_action": [obj.pk for obj in queryset],
+                **data,
+            },
+            follow=True,
+        )
+        self.assertContains(response, "прогресс")
+        return response
+
+    def progress(self, response):
+        """Прогресс задачи по ссылке из сообщения админки."""
+        message = str(list(response.context["messages"])[0])
+        adress = message.split('href="')[1].split('"')[0]
+        return self.admin_client.get(adress).json()
+
+    def test_delete_by_author(self):
+        """Удаляются все записи автора вместе с комментариями и лентами"""
+        response = self.action("post", "delete_by_author", self.spam[:1])
+        self.assertEqual(
+            list(Post.objects.values_list("pk", flat=True)), [self.post.pk]
+        )
+        self.assertFalse(Comment.objects.filter(author=self.user).exists())
+        self.assertFalse(self.user.timeline.exists())
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.spammer).posts_count, 0
+        )
+        self.assertEqual(search.search_page("слона")[0], [])
+        job = self.progress(response)
+        self.assertEqual(job["state"], "done")
+        self.assertEqual(job["done"], job["total"])
+        self.assertEqual(job["total"], 5)
+
+    def test_purge_comments_of_author(self):
+        """Удаляются все комментарии автора, счётчики пересчитываются"""
+        comment = Comment.objects.filter(author=self.spammer).first()
+        self.action("comment", "purge_authors", [comment])
+        self.assertFalse(Comment.objects.filter(author=self.spammer).exists())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+        self.assertEqual(Comment.objects.count(), 5)
+
+    def test_move_to_group(self):
+        """Выбранные записи переносятся в группу"""
+        self.action("post", "move_to_group", self.spam, group=self.group.pk)
+        self.assertEqual(self.group.posts.count(), 5)
+        self.action("post", "move_to_group", self.spam[:2], group="")
+        self.assertEqual(self.group.posts.count(), 3)
+
+    def test_images_are_deleted_when_unused(self):
+        """Картинка удаляется, только когда на неё нет других записей"""
+        upload = SimpleUploadedFile("spam.gif", SMALL_GIF, "image/gif")
+        spam = Post.objects.create(
+            text="Купи слона", author=self.spammer, image=upload
+        )
+        thumbnails.schedule(spam.image)
+        self.post.image = spam.image.name
+        self.post.save()
+        self.action("post", "delete_by_author", [spam])
+        self.assertTrue(default_storage.exists(spam.image.name))
+
+        self.post.delete()
+        moderation.delete_images([spam.image.name])
+        self.assertFalse(default_storage.exists(spam.image.name))
+        self.assertIsNone(thumbnails.get_cached(spam.image))
+
+
+@override_settings(POSTS_MODERATION_WORKERS=0)
+@mock.patch.object(moderation, "CHUNK_SIZE", 2)
+class DeferredDeleteTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username="admin", email="admin@yatube.ru", password="admin"
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.admin_client = Client()
+        self.admin_client.force_login(self.admin)
+        self.user = User.objects.create_user(username="Dmitriy")
+        self.spammer = User.objects.create_user(username="spammer")
+        Follow.objects.create(user=self.user, author=self.spammer)
+        Follow.objects.create(user=self.spammer, author=self.user)
+        self.post = Post.objects.create(text="Запись", author=self.user)
+        self.spam = [
+            Post.objects.create(text=f"Купи слона {i}", author=self.spammer)
+            for i in range(5)
+        ]
+        Comment.objects.create(
+            post=self.post, author=self.spammer, text="Купи слона"
+        )
+        AuthorStats.objects.recount()
+
+    def delete_selected(self, model, queryset):
+        response = self.admin_client.post(
+            reverse(f"admin:{model}_changelist"),
+            {
+                "action": "delete_selected",
+                "post": "yes",
+                "_selected_action": [obj.pk for obj in queryset],
+            },
+            follow=True,
+        )
+        self.assertContains(response, "прогресс")
+
+    def assertHidden(self, post):
+        self.assertNotContains(
+            self.client.get(reverse("posts:index")), post.text
+        )
+        response = self.client.get(
+            reverse("posts:post", args=[post.author.username, post.pk])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(POSTS_MODERATION_WORKERS=1)
+    def test_hidden_before_deletion(self):
+        """Записи и пользователь пропадают из лент до фонового удаления"""
+        # В TestCase транзакция не коммитится, и задача не стартует.
+        self.delete_selected("posts_post", self.spam[:1])
+        self.assertTrue(Post.objects.get(pk=self.spam[0].pk).hidden)
+        self.assertHidden(self.spam[0])
+
+        self.delete_selected("auth_user", [self.spammer])
+        self.assertEqual(Post.objects.filter(author=self.spammer).count(), 5)
+        self.assertHidden(self.spam[1])
+        response = self.client.get(
+            reverse("posts:profile", args=[self.spammer.username])
+        )
+        self.assertEqual(response.status_code, 404)
+        self.client.force_login(self.user)
+        self.assertNotContains(
+            self.client.get(reverse("posts:follow_index")), "Купи слона"
+        )
+
+    @override_settings(POSTS_MODERATION_WORKERS=1)
+    def test_profile_counts_visible_posts(self):
+        """Профиль и его пагинатор не считают записи, ждущие удаления"""
+        spam = Post.objects.filter(pk__in=[post.pk for post in self.spam[:3]])
+        moderation.hide_posts(spam)
+        moderation.hide_posts(spam)
+        response = self.client.get(
+            reverse("posts:profile", args=[self.spammer.username])
+        )
+        self.assertEqual(response.context["paginator"].count, 2)
+        self.assertEqual(response.context["stats"].posts_count, 2)
+        self.assertContains(response, "Записей: 2")
+        AuthorStats.objects.recount()
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.spammer).posts_count, 2
+        )
+
+    def test_delete_post(self):
+        """Удалённая из админки запись удаляется с комментариями"""
+        self.admin_client.post(
+            reverse("admin:posts_post_delete", args=[self.post.pk]),
+            {"post": "yes"},
+        )
+        self.assertFalse(Post.objects.filter(pk=self.post.pk).exists())
+        self.assertFalse(Comment.objects.exists())
+
+    def test_delete_user(self):
+        """Пользователь удаляется со всеми записями, комментариями и
+        подписками"""
+        response = self.admin_client.get(
+            reverse("admin:auth_user_delete", args=[self.spammer.pk])
+        )
+        self.assertEqual(response.status_code, 200)
+        self.admin_client.post(
+            reverse("admin:auth_user_delete", args=[self.spammer.pk]),
+            {"post": "yes"},
+        )
+        self.assertFalse(User.objects.filter(pk=self.spammer.pk).exists())
+        self.assertEqual(
+            list(Post.objects.values_list("pk", flat=True)), [self.post.pk]
+        )
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(TimelineEntry.objects.exists())
+        stats = AuthorStats.objects.get(user=self.user)
+        self.assertEqual(stats.followers_count, 0)
+        self.assertEqual(stats.following_count, 0)
+
+
+@override_settings(POSTS_MODERATION_WORKERS=1)
+class BackgroundModerationTests(TransactionTestCase):
+    def test_job_runs_in_executor_after_commit(self):
+        """Задача выполняется в потоке модерации после коммита"""
+        cache.clear()
+        user = User.objects.create_user(username="spammer")
+        for i in range(3):
+            Post.objects.create(text=f"Купи слона {i}", author=user)
+        job_id = moderation.hide_posts(Post.objects.all())
+        deadline = time.monotonic() + 10
+        while moderation.progress(job_id)["state"] not in ("done", "failed"):
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.05)
+        self.assertEqual(moderation.progress(job_id)["state"], "done")
+        self.assertFalse(Post.objects.exists())
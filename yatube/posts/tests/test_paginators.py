@@ -0,0 +1,160 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Group, Post
+from posts.paginators import CursorPaginator, PostPaginator
+
+User = get_user_model()
+
+
+@override_settings(POSTS_PAGINATION="cursor")
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="Dmitriy")
+        cls.group = Group.objects.create(
+            title="Dmitriy_Notes", slug="DK", description="Записи Дмитрия"
+        )
+        Post.objects.bulk_create(
+            Post(text="text %s" % i, author=cls.user, group=cls.group)
+            for i in range(23)
+        )
+        # Одинаковая дата у всех записей: порядок держится только на id.
+        Post.objects.update(pub_date=timezone.now())
+        cls.ordered_ids = list(
+            Post.objects.order_by("-pub_date", "-pk").values_list(
+                "pk", flat=True
+            )
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.paginator = CursorPaginator(Post.objects.all(), 10)
+
+    def ids(self, page):
+        return [post.pk for post in page]
+
+    def test_pages_follow_each_other_without_gaps(self):
+        """Курсоры ведут по ленте без пропусков и повторов"""
+        first = self.paginator.get_page(None)
+        second = self.paginator.get_page(first.next_cursor)
+        third = self.paginator.get_page(second.next_cursor)
+        self.assertEqual(
+            self.ids(first) + self.ids(second) + self.ids(third),
+            self.ordered_ids,
+        )
+        self.assertFalse(first.has_previous())
+        self.assertTrue(second.has_previous())
+        self.assertFalse(third.has_next())
+
+    def test_previous_cursor_returns_to_previous_page(self):
+        """Курсор назад возвращает предыдущую страницу"""
+        first = self.paginator.get_page(None)
+        second = self.paginator.get_page(first.next_cursor)
+        third = self.paginator.get_page(second.next_cursor)
+        back = self.paginator.get_page(third.previous_cursor)
+        self.assertEqual(self.ids(back), self.ids(second))
+        self.assertEqual(
+            self.ids(self.paginator.get_page(back.previous_cursor)),
+            self.ids(first),
+        )
+
+    def test_broken_cursor_returns_first_page(self):
+        """Битый курсор отдаёт первую страницу"""
+        page = self.paginator.get_page("not-a-cursor")
+        self.assertEqual(self.ids(page), self.ordered_ids[:10])
+
+    def test_feed_pages_do_not_count_posts(self):
+        """Ленты в режиме курсора не выполняют COUNT(*)"""
+        pages_names = (
+            reverse("posts:index"),
+            reverse("posts:group", kwargs={"slug": "DK"}),
+        )
+        for adress in pages_names:
+            with self.subTest(adress=adress):
+                with CaptureQueriesContext(connection) as queries:
+                    page = self.guest_client.get(adress).context["page"]
+                self.assertEqual(len(page.object_list), 10)
+                for query in queries.captured_queries:
+                    self.assertNotIn("COUNT(*)", query["sql"])
+                    self.assertNotIn("OFFSET", query["sql"])
+                response = self.guest_client.get(
+                    adress, {"cursor": page.next_cursor}
+                )
+                self.assertEqual(
+                    self.ids(response.context["page"]),
+                    self.ordered_ids[10:20],
+                )
+                self.assertContains(response, "?cursor=")
+
+
+class PostPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="Dmitriy")
+        Post.objects.bulk_create(
+            Post(text="text %s" % i, author=cls.user) for i in range(23)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_count_is_cached_until_write(self):
+        """COUNT(*) выполняется один раз до следующей записи"""
+        self.assertEqual(PostPaginator(Post.objects.all(), 10).count, 23)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                PostPaginator(Post.objects.with_related(), 10).count, 23
+            )
+        Post.objects.create(text="Тестовый текст", author=self.user)
+        self.assertEqual(PostPaginator(Post.objects.all(), 10).count, 24)
+
+    @override_settings(POSTS_COUNT_LIMIT=5)
+    def test_count_above_limit_is_approximate(self):
+        """Выше предела число записей приблизительное, страницы доступны"""
+        paginator = PostPaginator(Post.objects.order_by("pk"), 10)
+        page = paginator.get_page(2)
+        self.assertEqual(paginator.count_label, "5+")
+        self.assertEqual(len(page), 10)
+        self.assertTrue(page.has_next())
+        self.assertEqual(page.window, [1, 2, 3, None])
+        last = paginator.get_page(3)
+        self.assertEqual(len(last), 3)
+        self.assertFalse(last.has_next())
+        self.assertEqual(last.window, [1, 2, 3])
+
+    @override_settings(POSTS_COUNT_LIMIT=5)
+    def test_page_past_approximate_end_is_404(self):
+        """Страница за концом ленты с приблизительным счётом - 404"""
+        group = Group.objects.create(title="g", slug="g", description="g")
+        Post.objects.update(group=group)
+        for adress in (
+            reverse("posts:index"),
+            reverse("posts:group", args=["g"]),
+        ):
+            with self.subTest(adress=adress):
+                response = Client().get(adress, {"page": 99})
+                self.assertEqual(response.status_code, 404)
+
+    def test_window_skips_distant_pages(self):
+        """Навигация показывает края и соседей текущей страницы"""
+        paginator = PostPaginator(range(20000), 10, count=20000)
+        self.assertEqual(
+            paginator.page(50).window,
+            [1, None, 48, 49, 50, 51, 52, None, 2000],
+        )
+        self.assertEqual(paginator.page(1).window, [1, 2, 3, None, 2000])
+        self.assertEqual(
+            paginator.page(4).window, [1, 2, 3, 4, 5, 6, None, 2000]
+        )
+        self.assertEqual(
+            PostPaginator(range(30), 10, count=30).page(2).window,
+            [1, 2, 3],
+        )
@@ -0,0 +1,98 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import profiling
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class ProfilingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="Dmitriy")
+        cls.staff = User.objects.create_user(username="Staff", is_staff=True)
+        cls.group = Group.objects.create(
+            title="Dmitriy_Notes", slug="DK", description="Записи Дмитрия"
+        )
+        Post.objects.create(
+            text="Тестовый текст", author=cls.user, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        profiling.reset()
+        self.guest_client = Client()
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    def test_request_is_measured_by_url_name(self):
+        """Запрос попадает в гистограммы под именем маршрута"""
+        # Кэш пуст: число записей и страница.
+        with self.assertNumQueries(2):
+            self.guest_client.get(reverse("posts:index"))
+        stats = profiling.snapshot()["posts:index"]
+        self.assertEqual(stats["queries"]["count"], 1)
+        self.assertEqual(stats["queries"]["max"], 2)
+        self.assertGreater(stats["template_ms"]["max"], 0)
+        self.assertGreaterEqual(
+            stats["view_ms"]["max"], stats["template_ms"]["max"]
+        )
+
+    def test_server_timing_is_for_staff_only(self):
+        """Заголовок Server-Timing получают только сотрудники"""
+        response = self.guest_client.get(reverse("posts:index"))
+        self.assertFalse(response.has_header("Server-Timing"))
+        response = self.staff_client.get(reverse("posts:index"))
+        self.assertRegex(response["Server-Timing"], r'desc="\d+ queries"')
+
+    @override_settings(
+        POSTS_QUERY_BUDGETS={"posts:index": 1},
+        POSTS_QUERY_BUDGET_ACTION="raise",
+    )
+    def test_query_budget_can_fail_request(self):
+        """Превышение бюджета запросов роняет запрос в режиме raise"""
+        with self.assertRaises(profiling.QueryBudgetExceeded):
+            self.guest_client.get(reverse("posts:index"))
+        self.guest_client.get(reverse("posts:group", kwargs={"slug": "DK"}))
+        self.assertEqual(
+            profiling.snapshot()["posts:index"]["over_budget"], 1
+        )
+
+    @override_settings(POSTS_QUERY_BUDGETS={"posts:index": 1})
+    def test_query_budget_is_logged(self):
+        """Превышение бюджета по умолчанию пишется в лог"""
+        with self.assertLogs("posts.profiling", "WARNING") as logs:
+            response = self.guest_client.get(reverse("posts:index"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("posts:index", logs.output[0])
+
+    def test_stats_page_is_for_staff_only(self):
+        """Гистограммы доступны только сотрудникам"""
+        self.guest_client.get(reverse("posts:index"))
+        response = self.guest_client.get(reverse("profiling"))
+        self.assertEqual(response.status_code, 302)
+        data = self.staff_client.get(reverse("profiling")).json()
+        self.assertEqual(
+            set(data["posts:index"]["sql_ms"]),
+            {"count", "mean", "max", "buckets", "p50", "p95", "p99"},
+        )
+        self.assertEqual(
+            set(data["feed_cache"]), {"hits", "misses", "generation"}
+        )
+        self.assertGreaterEqual(data["feed_cache"]["misses"], 1)
+
+
+class HistogramTests(TestCase):
+    def test_percentiles(self):
+        """Перцентили берутся по верхним границам корзин"""
+        histogram = profiling.Histogram(profiling.TIME_BOUNDS)
+        for value in [1.5] * 90 + [40] * 9 + [7000]:
+            histogram.add(value)
+        self.assertEqual(histogram.percentile(50), 2)
+        self.assertEqual(histogram.percentile(95), 50)
+        self.assertEqual(histogram.percentile(99), 50)
+        self.assertEqual(histogram.percentile(100), 7000)
@@ -0,0 +1,114 @@
+import os
+import sqlite3
+import tempfile
+from contextlib import closing
+
+from django.contrib.sessions.models import Session
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+
+from posts import routers
+from posts.management.commands.replicate_sqlite import copy_database
+from posts.models import Group, Post
+
+
+@override_settings(POSTS_READ_REPLICAS=["replica"])
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        self.router = routers.PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+
+    def request(self, request, write=False):
+        """Алиасы чтения до и после записи и ответ middleware."""
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(Post))
+            if write:
+                self.router.db_for_write(Group)
+            seen.append(self.router.db_for_read(Post))
+            seen.append(self.router.db_for_read(Session))
+            return HttpResponse()
+
+        response = routers.ReplicaMiddleware(view)(request)
+        return seen, response
+
+    def test_get_reads_from_replica(self):
+        """GET читает из реплики, сессии и запросы вне view - из default"""
+        seen, response = self.request(self.factory.get("/"))
+        self.assertEqual(seen, ["replica", "replica", "default"])
+        self.assertNotIn(routers.PIN_COOKIE, response.cookies)
+        self.assertEqual(self.router.db_for_read(Post), "default")
+
+    def test_write_pins_user_to_primary(self):
+        """После записи чтение идёт в default, пока жив cookie"""
+        seen, response = self.request(self.factory.get("/"), write=True)
+        self.assertEqual(seen, ["replica", "default", "default"])
+        cookie = response.cookies[routers.PIN_COOKIE]
+        self.assertEqual(cookie["max-age"], 10)
+
+        request = self.factory.get("/")
+        request.COOKIES[routers.PIN_COOKIE] = cookie.value
+        seen, _ = self.request(request)
+        self.assertEqual(seen, ["default", "default", "default"])
+
+    def test_unsafe_methods_read_from_primary(self):
+        """POST читает из default"""
+        seen, _ = self.request(self.factory.post("/"))
+        self.assertEqual(seen, ["default", "default", "default"])
+
+    @override_settings(POSTS_READ_REPLICAS=["replica", "replica2"])
+    def test_replica_is_chosen_once_per_request(self):
+        """Все чтения запроса идут в одну и ту же реплику"""
+        for _ in range(5):
+            seen = []
+
+            def view(request):
+                for _ in range(20):
+                    seen.append(self.router.db_for_read(Post))
+                return HttpResponse()
+
+            routers.ReplicaMiddleware(view)(self.factory.get("/"))
+            self.assertEqual(len(set(seen)), 1)
+            self.assertIn(seen[0], ["replica", "replica2"])
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(self.router.allow_migrate("replica", "posts"))
+        self.assertTrue(self.router.allow_migrate("default", "posts"))
+
+
+@override_settings(POSTS_READ_REPLICAS=["replica"])
+class ReplicaTransactionTests(TestCase):
+    def test_reads_in_transaction_go_to_primary(self):
+        """Чтение внутри транзакции идёт в default"""
+        router = routers.PrimaryReplicaRouter()
+
+        def view(request):
+            # TestCase держит открытую транзакцию на default.
+            self.assertEqual(router.db_for_read(Post), "default")
+            return HttpResponse()
+
+        routers.ReplicaMiddleware(view)(RequestFactory().get("/"))
+
+
+class ReplicateSqliteTests(SimpleTestCase):
+    def test_copy_database(self):
+        """Реплика получает снимок основной базы"""
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, "primary.sqlite3")
+            target = os.path.join(directory, "replica.sqlite3")
+            with closing(sqlite3.connect(source)) as db:
+                db.execute("CREATE TABLE post (text TEXT)")
+                db.execute("INSERT INTO post VALUES ('Тестовый текст')")
+                db.commit()
+            copy_database(source, target)
+            with closing(sqlite3.connect(target)) as db:
+                self.assertEqual(
+                    db.execute("SELECT text FROM post").fetchall(),
+                    [("Тестовый текст",)],
+                )
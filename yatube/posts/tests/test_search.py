@@ -0,0 +1,106 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import search
+from posts.models import Post
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="Dmitriy")
+        cls.admin = User.objects.create_superuser(
+            username="admin", email="admin@yatube.ru", password="admin"
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def found(self, query):
+        posts, _ = search.search_page(query, per_page=100)
+        return posts
+
+    def test_index_follows_save_and_delete(self):
+        """Индекс обновляется при создании, правке и удалении записи"""
+        post = Post.objects.create(text="Утренний кофе", author=self.user)
+        self.assertEqual(self.found("кофе"), [post])
+        post.text = "Вечерний чай"
+        post.save()
+        self.assertEqual(self.found("кофе"), [])
+        self.assertEqual(self.found("чай"), [post])
+        post.delete()
+        self.assertEqual(self.found("чай"), [])
+
+    def test_results_are_ranked(self):
+        """Записи, где слово встречается чаще, идут первыми"""
+        once = Post.objects.create(
+            text="кот и много других слов про погоду", author=self.user
+        )
+        twice = Post.objects.create(text="кот кот", author=self.user)
+        self.assertEqual(self.found("кот"), [twice, once])
+
+    def test_query_syntax_is_escaped(self):
+        """Операторы FTS5 во вводе не ломают поиск"""
+        post = Post.objects.create(text='текст "в кавычках"', author=self.user)
+        self.assertEqual(self.found('"кавычках AND OR*'), [])
+        self.assertEqual(self.found('кавычках"'), [post])
+
+    def test_pages_follow_each_other_without_gaps(self):
+        """Курсор ведёт по результатам без пропусков и повторов"""
+        Post.objects.bulk_create(
+            Post(text="поиск %s" % i, author=self.user) for i in range(25)
+        )
+        call_command("rebuild_search_index", stdout=StringIO())
+        seen, cursor = [], None
+        for _ in range(3):
+            posts, cursor = search.search_page("поиск", cursor)
+            seen += [post.pk for post in posts]
+        self.assertIsNone(cursor)
+        self.assertEqual(sorted(seen), sorted(set(seen)))
+        self.assertEqual(len(seen), 25)
+
+    @override_settings(POSTS_SEARCH_RANK_WINDOW=3)
+    def test_only_newest_matches_are_ranked(self):
+        """Ранжируются только самые новые совпадения, окно держит курсор"""
+        posts = [
+            Post.objects.create(text="окно %s" % i, author=self.user)
+            for i in range(5)
+        ]
+        first, cursor = search.search_page("окно", per_page=2)
+        # Новая запись не выталкивает из окна уже найденные.
+        Post.objects.create(text="окно 5", author=self.user)
+        second, cursor = search.search_page("окно", cursor, per_page=2)
+        self.assertIsNone(cursor)
+        self.assertTrue(set(posts[2:]) <= set(first + second))
+        self.assertFalse(set(posts[:2]) & set(first + second))
+
+    def test_search_page(self):
+        """Страница поиска показывает найденные записи"""
+        Post.objects.create(text="Найди меня", author=self.user)
+        Post.objects.create(text="Не ищи", author=self.user)
+        response = self.guest_client.get(
+            reverse("posts:search"), {"q": "найди"}
+        )
+        self.assertEqual(
+            [post.text for post in response.context["posts"]], ["Найди меня"]
+        )
+        response = self.guest_client.get(reverse("posts:search"))
+        self.assertEqual(response.context["posts"], [])
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идёт через индекс, а не через LIKE"""
+        Post.objects.create(text="Найди меня", author=self.user)
+        admin_client = Client()
+        admin_client.force_login(self.admin)
+        response = admin_client.get(
+            reverse("admin:posts_post_changelist"), {"q": "найди"}
+        )
+        self.assertEqual(response.context["cl"].result_count, 1)
+        self.assertIn(search.TABLE, str(response.context["cl"].queryset.query))
@@ -0,0 +1,95 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db.models import Count, F, Min
+from django.test import TestCase, override_settings
+
+from posts import search
+from posts.models import (
+    AuthorStats,
+    Comment,
+    Follow,
+    Group,
+    Post,
+    TimelineEntry,
+    User,
+)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(dir=settings.BASE_DIR))
+class SeedCommandTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def seed(self):
+        call_command(
+            "seed_yatube",
+            users=30,
+            groups=3,
+            posts=200,
+            comments_per_post=2,
+            follows_per_user=4,
+            image_ratio=0.5,
+            seed=7,
+            batch_size=50,
+            stdout=StringIO(),
+        )
+
+    def snapshot(self):
+        """Данные без привязки к значениям первичных ключей."""
+        user = User.objects.aggregate(first=Min("pk"))["first"]
+        group = Group.objects.aggregate(first=Min("pk"))["first"]
+        post = Post.objects.aggregate(first=Min("pk"))["first"]
+        return (
+            [
+                (author - user, group_id and group_id - group, image)
+                for author, group_id, image in Post.objects.order_by(
+                    "pk"
+                ).values_list("author_id", "group_id", "image")
+            ],
+            [
+                (post_id - post, author - user)
+                for post_id, author in Comment.objects.order_by(
+                    "pk"
+                ).values_list("post_id", "author_id")
+            ],
+            [
+                (follower - user, author - user)
+                for follower, author in Follow.objects.order_by(
+                    "pk"
+                ).values_list("user_id", "author_id")
+            ],
+        )
+
+    def test_seed_creates_rows_and_derived_data(self):
+        """Наполнение создаёт строки, счётчики, ленты и поисковый индекс"""
+        self.seed()
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertTrue(Comment.objects.exists())
+        self.assertTrue(Post.objects.exclude(image="").exists())
+        self.assertTrue(Follow.objects.exists())
+        self.assertFalse(Follow.objects.filter(user=F("author")).exists())
+        for post in Post.objects.annotate(real=Count("comments")):
+            self.assertEqual(post.comments_count, post.real)
+        self.assertEqual(
+            sum(AuthorStats.objects.values_list("posts_count", flat=True)),
+            200,
+        )
+        self.assertTrue(TimelineEntry.objects.exists())
+        self.assertEqual(len(search.search_page("Запись")[0]), 10)
+
+    def test_seed_is_deterministic(self):
+        """Одинаковое зерно даёт одинаковые данные"""
+        self.seed()
+        first = self.snapshot()
+        for model in (Follow, Comment, Post, Group, User):
+            model.objects.all().delete()
+        self.seed()
+        self.assertEqual(self.snapshot(), first)
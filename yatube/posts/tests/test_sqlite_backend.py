@@ -0,0 +1,65 @@
+import os
+import sqlite3
+import tempfile
+from contextlib import closing
+
+from django.conf import settings
+from django.db import connection
+from django.test import SimpleTestCase
+
+from yatube.backends.sqlite3.base import DatabaseWrapper
+
+
+class SqliteBackendTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.name = os.path.join(directory.name, "db.sqlite3")
+        self.wrapper = DatabaseWrapper(
+            {
+                **connection.settings_dict,
+                "NAME": self.name,
+                # Настройки сайта, а не тестовой базы в памяти.
+                "OPTIONS": settings.DATABASES["default"]["OPTIONS"],
+            },
+            "sqlite_backend_test",
+        )
+        self.addCleanup(self.wrapper.close)
+
+    def pragma(self, name):
+        with self.wrapper.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def test_pragmas_are_applied_to_new_connections(self):
+        """PRAGMA из OPTIONS выполняются на каждом новом соединении"""
+        options = settings.DATABASES["default"]["OPTIONS"]
+        for _ in range(2):
+            self.assertEqual(self.pragma("journal_mode"), "wal")
+            self.assertEqual(self.pragma("synchronous"), 1)
+            self.assertEqual(
+                self.pragma("busy_timeout"), options["timeout"] * 1000
+            )
+            self.assertEqual(
+                self.pragma("cache_size"), options["pragmas"]["cache_size"]
+            )
+            self.wrapper.close()
+
+    def test_transactions_begin_immediate(self):
+        """Транзакция сразу берёт блокировку записи"""
+        self.wrapper.ensure_connection()
+        statements = []
+        self.wrapper.connection.set_trace_callback(statements.append)
+        # Так транзакцию начинает atomic() на SQLite.
+        self.wrapper.set_autocommit(
+            False, force_begin_transaction_with_broken_autocommit=True
+        )
+        self.addCleanup(self.wrapper.rollback)
+        self.assertIn("BEGIN IMMEDIATE", statements)
+        # Блокировка взята до первой записи: второй писатель её не
+        # получает.
+        with closing(sqlite3.connect(self.name, timeout=0)) as other:
+            with self.assertRaisesMessage(
+                sqlite3.OperationalError, "database is locked"
+            ):
+                other.execute("BEGIN IMMEDIATE")
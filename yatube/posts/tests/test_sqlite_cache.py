@@ -0,0 +1,45 @@
+import os
+import tempfile
+import time
+
+from django.test import SimpleTestCase
+
+from yatube.backends.sqlite_cache import SqliteCache
+
+
+class SqliteCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        location = os.path.join(directory.name, "cache.sqlite3")
+        self.cache = SqliteCache(location, {})
+        # Второй экземпляр с отдельным соединением, как в другом процессе.
+        self.other = SqliteCache(location, {})
+
+    def test_values_are_shared(self):
+        """Значение видно через другое соединение к тому же файлу"""
+        self.cache.set("post", {"text": "Тестовый текст"})
+        self.assertEqual(self.other.get("post"), {"text": "Тестовый текст"})
+        self.assertTrue(self.other.has_key("post"))
+        self.other.delete("post")
+        self.assertIsNone(self.cache.get("post"))
+
+    def test_add_and_incr(self):
+        """add не перезаписывает живой ключ, incr считает атомарно"""
+        self.assertTrue(self.cache.add("counter", 1))
+        self.assertFalse(self.other.add("counter", 5))
+        self.assertEqual(self.other.incr("counter"), 2)
+        self.assertEqual(self.cache.incr("counter", 10), 12)
+        with self.assertRaises(ValueError):
+            self.cache.incr("missing")
+
+    def test_expired_values(self):
+        """Просроченный ключ не читается и снова доступен для add"""
+        self.cache.set("post", "old", 0.01)
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.get("post"))
+        self.assertTrue(self.cache.add("post", "new"))
+        self.assertEqual(self.cache.get("post"), "new")
+        self.assertTrue(self.cache.touch("post", 0.01))
+        self.cache.clear()
+        self.assertFalse(self.cache.has_key("post"))
@@ -0,0 +1,159 @@
+import shutil
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import (
+    Client,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from posts import thumbnails
+from posts.models import Post
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b"\x47\x49\x46\x38\x39\x61\x01\x00"
+    b"\x01\x00\x00\x00\x00\x21\xf9\x04"
+    b"\x01\x0a\x00\x01\x00\x2c\x00\x00"
+    b"\x00\x00\x01\x00\x01\x00\x00\x02"
+    b"\x02\x4c\x01\x00\x3b"
+)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(dir=settings.BASE_DIR))
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="Dmitriy")
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def upload(self):
+        return SimpleUploadedFile(
+            name="small.gif", content=SMALL_GIF, content_type="image/gif"
+        )
+
+    def test_new_post_schedules_thumbnail(self):
+        """Новая запись с картинкой ставит миниатюру в очередь"""
+        with mock.patch.object(thumbnails, "schedule") as schedule:
+            self.authorized_client.post(
+                reverse("posts:new_post"),
+                data={"text": "Текст", "image": self.upload()},
+            )
+        post = Post.objects.get()
+        schedule.assert_called_once_with(post.image)
+
+    def test_placeholder_until_thumbnail_is_ready(self):
+        """Пока миниатюры нет, страница не ждёт её и выводит заглушку"""
+        post = Post.objects.create(
+            text="Текст", author=self.user, image=self.upload()
+        )
+        with mock.patch.object(thumbnails, "schedule") as schedule:
+            response = self.client.get(reverse("posts:index"))
+        schedule.assert_called_once_with(post.image)
+        self.assertContains(response, "Картинка обрабатывается")
+        self.assertNotContains(response, '<img class="card-img"')
+
+        thumbnails.generate(post.image.name)
+        response = self.client.get(reverse("posts:index"))
+        self.assertNotContains(response, "Картинка обрабатывается")
+        self.assertContains(response, '<img class="card-img"')
+
+    def test_missing_checks_key_store(self):
+        """missing находит картинки без миниатюр одним проходом по ключам"""
+        ready, cold = (
+            Post.objects.create(
+                text="Текст", author=self.user, image=self.upload()
+            )
+            for _ in range(2)
+        )
+        with mock.patch.object(thumbnails, "schedule"):
+            thumbnails.generate(ready.image.name)
+        self.assertEqual(
+            thumbnails.missing([ready.image.name, cold.image.name]),
+            [cold.image.name],
+        )
+
+    def test_warm_thumbnails_command(self):
+        """Команда создаёт недостающие миниатюры и пропускает готовые"""
+        post = Post.objects.create(
+            text="Текст", author=self.user, image=self.upload()
+        )
+        out = StringIO()
+        call_command("warm_thumbnails", workers=0, stdout=out)
+        self.assertIn("создано 1", out.getvalue())
+        self.assertIsNotNone(thumbnails.get_cached(post.image))
+
+        out = StringIO()
+        call_command("warm_thumbnails", workers=0, stdout=out)
+        self.assertIn("создано 0", out.getvalue())
+
+    def test_card_has_srcset_for_all_widths(self):
+        """Карточка предлагает браузеру все ширины картинки через srcset"""
+        post = Post.objects.create(
+            text="Текст", author=self.user, image=self.upload()
+        )
+        with mock.patch.object(thumbnails, "schedule"):
+            thumbnails.generate(post.image.name)
+        response = self.client.get(reverse("posts:index"))
+        variants = thumbnails.get_cached(post.image)
+        self.assertContains(response, f'srcset="{variants.srcset}"')
+        for width in thumbnails.WIDTHS:
+            with self.subTest(width=width):
+                self.assertIn(f" {width}w", variants.srcset)
+        if "WEBP" in thumbnails.FORMATS:
+            self.assertContains(response, 'type="image/webp"')
+            self.assertIn(".webp ", variants.webp_srcset)
+
+
+@override_settings(
+    MEDIA_ROOT=tempfile.mkdtemp(dir=settings.BASE_DIR),
+    POSTS_THUMBNAIL_WORKERS=1,
+)
+class ThumbnailPoolTests(TransactionTestCase):
+    def tearDown(self):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+
+    def test_pool_generates_thumbnail_after_commit(self):
+        """Пул создаёт миниатюры новой записи после коммита"""
+        cache.clear()
+        user = User.objects.create_user(username="Dmitriy")
+        client = Client()
+        client.force_login(user)
+        client.post(
+            reverse("posts:new_post"),
+            data={
+                "text": "Текст",
+                "image": SimpleUploadedFile(
+                    name="small.gif",
+                    content=SMALL_GIF,
+                    content_type="image/gif",
+                ),
+            },
+        )
+        name = Post.objects.get().image.name
+        deadline = time.monotonic() + 10
+        while thumbnails.missing([name]) or thumbnails.pending:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.05)
+        self.assertIsNotNone(thumbnails.get_cached(Post.objects.get().image))
@@ -0,0 +1,103 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import AuthorStats, Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="Dmitriy")
+        cls.reader = User.objects.create_user(username="Reader")
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def feed(self):
+        response = self.reader_client.get(reverse("posts:follow_index"))
+        return list(response.context["page"])
+
+    def test_post_is_fanned_out_to_followers(self):
+        """Новая запись раскладывается в ленты подписчиков"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text="text", author=self.author)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(self.feed(), [post])
+
+    def test_follow_and_unfollow_update_timeline(self):
+        """Подписка добавляет старые записи в ленту, отписка убирает их"""
+        post = Post.objects.create(text="text", author=self.author)
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.feed(), [post])
+        follow.delete()
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed(), [])
+
+    @override_settings(POSTS_TIMELINE_FANOUT_LIMIT=0)
+    def test_popular_author_is_merged_on_read(self):
+        """Записи популярного автора подмешиваются в ленту при чтении"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text="text", author=self.author)
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed(), [post])
+
+    @override_settings(
+        POSTS_TIMELINE_FANOUT_LIMIT=2,
+        POSTS_TIMELINE_FANOUT_HYSTERESIS=1,
+        POSTS_MODERATION_WORKERS=0,
+    )
+    def test_author_below_limit_is_fanned_out_with_hysteresis(self):
+        """Записи автора раскладываются, только когда подписчиков стало
+        заметно меньше порога"""
+        others = [
+            User.objects.create_user(username=f"other{i}") for i in range(3)
+        ]
+        Follow.objects.create(user=self.reader, author=self.author)
+        for other in others:
+            Follow.objects.create(user=other, author=self.author)
+        post = Post.objects.create(text="text", author=self.author)
+        stats = AuthorStats.objects.filter(user=self.author)
+        self.assertFalse(stats.get().fanned_out)
+        self.assertEqual(self.feed(), [post])
+
+        # Колебания около порога не запускают раскладку.
+        for other in others[:2]:
+            Follow.objects.filter(user=other).delete()
+        Follow.objects.create(user=others[0], author=self.author)
+        Follow.objects.filter(user=others[0]).delete()
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertFalse(stats.get().fanned_out)
+
+        Follow.objects.filter(user=others[2]).delete()
+        self.assertTrue(stats.get().fanned_out)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(self.feed(), [post])
+
+    @override_settings(
+        POSTS_TIMELINE_FANOUT_LIMIT=1, POSTS_TIMELINE_FANOUT_HYSTERESIS=0
+    )
+    def test_fan_out_is_not_locked_by_rolled_back_schedule(self):
+        """Раскладка, не дошедшая до коммита, не блокирует следующую"""
+        other = User.objects.create_user(username="other")
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=other, author=self.author)
+        post = Post.objects.create(text="text", author=self.author)
+        # В TestCase коммита нет: задача так и не стартует.
+        with override_settings(POSTS_MODERATION_WORKERS=1):
+            Follow.objects.filter(user=other).delete()
+        self.assertFalse(TimelineEntry.objects.exists())
+        Follow.objects.create(user=other, author=self.author)
+        with override_settings(POSTS_MODERATION_WORKERS=0):
+            Follow.objects.filter(user=other).delete()
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
@@ -0,0 +1,122 @@
+from http import HTTPStatus
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from posts import usernames
+from posts.models import Post
+
+User = get_user_model()
+
+
+class BloomFilterTests(SimpleTestCase):
+    def test_no_false_negatives(self):
+        """Добавленные строки всегда находятся, чужие - почти никогда"""
+        bloom = usernames.BloomFilter(10000)
+        names = [f"user{i}" for i in range(10000)]
+        for name in names:
+            bloom.add(name)
+        self.assertTrue(all(name in bloom for name in names))
+        false_positives = sum(f"bot{i}" in bloom for i in range(10000))
+        self.assertLess(false_positives, 200)
+        self.assertFalse(bloom.full)
+        bloom.add("extra")
+        self.assertTrue(bloom.full)
+
+
+class UsernameLookupTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="DmitriK")
+        cls.post = Post.objects.create(text="Тестовый текст", author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        # Фильтр процесса строится до замеров.
+        self.assertTrue(usernames.might_exist("DmitriK"))
+
+    def profile(self, username):
+        return self.guest_client.get(
+            reverse("posts:profile", args=[username])
+        )
+
+    def test_unknown_username_skips_database(self):
+        """Несуществующее имя отдаёт 404 без запросов к базе"""
+        with self.assertNumQueries(0):
+            response = self.profile("wp-admin")
+            self.guest_client.get(
+                reverse("posts:post", args=["wp-admin", self.post.pk])
+            )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_missing_username_is_cached(self):
+        """Имя, прошедшее фильтр, но не найденное, запоминается"""
+        usernames.index.add("ghost")
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                self.profile("ghost").status_code, HTTPStatus.NOT_FOUND
+            )
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.profile("ghost").status_code, HTTPStatus.NOT_FOUND
+            )
+        User.objects.create_user(username="ghost")
+        self.assertEqual(self.profile("ghost").status_code, HTTPStatus.OK)
+
+    def test_new_and_renamed_users(self):
+        """Новое имя видно сразу после регистрации и переименования"""
+        self.assertEqual(
+            self.profile("newcomer").status_code, HTTPStatus.NOT_FOUND
+        )
+        user = User.objects.create_user(username="newcomer")
+        self.assertEqual(self.profile("newcomer").status_code, HTTPStatus.OK)
+        user.username = "renamed"
+        user.save()
+        self.assertEqual(self.profile("renamed").status_code, HTTPStatus.OK)
+        self.assertEqual(
+            self.profile("newcomer").status_code, HTTPStatus.NOT_FOUND
+        )
+
+    def test_bulk_created_users(self):
+        """Пользователи из bulk_create находятся после users_added и
+        периодической проверки"""
+        User.objects.bulk_create([User(username="seeded")])
+        self.assertFalse(usernames.might_exist("seeded"))
+        usernames.users_added()
+        self.assertTrue(usernames.might_exist("seeded"))
+
+        User.objects.bulk_create([User(username="imported")])
+        with mock.patch.object(usernames, "CHECK_INTERVAL", 0):
+            self.assertEqual(
+                self.profile("imported").status_code, HTTPStatus.OK
+            )
+
+    def test_not_found_page(self):
+        """Страница 404 показывает экранированный адрес"""
+        for _ in range(2):
+            response = self.guest_client.get("/<b>/")
+            self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+            self.assertContains(
+                response, "&lt;b&gt;", status_code=HTTPStatus.NOT_FOUND
+            )
+            self.assertNotContains(
+                response, "{{ path }}", status_code=HTTPStatus.NOT_FOUND
+            )
+
+
+class UsernameCommitTests(TransactionTestCase):
+    def test_name_missed_before_commit_is_found(self):
+        """Имя, запомненное отсутствующим до коммита регистрации,
+        находится после него"""
+        cache.clear()
+        with transaction.atomic():
+            User.objects.create_user(username="newcomer")
+            # Параллельный запрос не увидел незакоммиченную строку.
+            cache.set(usernames.missing_key("newcomer"), True)
+        self.assertTrue(usernames.might_exist("newcomer"))
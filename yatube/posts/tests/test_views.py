@@ -6,16 +6,22 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from posts import feed_cache
 from posts.forms import PostForm
-from posts.models import Comment, Follow, Group, Post
+from posts.models import AuthorStats, Comment, Follow, Group, Post
 
 User = get_user_model()
 
 
-@override_settings(MEDIA_ROOT=tempfile.mkdtemp(dir=settings.BASE_DIR))
+@override_settings(
+    MEDIA_ROOT=tempfile.mkdtemp(dir=settings.BASE_DIR),
+    POSTS_THUMBNAIL_WORKERS=0,
+)
 class PostPagesTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -278,13 +284,38 @@ class PostPagesTests(TestCase):
         """Тест кэширования главной страницы"""
         response = self.authorized_client.get(reverse("posts:index"))
         content = response.content
-        Post.objects.all().delete()
+        # update() не отправляет сигналы, поэтому кэш не сбрасывается.
+        Post.objects.update(text="Текст в обход сигналов")
         response = self.authorized_client.get(reverse("posts:index"))
         self.assertEqual(content, response.content)
         cache.clear()
         response = self.authorized_client.get(reverse("posts:index"))
         self.assertNotEqual(content, response.content)
 
+    def test_cache_is_reset_on_write(self):
+        """Новая запись сразу видна в закэшированных лентах"""
+        pages_names = (
+            reverse("posts:index"),
+            reverse("posts:group", kwargs={"slug": "DK"}),
+            reverse("posts:profile", kwargs={"username": "Dmitriy"}),
+        )
+        for adress in pages_names:
+            self.guest_client.get(adress)
+        # Счётчики живут в процессе и не сбрасываются между тестами.
+        before = feed_cache.stats()
+        for adress in pages_names:
+            self.guest_client.get(adress)
+        after = feed_cache.stats()
+        self.assertEqual(after["hits"] - before["hits"], len(pages_names))
+        self.assertEqual(after["misses"], before["misses"])
+        Post.objects.create(
+            text="Свежая запись", author=self.user, group=self.group
+        )
+        for adress in pages_names:
+            with self.subTest(adress=adress):
+                response = self.guest_client.get(adress)
+                self.assertContains(response, "Свежая запись")
+
 
 class PaginatorViewsTest(TestCase):
     @classmethod
@@ -300,6 +331,8 @@ class PaginatorViewsTest(TestCase):
                 for i in range(13)
             )
         )
+        # bulk_create не отправляет сигналы, счётчики пересчитываются явно.
+        AuthorStats.objects.recount()
 
     def setUp(self):
         self.guest_client = Client()
@@ -325,3 +358,107 @@ class PaginatorViewsTest(TestCase):
         for adress in pages_names:
             response = self.guest_client.get(adress + "?page=2")
             self.assertEqual(len(response.context["page"].object_list), 3)
+
+
+class FeedQueriesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="Dmitriy")
+        cls.reader = User.objects.create_user(username="Reader")
+        cls.group = Group.objects.create(
+            title="Dmitriy_Notes", slug="DK", description="Записи Дмитрия"
+        )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        cache.clear()
+
+    def create_posts(self, count):
+        for i in range(count):
+            author = User.objects.create_user(username="author%s" % i)
+            Follow.objects.create(user=self.reader, author=author)
+            for post_author in (author, self.user):
+                post = Post.objects.create(
+                    text="text %s" % i, author=post_author, group=self.group
+                )
+                Comment.objects.create(post=post, author=self.user, text="c")
+
+    def assertFeedQueries(self):
+        # Кэш пуст, поэтому ленты ещё и считают записи.
+        pages = (
+            (self.guest_client, reverse("posts:index"), 2),
+            (self.guest_client, reverse("posts:group", args=["DK"]), 3),
+            (self.guest_client, reverse("posts:profile", args=["Dmitriy"]), 3),
+            (self.reader_client, reverse("posts:follow_index"), 6),
+        )
+        for client, adress, queries in pages:
+            with self.subTest(adress=adress):
+                cache.clear()
+                with self.assertNumQueries(queries):
+                    client.get(adress)
+
+    def test_feed_queries_with_one_post(self):
+        """Число запросов ленты с одной записью"""
+        self.create_posts(1)
+        self.assertFeedQueries()
+
+    def test_feed_queries_do_not_grow_with_page_size(self):
+        """Число запросов ленты не зависит от числа записей на странице"""
+        self.create_posts(10)
+        self.assertFeedQueries()
+
+
+class CommentsPageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="Dmitriy")
+        cls.post = Post.objects.create(text="Тестовый текст", author=cls.user)
+        cls.adress = reverse("posts:post", args=["Dmitriy", cls.post.pk])
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def create_comments(self, count, start=0):
+        for i in range(start, start + count):
+            author = User.objects.create_user(username="reader%s" % i)
+            Comment.objects.create(post=self.post, author=author, text=i)
+
+    def test_comments_are_paginated_by_cursor(self):
+        """Страница записи показывает первую порцию, курсор - остальные"""
+        self.create_comments(25)
+        response = self.guest_client.get(self.adress)
+        first = response.context["comments"]
+        self.assertEqual(len(first), 20)
+        rest = self.guest_client.get(
+            self.adress, {"cursor": response.context["next_cursor"]}
+        ).context
+        self.assertIsNone(rest["next_cursor"])
+        self.assertEqual(
+            [comment.text for comment in first + rest["comments"]],
+            [str(i) for i in range(25)],
+        )
+
+    def test_comment_queries_do_not_grow(self):
+        """Авторы комментариев загружаются вместе с комментариями"""
+        self.create_comments(1)
+        with CaptureQueriesContext(connection) as one:
+            self.guest_client.get(self.adress)
+        self.create_comments(30, start=1)
+        cache.clear()
+        with self.assertNumQueries(len(one)):
+            self.guest_client.get(self.adress)
+
+    def test_edited_comment_changes_etag(self):
+        """Правка комментария меняет ETag страницы записи"""
+        self.create_comments(1)
+        etag = self.guest_client.get(self.adress)["ETag"]
+        comment = Comment.objects.get()
+        comment.text = "Исправленный текст"
+        comment.save()
+        self.assertNotEqual(self.guest_client.get(self.adress)["ETag"], etag)
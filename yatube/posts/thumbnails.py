@@ -0,0 +1,178 @@
+"""Фоновое создание миниатюр картинок записей.
+
+Для каждой картинки создаётся набор ширин для srcset в JPEG и, если
+Pillow умеет, в WebP. Миниатюры создаются пулом потоков сразу после
+сохранения записи, а шаблоны берут их только из хранилища ключей sorl:
+пока миниатюр нет, вместо них выводится заглушка и запрос не ждёт
+Pillow. Фрагменты с заглушкой не попадают в кэш карточек и лент.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from django.conf import settings
+from django.db import connections, transaction
+from PIL import features
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore
+
+logger = logging.getLogger(__name__)
+
+GEOMETRY = "960x339"
+OPTIONS = {"crop": "center", "upscale": True}
+# Ширины для srcset; высота сохраняет пропорции GEOMETRY.
+WIDTHS = (320, 480, 720, 960)
+FORMATS = ("JPEG", "WEBP") if features.check("webp") else ("JPEG",)
+# Все размеры, которые нужны шаблонам; их создают generate и warm_thumbnails.
+SIZES = tuple(
+    (f"{width}x{round(width * 339 / 960)}", dict(OPTIONS, format=format_))
+    for format_ in FORMATS
+    for width in WIDTHS
+)
+# Ограничение SQLite на число параметров запроса.
+KEYS_PER_QUERY = 500
+
+executor = None
+executor_lock = Lock()
+pending = set()
+
+
+class PostThumbnailBackend(ThumbnailBackend):
+    def thumbnail_file(self, file_, geometry_string, **options):
+        """Файл миниатюры с тем именем, которое даст ей get_thumbnail."""
+        source = ImageFile(file_)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault("format", self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+    def get_cached_thumbnail(self, file_, geometry_string, **options):
+        """Как get_thumbnail, но без создания отсутствующей миниатюры."""
+        return default.kvstore.get(
+            self.thumbnail_file(file_, geometry_string, **options)
+        )
+
+
+backend = PostThumbnailBackend()
+
+
+class Variants:
+    """Готовые варианты картинки: src и srcset по форматам."""
+
+    def __init__(self, thumbnails):
+        srcsets = {}
+        for (geometry, options), thumbnail in zip(SIZES, thumbnails):
+            srcsets.setdefault(options["format"], []).append(
+                f"{thumbnail.url} {geometry.split('x')[0]}w"
+            )
+            if options["format"] == "JPEG":
+                # Самая широкая JPEG-миниатюра - для браузеров без srcset.
+                self.url = thumbnail.url
+        self.srcset = ", ".join(srcsets["JPEG"])
+        self.webp_srcset = ", ".join(srcsets.get("WEBP", ()))
+
+
+def get_cached(image):
+    """Варианты картинки из хранилища ключей или None, если их ещё нет."""
+    if not image:
+        return None
+    thumbnails = []
+    for geometry, options in SIZES:
+        thumbnail = backend.get_cached_thumbnail(image, geometry, **options)
+        if thumbnail is None:
+            return None
+        thumbnails.append(thumbnail)
+    return Variants(thumbnails)
+
+
+def get_or_schedule(image):
+    """Готовая миниатюра или None с постановкой её в очередь."""
+    thumbnail = get_cached(image)
+    if image and thumbnail is None:
+        schedule(image)
+        if not settings.POSTS_THUMBNAIL_WORKERS:
+            thumbnail = get_cached(image)
+    return thumbnail
+
+
+def missing(names):
+    """Картинки, у которых в хранилище ключей sorl нет хотя бы одного размера.
+
+    Проверка идёт одним запросом на пачку ключей, без обращения к файлам.
+    """
+    wanted = {
+        name: [
+            add_prefix(backend.thumbnail_file(name, geometry, **options).key)
+            for geometry, options in SIZES
+        ]
+        for name in names
+    }
+    keys = [key for name_keys in wanted.values() for key in name_keys]
+    found = set()
+    for start in range(0, len(keys), KEYS_PER_QUERY):
+        found.update(
+            KVStore.objects.filter(
+                key__in=keys[start:start + KEYS_PER_QUERY]
+            ).values_list("key", flat=True)
+        )
+    return [
+        name for name, name_keys in wanted.items()
+        if not found.issuperset(name_keys)
+    ]
+
+
+def generate(name, force=False):
+    """Создать все размеры миниатюр; force пересоздаёт готовые."""
+    try:
+        for geometry, options in SIZES:
+            if force:
+                thumbnail = backend.thumbnail_file(name, geometry, **options)
+                default.kvstore.delete(thumbnail)
+                thumbnail.delete()
+            backend.get_thumbnail(name, geometry, **options)
+        return True
+    except Exception:
+        logger.exception("Thumbnail for %s failed", name)
+        return False
+    finally:
+        with executor_lock:
+            pending.discard(name)
+        if settings.POSTS_THUMBNAIL_WORKERS:
+            connections.close_all()
+
+
+def schedule(image):
+    """Поставить миниатюры в очередь; повторные вызовы не дублируются."""
+    if not image:
+        return
+    if not settings.POSTS_THUMBNAIL_WORKERS:
+        generate(image.name)
+        return
+    # Пул начинает работу только после коммита: откат транзакции не
+    # оставляет файлов миниатюр, а тесты Django не запускают потоки.
+    transaction.on_commit(lambda: submit(image.name))
+
+
+def submit(name):
+    global executor
+    with executor_lock:
+        if name in pending:
+            return
+        pending.add(name)
+        if executor is None:
+            executor = ThreadPoolExecutor(
+                max_workers=settings.POSTS_THUMBNAIL_WORKERS,
+                thread_name_prefix="thumbnails",
+            )
+    executor.submit(generate, name)
@@ -0,0 +1,216 @@
+"""Лента подписок с раскладкой записей при публикации (fan-out-on-write).
+
+Новая запись сразу копируется в TimelineEntry каждого подписчика, и
+follow_index читает готовую ленту по индексу (user, pub_date). Авторы,
+у которых подписчиков больше POSTS_TIMELINE_FANOUT_LIMIT, не
+раскладываются: у них снимается AuthorStats.fanned_out, и их записи
+подмешиваются в ленту при чтении.
+
+Когда подписчиков становится на POSTS_TIMELINE_FANOUT_HYSTERESIS меньше
+порога, пропущенные записи раскладываются фоновой задачей moderation
+пачками, и подмешивание выключается.
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Q
+
+from . import moderation
+from .models import AuthorStats, Follow, Post, TimelineEntry
+from .paginators import paginate
+
+BATCH_SIZE = 500
+# Ключ занят, пока идёт раскладка автора.
+FAN_OUT_LOCK_TIMEOUT = 60 * 60
+
+
+def is_celebrity(author_id):
+    return AuthorStats.objects.filter(
+        user_id=author_id,
+        followers_count__gt=settings.POSTS_TIMELINE_FANOUT_LIMIT,
+    ).exists()
+
+
+def skip_fan_out(author_id):
+    """Записи автора остаются без раскладки до фоновой задачи."""
+    AuthorStats.objects.filter(user_id=author_id, fanned_out=True).update(
+        fanned_out=False
+    )
+
+
+def store(entries):
+    entries = iter(entries)
+    while True:
+        batch = list(islice(entries, BATCH_SIZE))
+        if not batch:
+            return
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def entries_for_followers(post, follower_ids):
+    for user_id in follower_ids:
+        yield TimelineEntry(
+            user_id=user_id,
+            post_id=post.pk,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        )
+
+
+def entries_for_posts(user_id, posts):
+    for post_id, author_id, pub_date in posts.values_list(
+        "pk", "author_id", "pub_date"
+    ).iterator():
+        yield TimelineEntry(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+
+
+def push_post(post):
+    if is_celebrity(post.author_id):
+        skip_fan_out(post.author_id)
+        return
+    followers = Follow.objects.filter(author_id=post.author_id).values_list(
+        "user_id", flat=True
+    )
+    store(entries_for_followers(post, followers.iterator()))
+
+
+def add_author(user_id, author_id):
+    if is_celebrity(author_id):
+        skip_fan_out(author_id)
+        return
+    store(entries_for_posts(user_id, Post.objects.filter(author_id=author_id)))
+
+
+def remove_author(user_id, author_id):
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+    # Автор опустился заметно ниже порога: его записи, опубликованные
+    # без раскладки, раскладываются оставшимся подписчикам в фоне.
+    if AuthorStats.objects.filter(
+        user_id=author_id,
+        fanned_out=False,
+        followers_count__lte=(
+            settings.POSTS_TIMELINE_FANOUT_LIMIT
+            - settings.POSTS_TIMELINE_FANOUT_HYSTERESIS
+        ),
+    ).exists():
+        schedule_fan_out(author_id)
+
+
+def fan_out_key(author_id):
+    return f"posts:timeline:fan-out:{author_id}"
+
+
+def schedule_fan_out(author_id):
+    # Задача стартует после коммита; блокировку берёт она сама, иначе
+    # откат транзакции оставил бы автора без раскладки на весь таймаут.
+    return moderation.start(
+        "Раскладка записей автора",
+        fan_out_author,
+        Follow.objects.filter(author_id=author_id),
+        author_id,
+    )
+
+
+def fan_out_author(job_id, follows, author_id):
+    """Разложить все записи автора подписчикам, пачками BATCH_SIZE.
+
+    Из нескольких задач одного автора работает одна; задачи, которые
+    стартуют после неё, видят fanned_out и ничего не делают.
+    """
+    if not cache.add(fan_out_key(author_id), True, FAN_OUT_LOCK_TIMEOUT):
+        return
+    posts = Post.objects.filter(author_id=author_id)
+    try:
+        if not AuthorStats.objects.filter(
+            user_id=author_id, fanned_out=False
+        ).exists():
+            return
+        for ids in moderation.chunks(follows):
+            followers = Follow.objects.filter(pk__in=ids).values_list(
+                "user_id", flat=True
+            )
+            for user_id in followers:
+                store(entries_for_posts(user_id, posts))
+            moderation.advance(job_id, len(ids))
+        # Если автор за это время снова перерос порог, его новые записи
+        # уже сняли флаг заново.
+        AuthorStats.objects.filter(
+            user_id=author_id,
+            followers_count__lte=settings.POSTS_TIMELINE_FANOUT_LIMIT,
+        ).update(fanned_out=True)
+    finally:
+        cache.delete(fan_out_key(author_id))
+
+
+def rebuild_user(user_id):
+    TimelineEntry.objects.filter(user_id=user_id).delete()
+    authors = Follow.objects.filter(user_id=user_id).values_list(
+        "author_id", flat=True
+    )
+    for author_id in authors.iterator():
+        add_author(user_id, author_id)
+
+
+def rebuild_all():
+    """Разложить ленты всех подписчиков одним INSERT ... SELECT.
+
+    Построчная раскладка через rebuild_user на миллионах подписок идёт
+    часами, здесь всё делает база.
+    """
+    sql = (
+        "INSERT INTO {entry} (user_id, post_id, author_id, pub_date) "
+        "SELECT f.user_id, p.id, p.author_id, p.pub_date "
+        "FROM {follow} f JOIN {post} p ON p.author_id = f.author_id "
+        "LEFT JOIN {stats} s ON s.user_id = f.author_id "
+        "WHERE COALESCE(s.followers_count, 0) <= %s"
+    ).format(
+        entry=TimelineEntry._meta.db_table,
+        follow=Follow._meta.db_table,
+        post=Post._meta.db_table,
+        stats=AuthorStats._meta.db_table,
+    )
+    limit = settings.POSTS_TIMELINE_FANOUT_LIMIT
+    with transaction.atomic(), connection.cursor() as cursor:
+        TimelineEntry.objects.all().delete()
+        cursor.execute(sql, [limit])
+        stats = AuthorStats.objects.all()
+        stats.filter(followers_count__gt=limit).update(fanned_out=False)
+        stats.filter(followers_count__lte=limit).update(fanned_out=True)
+        return cursor.rowcount
+
+
+def get_page(request, user):
+    celebrities = list(
+        Follow.objects.filter(
+            user=user, author__stats__fanned_out=False
+        ).values_list("author_id", flat=True)
+    )
+    entries = TimelineEntry.objects.filter(
+        user=user, post__hidden=False, author__is_active=True
+    )
+    if celebrities:
+        posts = Post.objects.visible().filter(
+            Q(pk__in=entries.values("post_id"))
+            | Q(author_id__in=celebrities)
+        )
+        return paginate(request, posts.with_related(), cache_count=False)
+    # Страница собирается по индексу (user, pub_date) ленты, записи
+    # подгружаются одним запросом по id. Подписки не меняют поколение
+    # лент, поэтому число записей не кэшируется.
+    page = paginate(request, entries, cache_count=False)
+    posts = Post.objects.with_related().in_bulk(
+        [entry.post_id for entry in page.object_list]
+    )
+    page.object_list = [
+        posts[entry.post_id]
+        for entry in page.object_list
+        if entry.post_id in posts
+    ]
+    return page
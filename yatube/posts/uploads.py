@@ -0,0 +1,86 @@
+"""Нормализация загружаемых картинок записей.
+
+Картинка, уже проверенная ImageField, открывается Pillow прямо из
+загруженного файла (из памяти или временного файла на диске), без
+промежуточной копии. Если она больше
+POSTS_IMAGE_MAX_DIMENSION или несёт EXIF, она поворачивается по тегу
+ориентации, уменьшается и перекодируется в том же формате без EXIF.
+Небольшие картинки без метаданных и анимации сохраняются как есть.
+"""
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image, ImageOps
+
+# Форматы, которые перекодируются; остальные сохраняются как есть.
+FORMATS = ("JPEG", "PNG", "WEBP")
+# Исключения Pillow для файлов, которые не удаётся декодировать.
+DECODE_ERRORS = (
+    OSError,
+    ValueError,
+    SyntaxError,
+    Image.DecompressionBombError,
+)
+
+
+def save_options(format_):
+    if format_ == "PNG":
+        return {"optimize": True}
+    options = {"quality": settings.POSTS_IMAGE_QUALITY}
+    if format_ == "JPEG":
+        options.update(optimize=True, progressive=True)
+    return options
+
+
+def needs_processing(image):
+    if image.format not in FORMATS:
+        return False
+    if getattr(image, "is_animated", False):
+        return False
+    limit = settings.POSTS_IMAGE_MAX_DIMENSION
+    # Тег ориентации хранится в EXIF, так что его наличия достаточно.
+    return max(image.size) > limit or "exif" in image.info
+
+
+def target_size(size, limit):
+    width, height = size
+    scale = min(1, limit / max(width, height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def normalize(upload):
+    """Вернуть загрузку как есть или её уменьшенную копию без EXIF.
+
+    Бросает DECODE_ERRORS, если картинку не удаётся декодировать.
+    """
+    upload.seek(0)
+    image = Image.open(upload)
+    format_ = image.format
+    if not needs_processing(image):
+        upload.seek(0)
+        return upload
+
+    limit = settings.POSTS_IMAGE_MAX_DIMENSION
+    icc_profile = image.info.get("icc_profile")
+    # JPEG можно сразу декодировать в уменьшенном в 2-8 раз масштабе.
+    image.draft(image.mode, target_size(image.size, limit))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((limit, limit), Image.LANCZOS)
+
+    options = save_options(format_)
+    if icc_profile:
+        options["icc_profile"] = icc_profile
+    # Большой результат уходит во временный файл, как и сама загрузка.
+    output = SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+    )
+    image.save(output, format_, **options)
+    size = output.tell()
+    output.seek(0)
+    return UploadedFile(
+        file=output,
+        name=upload.name,
+        content_type=Image.MIME.get(format_),
+        size=size,
+    )
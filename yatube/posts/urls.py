@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 app_name = "posts"
 
@@ -8,6 +8,17 @@ urlpatterns = [
     path("", views.index, name="index"),
     path("new/", views.new_post, name="new_post"),
     path("follow/", views.follow_index, name="follow_index"),
+    path("search/", views.post_search, name="search"),
+    path("api/v1/posts/", api.index, name="api_index"),
+    path("api/v1/group/<slug:slug>/", api.group_posts, name="api_group"),
+    path(
+        "api/v1/profile/<str:username>/", api.profile, name="api_profile"
+    ),
+    path(
+        "api/v1/posts/<int:post_id>/comments/",
+        api.comments,
+        name="api_comments",
+    ),
     path("group/<slug:slug>/", views.group_posts, name="group"),
     path("<str:username>/", views.profile, name="profile"),
     path("<str:username>/<int:post_id>/", views.post_view, name="post"),
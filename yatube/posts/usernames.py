@@ -0,0 +1,185 @@
+"""Имена пользователей из адресов /<username>/.
+
+Маршрут профиля ловит любой неизвестный адрес первого уровня, и каждый
+адрес, который перебирают боты (/wp-admin/, /.env/), стоил запроса к
+User. Имя сначала проверяется фильтром Блума процесса: если его там нет,
+пользователя точно нет, и 404 отдаётся без базы. Ложные срабатывания
+фильтра и удалённые пользователи запоминаются в отрицательном кэше.
+
+Фильтр строится при первой проверке. Новые пользователи и смена имени
+меняют версии в кэше: фильтры процессов дополняются новыми именами по
+pk, а после смены имени строятся заново. Пользователей, добавленных
+через bulk_create в обход сигналов, фильтр находит сам: раз в
+CHECK_INTERVAL секунд он дочитывает строки с pk больше известного.
+"""
+import hashlib
+import math
+import time
+from threading import Lock
+
+from django.core.cache import cache
+from django.db import transaction
+from django.http import Http404
+
+from . import feed_cache
+from .models import User
+
+ADDED_KEY = "posts:usernames:added"
+RENAMED_KEY = "posts:usernames:renamed"
+# Доля ложных срабатываний фильтра.
+ERROR_RATE = 0.01
+MIN_CAPACITY = 1024
+MISSING_TIMEOUT = 60 * 60
+CHECK_INTERVAL = 60
+
+
+class BloomFilter:
+    """Множество строк без ложных отрицаний, около 10 бит на строку."""
+
+    def __init__(self, capacity, error_rate=ERROR_RATE):
+        self.capacity = capacity
+        self.size = math.ceil(
+            -capacity * math.log(error_rate) / math.log(2) ** 2
+        )
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray(self.size // 8 + 1)
+        self.count = 0
+
+    def positions(self, value):
+        # Две половины одного хэша дают все k позиций
+        # (Kirsch, Mitzenmacher).
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little")
+        for i in range(self.hashes):
+            yield (first + i * second) % self.size
+
+    def add(self, value):
+        for position in self.positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self.positions(value)
+        )
+
+    @property
+    def full(self):
+        return self.count > self.capacity
+
+
+class UsernameIndex:
+    """Фильтр имён процесса, который догоняет версии из кэша."""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.filter = None
+        self.last_pk = 0
+        self.versions = None
+        self.checked = 0
+
+    def build(self):
+        users = User.objects.order_by("pk").values_list("pk", "username")
+        self.filter = BloomFilter(max(MIN_CAPACITY, users.count() * 2))
+        self.last_pk = 0
+        self.add_rows(users.iterator())
+
+    def catch_up(self):
+        users = User.objects.order_by("pk").values_list("pk", "username")
+        self.add_rows(users.filter(pk__gt=self.last_pk))
+
+    def add_rows(self, rows):
+        for pk, username in rows:
+            self.filter.add(username)
+            self.last_pk = max(self.last_pk, pk)
+
+    def refresh(self):
+        # Версии читаются до запроса к User: регистрация после этого
+        # чтения снова поменяет версию.
+        versions = cache.get_many([ADDED_KEY, RENAMED_KEY])
+        versions = (versions.get(ADDED_KEY), versions.get(RENAMED_KEY))
+        if not self.stale(versions):
+            return
+        with self.lock:
+            if not self.stale(versions):
+                return
+            if self.filter is None or self.filter.full:
+                self.build()
+            elif versions[1] != self.versions[1]:
+                self.build()
+            else:
+                self.catch_up()
+            self.versions = versions
+            self.checked = time.monotonic()
+
+    def stale(self, versions):
+        return (
+            self.filter is None
+            or versions != self.versions
+            or time.monotonic() - self.checked >= CHECK_INTERVAL
+        )
+
+    def add(self, username):
+        with self.lock:
+            if self.filter is not None:
+                self.filter.add(username)
+
+    def __contains__(self, username):
+        self.refresh()
+        return username in self.filter
+
+
+index = UsernameIndex()
+
+
+def missing_key(username):
+    digest = hashlib.md5(username.encode()).hexdigest()
+    return f"posts:usernames:missing:{digest}"
+
+
+def might_exist(username):
+    """False, если пользователя с таким именем точно нет."""
+    return username in index and not cache.get(missing_key(username))
+
+
+def get_or_404(queryset, username):
+    """Пользователь из queryset по имени или Http404.
+
+    Несуществующие имена не доходят до базы; имя, которое не нашлось в
+    queryset, запоминается в отрицательном кэше.
+    """
+    if not might_exist(username):
+        raise Http404
+    try:
+        return queryset.get(username=username)
+    except queryset.model.DoesNotExist:
+        cache.set(missing_key(username), True, MISSING_TIMEOUT)
+        raise Http404
+
+
+def users_added():
+    """Дочитать пользователей, добавленных в обход сигналов."""
+    feed_cache.increment(ADDED_KEY)
+
+
+def user_saved(user, created, renamed):
+    """Учесть новое или изменённое имя пользователя."""
+    missing = missing_key(user.username)
+    cache.delete(missing)
+    changed = created or renamed
+    if changed:
+        index.add(user.username)
+    key = ADDED_KEY if created else RENAMED_KEY
+
+    def committed():
+        # До коммита другой запрос ещё не видит строку и мог снова
+        # запомнить имя как отсутствующее. Версии тоже меняются только
+        # после коммита, иначе процессы перечитают User без нового имени
+        # и не заметят его позже.
+        cache.delete(missing)
+        if changed:
+            feed_cache.increment(key)
+
+    transaction.on_commit(committed)
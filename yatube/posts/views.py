@@ -1,72 +1,86 @@
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404, redirect, render
 from django.views.decorators.http import require_GET, require_http_methods
 
+from . import conditional, search, thumbnails, timeline, usernames
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .models import AuthorStats, Follow, Post, User
+from .paginators import comments_page, paginate
 
 
 @require_GET
+@conditional.conditional_index
 def index(request):
-    posts = Post.objects.all()
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
+    page = paginate(request, Post.objects.visible().with_related())
     return render(
-        request, "posts/index.html", {"page": page, "paginator": paginator}
+        request,
+        "posts/index.html",
+        {"page": page, "paginator": page.paginator},
     )
 
 
 @require_GET
+@conditional.conditional_group
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
+    group = conditional.group_or_404(request, slug)
+    page = paginate(request, group.posts.visible().with_related())
     return render(
         request,
         "posts/group.html",
-        {"group": group, "page": page, "paginator": paginator},
+        {"group": group, "page": page, "paginator": page.paginator},
     )
 
 
 @require_GET
+@conditional.conditional_profile
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
-    follow = False
-    if request.user.is_authenticated:
-        follow = Follow.objects.filter(
-            author=author, user=request.user
-        ).exists()
+    author = conditional.author_or_404(request, username)
+    stats = AuthorStats.objects.for_user(author)
+    # stats.posts_count учитывает и скрытые записи, ждущие удаления:
+    # пагинатор считает видимые сам, с кэшем по поколению.
+    page = paginate(request, author.posts.visible().with_related())
     return render(
         request,
         "posts/profile.html",
         {
             "author": author,
+            "stats": stats,
             "page": page,
-            "paginator": paginator,
-            "follow": follow,
+            "paginator": page.paginator,
+            "follow": conditional.is_following(request, author),
         },
     )
 
 
-@require_GET
-def post_view(request, username, post_id):
-    author = get_object_or_404(User, username=username)
-    post = get_object_or_404(Post, pk=post_id, author=author)
-    comments = post.comments.all()
-    form = CommentForm()
+def render_post(request, author, post, form):
+    comments, next_cursor = comments_page(
+        post.comments.select_related("author"), request.GET.get("cursor")
+    )
     return render(
         request,
         "posts/post.html",
-        {"author": author, "post": post, "comments": comments, "form": form},
+        {
+            "author": author,
+            "stats": AuthorStats.objects.for_user(author),
+            "post": post,
+            "comments": comments,
+            "next_cursor": next_cursor,
+            "form": form,
+        },
+    )
+
+
+@require_GET
+@conditional.conditional_post
+def post_view(request, username, post_id):
+    author = usernames.get_or_404(
+        User.objects.select_related("stats").filter(is_active=True),
+        username,
+    )
+    post = get_object_or_404(
+        Post.objects.visible().with_related(), pk=post_id, author=author
     )
+    return render_post(request, author, post, CommentForm())
 
 
 @login_required
@@ -77,6 +91,7 @@ def new_post(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        thumbnails.schedule(post.image)
         return redirect("posts:index")
     return render(request, "posts/new_post.html", {"form": form})
 
@@ -84,7 +99,9 @@ def new_post(request):
 @login_required
 @require_http_methods(["GET", "POST"])
 def post_edit(request, username, post_id):
-    post = get_object_or_404(Post, pk=post_id, author__username=username)
+    post = get_object_or_404(
+        Post.objects.visible(), pk=post_id, author__username=username
+    )
     if post.author != request.user:
         return redirect("posts:post", username, post_id)
     form = PostForm(
@@ -92,6 +109,8 @@ def post_edit(request, username, post_id):
     )
     if form.is_valid():
         post.save()
+        if "image" in form.changed_data:
+            thumbnails.schedule(post.image)
         return redirect("posts:post", username, post_id)
     return render(
         request,
@@ -103,9 +122,12 @@ def post_edit(request, username, post_id):
 @login_required
 @require_http_methods(["GET", "POST"])
 def add_comment(request, username, post_id):
-    author = get_object_or_404(User, username=username)
-    post = get_object_or_404(Post, pk=post_id)
-    comments = post.comments.all()
+    author = get_object_or_404(
+        User.objects.select_related("stats"), username=username
+    )
+    post = get_object_or_404(
+        Post.objects.visible().with_related(), pk=post_id
+    )
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
@@ -113,21 +135,31 @@ def add_comment(request, username, post_id):
         comment.post = post
         comment.save()
         return redirect("posts:post", username, post_id)
+    return render_post(request, author, post, form)
+
+
+@require_GET
+def post_search(request):
+    query = request.GET.get("q", "").strip()
+    posts, next_cursor = [], None
+    if query:
+        posts, next_cursor = search.search_page(
+            query, request.GET.get("cursor")
+        )
     return render(
         request,
-        "posts/post.html",
-        {"author": author, "comments": comments, "post": post, "form": form},
+        "posts/search.html",
+        {"query": query, "posts": posts, "next_cursor": next_cursor},
     )
 
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
+    page = timeline.get_page(request, request.user)
     return render(
-        request, "posts/follow.html", {"page": page, "paginator": paginator}
+        request,
+        "posts/follow.html",
+        {"page": page, "paginator": page.paginator},
     )
 
 
@@ -0,0 +1,32 @@
+"""SQLite с PRAGMA из настроек и выбором режима BEGIN.
+
+В DATABASES["OPTIONS"] кроме параметров sqlite3.connect принимаются:
+
+* ``pragmas`` - словарь PRAGMA, выполняемых на каждом новом соединении
+  (journal_mode, synchronous, mmap_size, cache_size и т. п.);
+* ``transaction_mode`` - как начинать транзакции atomic(): DEFERRED,
+  IMMEDIATE или EXCLUSIVE.
+
+С IMMEDIATE транзакция сразу берёт блокировку записи и ждёт её не
+дольше ``timeout``. При DEFERRED два писателя, начавшие с чтения, не
+могут повысить блокировку, и один из них сразу получает
+"database is locked" без ожидания.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = params.pop("pragmas", {})
+        self.transaction_mode = params.pop("transaction_mode", "DEFERRED")
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f"BEGIN {self.transaction_mode}")
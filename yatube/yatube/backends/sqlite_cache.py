@@ -0,0 +1,160 @@
+"""Общий для процессов кэш в файле SQLite.
+
+LocMemCache у каждого воркера свой и пуст после перезапуска. Этот
+бэкенд хранит значения в одном файле (LOCATION), который видят все
+процессы на машине, и не требует внешних сервисов. Файл работает в
+режиме WAL, поэтому чтения не ждут записей.
+
+Целые числа хранятся как есть, а не в pickle, чтобы incr был одним
+UPDATE под блокировкой записи. add и incr атомарны между процессами,
+на них держатся поколение лент и блокировки пересчёта.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS cache ("
+    "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)",
+    "CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)",
+)
+ALIVE = "(expires IS NULL OR expires > ?)"
+# Просроченные строки удаляются раз в столько вызовов set() процесса.
+CULL_EVERY = 256
+
+
+def encode(value):
+    if type(value) is int and -(2 ** 63) <= value < 2 ** 63:
+        return value
+    return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def decode(value):
+    if isinstance(value, int):
+        return value
+    return pickle.loads(value)
+
+
+class SqliteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.location = location
+        self.local = threading.local()
+        self.sets = 0
+
+    @property
+    def db(self):
+        # Соединение своё у каждого потока и у каждого процесса после
+        # fork: соединение SQLite нельзя переносить между процессами.
+        pid, db = getattr(self.local, "db", (None, None))
+        if pid != os.getpid():
+            db = sqlite3.connect(
+                self.location, timeout=20, isolation_level=None
+            )
+            db.execute("PRAGMA journal_mode = WAL")
+            db.execute("PRAGMA synchronous = NORMAL")
+            for statement in SCHEMA:
+                db.execute(statement)
+            self.local.db = (os.getpid(), db)
+        return db
+
+    def key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def get(self, key, default=None, version=None):
+        row = self.db.execute(
+            f"SELECT value FROM cache WHERE key = ? AND {ALIVE}",
+            (self.key(key, version), time.time()),
+        ).fetchone()
+        return default if row is None else decode(row[0])
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.db.execute(
+            "INSERT OR REPLACE INTO cache VALUES (?, ?, ?)",
+            (
+                self.key(key, version),
+                encode(value),
+                self.get_backend_timeout(timeout),
+            ),
+        )
+        self.sets += 1
+        if self.sets % CULL_EVERY == 0:
+            self.cull()
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        cursor = self.db.execute(
+            "INSERT INTO cache VALUES (?, ?, ?) ON CONFLICT (key) DO UPDATE "
+            "SET value = excluded.value, expires = excluded.expires "
+            "WHERE cache.expires IS NOT NULL AND cache.expires <= ?",
+            (
+                self.key(key, version),
+                encode(value),
+                self.get_backend_timeout(timeout),
+                time.time(),
+            ),
+        )
+        return cursor.rowcount == 1
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        cursor = self.db.execute(
+            f"UPDATE cache SET expires = ? WHERE key = ? AND {ALIVE}",
+            (
+                self.get_backend_timeout(timeout),
+                self.key(key, version),
+                time.time(),
+            ),
+        )
+        return cursor.rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self.key(key, version)
+        db = self.db
+        # UPDATE и чтение нового значения в одной транзакции, иначе
+        # между ними вклинится чужой incr.
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            updated = db.execute(
+                f"UPDATE cache SET value = value + ? WHERE key = ? "
+                f"AND typeof(value) = 'integer' AND {ALIVE}",
+                (delta, key, time.time()),
+            ).rowcount
+            row = db.execute(
+                "SELECT value FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+        finally:
+            db.execute("COMMIT")
+        if not updated:
+            raise ValueError("Key '%s' not found" % key)
+        return row[0]
+
+    def delete(self, key, version=None):
+        self.db.execute(
+            "DELETE FROM cache WHERE key = ?", (self.key(key, version),)
+        )
+
+    def has_key(self, key, version=None):
+        row = self.db.execute(
+            f"SELECT 1 FROM cache WHERE key = ? AND {ALIVE}",
+            (self.key(key, version), time.time()),
+        ).fetchone()
+        return row is not None
+
+    def clear(self):
+        self.db.execute("DELETE FROM cache")
+
+    def cull(self):
+        db = self.db
+        db.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),))
+        (count,) = db.execute("SELECT COUNT(*) FROM cache").fetchone()
+        if count > self._max_entries:
+            db.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache "
+                "ORDER BY expires IS NULL, expires LIMIT ?)",
+                (count // self._cull_frequency,),
+            )
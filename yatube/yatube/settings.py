@@ -53,6 +53,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "posts.routers.ReplicaMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -60,6 +61,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "debug_toolbar.middleware.DebugToolbarMiddleware",
+    "posts.profiling.ProfilingMiddleware",
 ]
 
 ROOT_URLCONF = "yatube.urls"
@@ -68,7 +70,7 @@ TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "posts.profiling.ProfiledTemplates",
         "DIRS": [TEMPLATES_DIR],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -90,8 +92,26 @@ WSGI_APPLICATION = "yatube.wsgi.application"
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
+        "ENGINE": "yatube.backends.sqlite3",
         "NAME": os.path.join(BASE_DIR, "db.sqlite3"),
+        # Соединение потока переживает запрос и не открывается заново
+        "CONN_MAX_AGE": 60,
+        "OPTIONS": {
+            # Сколько секунд ждать блокировку записи
+            "timeout": 20,
+            # Писатель сразу берёт блокировку и ждёт её, а не падает
+            "transaction_mode": "IMMEDIATE",
+            # WAL: читатели не ждут писателей; с synchronous=NORMAL fsync
+            # только при checkpoint. Файл читается через mmap, кэш
+            # страниц 64 МБ на соединение
+            "pragmas": {
+                "journal_mode": "WAL",
+                "synchronous": "NORMAL",
+                "mmap_size": 256 * 1024 * 1024,
+                "cache_size": -64 * 1024,
+                "temp_store": "MEMORY",
+            },
+        },
     }
 }
 
@@ -152,12 +172,83 @@ EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
+# Кэш в файле SQLite общий для всех процессов и переживает перезапуск
 CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    "default": {
+        "BACKEND": "yatube.backends.sqlite_cache.SqliteCache",
+        "LOCATION": os.path.join(BASE_DIR, "cache.sqlite3"),
+        "OPTIONS": {"MAX_ENTRIES": 100000},
     }
 }
 
+# Режим пагинации лент: "offset" (номера страниц) или "cursor"
+# (ключ pub_date, id без COUNT(*) и OFFSET)
+POSTS_PAGINATION = "offset"
+# Больше стольких записей лента не считает точно и показывает «10,000+»;
+# 0 - всегда точный COUNT(*)
+POSTS_COUNT_LIMIT = 10000
+
+# Авторы с большим числом подписчиков не раскладываются по лентам при
+# публикации, их записи подмешиваются в ленту подписок при чтении
+POSTS_TIMELINE_FANOUT_LIMIT = 1000
+# Пропущенные записи раскладываются в фоне, только когда подписчиков
+# становится на столько меньше порога: подписка и отписка на самом
+# пороге не запускают раскладку снова и снова.
+POSTS_TIMELINE_FANOUT_HYSTERESIS = 100
+
+# Время жизни отрендеренных страниц лент; при любой записи в Post,
+# Comment или Group кэш лент сбрасывается сразу
+POSTS_FEED_CACHE_TIMEOUT = 300
+
+# Время жизни отрендеренной карточки записи, общей для всех лент
+POSTS_POST_CACHE_TIMEOUT = 60 * 60
+
+# Потоки для фонового создания миниатюр; 0 - создавать сразу в запросе.
+POSTS_THUMBNAIL_WORKERS = 2
+
+# Потоки фоновой модерации из админки; 0 - задачи выполняются сразу.
+# Один поток: пачки удаления в SQLite всё равно пишутся по очереди
+POSTS_MODERATION_WORKERS = 1
+
+# Загружаемые картинки больше этого размера по длинной стороне
+# уменьшаются и перекодируются с заданным качеством, EXIF удаляется
+POSTS_IMAGE_MAX_DIMENSION = 2048
+POSTS_IMAGE_QUALITY = 85
+# Файлы тяжелее отклоняются формой без декодирования
+POSTS_IMAGE_MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+
+# Бэкенд полнотекстового поиска: индекс SQLite FTS5 или запасной
+# posts.search.LikeBackend для баз без FTS5
+POSTS_SEARCH_BACKEND = "posts.search.Fts5Backend"
+# По релевантности ранжируются только столько самых новых совпадений
+POSTS_SEARCH_RANK_WINDOW = 5000
+
+# Замеры SQL, шаблонов и view по маршрутам; гистограммы доступны
+# сотрудникам на /internal/profiling/
+POSTS_PROFILING = True
+# Бюджет SQL-запросов на запрос, None - без ограничения; отдельные
+# маршруты можно переопределить по имени, например {"posts:index": 5}
+POSTS_QUERY_BUDGET = 20
+POSTS_QUERY_BUDGETS = {}
+# Превышение бюджета: "log" пишет предупреждение, "raise" роняет запрос
+POSTS_QUERY_BUDGET_ACTION = "log"
+
+# Реплики только для чтения: GET-запросы читают из них, запись и чтение
+# после записи идут в default. Для локальной проверки задайте
+# YATUBE_SQLITE_REPLICA - путь ко второму файлу SQLite, который
+# заполняет команда replicate_sqlite
+POSTS_READ_REPLICAS = []
+if os.environ.get("YATUBE_SQLITE_REPLICA"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "NAME": os.environ["YATUBE_SQLITE_REPLICA"],
+        "TEST": {"MIRROR": "default"},
+    }
+    POSTS_READ_REPLICAS = ["replica"]
+# Сколько секунд после записи пользователь читает только из default
+POSTS_REPLICA_PIN_SECONDS = 10
+DATABASE_ROUTERS = ["posts.routers.PrimaryReplicaRouter"]
+
 INTERNAL_IPS = [
     "127.0.0.1",
 ] 
\ No newline at end of file
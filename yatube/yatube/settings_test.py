@@ -0,0 +1,24 @@
+"""Настройки тестов: те же, что у сайта, кроме файла кэша.
+
+Кэш остаётся SqliteCache, но во временном файле: тесты не чистят кэш
+сайта и не получают значений из прошлых запусков. Миниатюры создаются
+сразу в запросе: тесты из tests/ удаляют MEDIA_ROOT, пока пул ещё
+пишет в него. Пул миниатюр и потоки модерации проверяют отдельные
+тесты через override_settings.
+
+    python manage.py test --settings=yatube.settings_test
+"""
+import os
+import tempfile
+
+from .settings import *  # noqa: F401,F403
+from .settings import CACHES
+
+CACHES = {
+    "default": {
+        **CACHES["default"],
+        "LOCATION": os.path.join(tempfile.mkdtemp(), "cache.sqlite3"),
+    }
+}
+
+POSTS_THUMBNAIL_WORKERS = 0
@@ -4,6 +4,9 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from posts.moderation import moderation_progress
+from posts.profiling import profiling_stats
+
 handler404 = "yatube.views.page_not_found"
 handler500 = "yatube.views.server_error"
 
@@ -11,6 +14,12 @@ urlpatterns = [
     path("auth/", include("users.urls")),
     path("auth/", include("django.contrib.auth.urls")),
     path("admin/", admin.site.urls),
+    path("internal/profiling/", profiling_stats, name="profiling"),
+    path(
+        "internal/moderation/<str:job_id>/",
+        moderation_progress,
+        name="moderation_progress",
+    ),
     path("", include("posts.urls")),
     path("about/", include("about.urls", namespace="about")),
 ]
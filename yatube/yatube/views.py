@@ -1,13 +1,35 @@
 from http import HTTPStatus
 
+from django.http import HttpResponse
 from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.utils.html import escape
+
+# Вместо адреса в заранее отрендеренной странице 404.
+PATH_PLACEHOLDER = "{{ path }}"
+
+not_found_body = None
 
 
 def page_not_found(request, exception):
-    return render(
-        request,
-        "misc/404.html",
-        {"path": request.path},
+    # Адреса перебирают в основном боты без сессии: для анонимов
+    # страница рендерится один раз на процесс, подставляется только
+    # адрес.
+    global not_found_body
+    if request.user.is_authenticated:
+        return render(
+            request,
+            "misc/404.html",
+            {"path": request.path},
+            status=HTTPStatus.NOT_FOUND,
+        )
+    if not_found_body is None:
+        # Без request: в общую страницу не попадут данные зрителя.
+        not_found_body = render_to_string(
+            "misc/404.html", {"path": PATH_PLACEHOLDER}
+        )
+    return HttpResponse(
+        not_found_body.replace(PATH_PLACEHOLDER, escape(request.path)),
         status=HTTPStatus.NOT_FOUND,
     )
 